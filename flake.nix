@@ -22,6 +22,7 @@
           tinydb
           matplotlib
           gitpython
+          numpy
         ]))
         pkgs.pre-commit
       ];
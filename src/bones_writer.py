@@ -5,15 +5,39 @@ import os
 import shutil
 import readline
 import re
+import queue
+import threading
+import json
+import socket
+import socketserver
+import sys
+import html
+import itertools
+import zlib
+import fcntl
+import string
+import bisect
+import heapq
+import resource
+import tracemalloc
+import unicodedata
+import uuid
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
 import typer
 import yaml
-from spellchecker import SpellChecker
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Dict, Any
-from tinydb import TinyDB, Query
-import matplotlib.pyplot as plt
-import git
+from typing import IO, TYPE_CHECKING, Dict, Any, Callable, Iterable, Iterator, Mapping
+from tinydb import Query
+from tinydb.table import Document
+
+# git, numpy, pyspellchecker and other heavy modules are imported where they are used, so commands like
+# `stats --tui` never load them
+if TYPE_CHECKING:
+    import git
 
 
 # Constants
@@ -32,6 +56,8 @@ TRASH_DIR: Path = Path("/tmp")
 CONFIG: Path = Path.joinpath(CONFIG_DIR, "config.yaml")
 BLANK_TIMEOUT: float = 5.0  # Timeout in seconds before blanking the text
 STATS_BRIGHTNESS: int = 200  # adjust for darknes of live stats, 0-1000
+DAEMON_SOCKET: Path = Path.joinpath(CONFIG_DIR, "daemon.sock")
+UNSET = object()  # marks a value not looked up yet
 
 # Default configuration
 DEFAULT_CONFIG: Dict[str, Any] = {
@@ -39,7 +65,304 @@ DEFAULT_CONFIG: Dict[str, Any] = {
     "trash_directory": TRASH_DIR,
     "stats_brightness": STATS_BRIGHTNESS,
     "blank_timeout": BLANK_TIMEOUT,
+    "highlight_spelling": False,
+    "metrics_textfile": None,  # path to write OpenMetrics to at the end of every session
+    "checkpoint_minutes": None,  # commit a work in progress snapshot this often
+    "checkpoint_words": None,  # or after this many new words
+    "checkpoint_push": False,  # also push the work in progress ref
+    "goal_words": None,  # hostage mode: Ctrl-C is ignored until this many words are written
+    "goal_minutes": None,  # and/or until this many minutes have passed
+    "goal_wpm": None,  # and/or while the session's WPM is below this floor
+    "history_limit": 100_000,  # characters kept in memory for redrawing and backspace, the file keeps everything
+    "language": "en",  # spelling dictionary, one of en, es, fr, pt, de, it, ru, ar, eu, lv, nl, fa
+    "languages": {},  # dictionary per category, e.g. {"diario": "es"}
+    "host": None,  # names this machine's sessions shard, defaults to the hostname
 }
+DICTIONARY_CACHE_SIZE = 3  # word sets kept loaded, switching back and forth between a few languages never reloads
+
+
+def read_config(config_path: Path) -> Dict[str, Any] | None:
+    """Return the configuration merged over the defaults, or None if the file is missing or invalid."""
+    try:
+        with open(config_path, "r") as f:
+            config = yaml.safe_load(f)
+            return {**DEFAULT_CONFIG, **config}
+    except (FileNotFoundError, yaml.YAMLError):
+        return None
+
+
+def machine_name() -> str:
+    """Return this machine's short hostname, safe to use as a file name."""
+    return re.sub(r"[^A-Za-z0-9_-]", "_", socket.gethostname().split(".")[0]) or "localhost"
+
+
+def streak_length(days: set[str], today: date) -> int:
+    """Return the number of consecutive ISO days in the set ending today, or yesterday if today is still to come."""
+    day = today
+    if day.isoformat() not in days:
+        day -= timedelta(days=1)  # today's session is still being written
+    streak = 0
+    while day.isoformat() in days:
+        streak += 1
+        day -= timedelta(days=1)
+    return streak
+
+
+class FileLock:
+    """
+    Reentrant advisory lock shared between processes with flock.
+
+    Nested holds in the same process reuse the outer lock, so a shared hold inside an
+    exclusive one keeps the exclusive lock.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._fd: int | None = None
+        self._depth = 0
+        self._thread_lock = threading.RLock()
+
+    @contextmanager
+    def hold(self, exclusive: bool = True) -> Iterator[None]:
+        with self._thread_lock:
+            if self._depth == 0:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                    os.close(self._fd)
+                    self._fd = None
+
+
+class SessionShard:
+    """The rows read so far from one shard file, re-read from where it left off when the file grows."""
+
+    def __init__(self) -> None:
+        self.signature: tuple[int, int, int] | None = None  # inode, size and mtime when last read
+        self.offset = 0
+        self.rows: list[dict[str, Any]] = []
+        self.updates: list[tuple[str, str, dict[str, Any]]] = []  # (time, row ID, fields)
+
+
+class SessionTable:
+    """
+    The sessions table, kept as append-only JSON lines shards with one file per machine.
+
+    Each machine only ever appends to `.bones_sessions/<host>.jsonl`, so shards pulled from
+    other machines never conflict in git. A line is either a session row or an update to an
+    earlier row, `{"$update": "<row ID>", "$at": ..., "fields": {...}}`. Rows store a random
+    "id" when they are written, rows from before that are known by "<host>:<n>", numbered
+    from 1 in each shard. The rows of `.bones_database.json` from before shards existed are
+    read as the "legacy" shard and never written again.
+
+    Reads merge every shard into an index sorted by timestamp, with one row per session file:
+    a row recovered by rebuild-db gives way to the original row from any shard. The index is
+    cached and only rebuilt when a shard's size or modification time changes, reading just the
+    appended bytes, so a query costs one stat per shard once nothing has changed. Reads never
+    take the lock: lines are appended with a single write and a partial last line is left for
+    the next read.
+    """
+
+    LEGACY = "legacy"
+
+    def __init__(self, directory: Path, host: str) -> None:
+        self.dir = Path.joinpath(directory, ".bones_sessions")
+        self.host = host
+        self.path = Path.joinpath(self.dir, f"{host}.jsonl")
+        self.legacy_path = Path.joinpath(directory, ".bones_database.json")
+        self.lock = FileLock(Path.joinpath(directory, ".bones_sessions.lock"))
+        self._shards: dict[str, SessionShard] = {}
+        self._index: list[Document] = []
+        self._listed: int | None = None  # modification time of the shard directory when it was listed
+        self._paths: dict[str, str] = {}
+
+    def _shard_paths(self) -> dict[str, str]:
+        """Return the shard files by name, only listing the directory again when files were added or removed."""
+        try:
+            listed = os.stat(self.dir).st_mtime_ns
+        except FileNotFoundError:
+            listed = None
+        if listed is None or listed != self._listed:
+            self._listed = listed
+            self._paths = {}
+            if listed is not None:
+                with os.scandir(self.dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".jsonl"):
+                            self._paths[entry.name.removesuffix(".jsonl")] = entry.path
+        paths = dict(self._paths)
+        if os.path.exists(self.legacy_path):
+            paths[self.LEGACY] = str(self.legacy_path)
+        return paths
+
+    def _read_shard(self, name: str, path: str, shard: SessionShard) -> None:
+        if name == self.LEGACY:
+            with open(path, "r", encoding="utf-8") as file:
+                try:
+                    table = json.load(file).get("sessions", {})
+                except json.JSONDecodeError:
+                    table = {}  # corrupted, rebuild-db recovers its sessions
+            shard.rows = [table[doc_id] for doc_id in sorted(table, key=int)]
+            shard.offset = 0
+            return
+        with open(path, "rb") as file:
+            file.seek(shard.offset)
+            data = file.read()
+        end = data.rfind(b"\n") + 1  # a line still being appended is read next time
+        shard.offset += end
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # blank, or torn by a crash while it was being written
+            if "$update" in record:
+                shard.updates.append((record.get("$at", ""), record["$update"], record["fields"]))
+            else:
+                shard.rows.append(record)
+
+    def _refresh(self) -> list[Document]:
+        """Return the merged index, reading only shards that changed since the last call."""
+        paths = self._shard_paths()
+        changed = set(self._shards) - set(paths)
+        for name in changed:
+            del self._shards[name]
+        for name, path in paths.items():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            shard = self._shards.get(name)
+            if shard is not None and shard.signature == signature:
+                continue
+            # Shards only grow, anything else (a rebuild or a rewritten legacy file) is read from the start
+            if shard is None or name == self.LEGACY or shard.signature[0] != stat.st_ino or stat.st_size < shard.offset:
+                shard = self._shards[name] = SessionShard()
+            self._read_shard(name, path, shard)
+            shard.signature = signature
+            changed.add(name)
+        if changed:
+            self._index = self._merge()
+        return self._index
+
+    def _merge(self) -> list[Document]:
+        documents: dict[str, Document] = {}
+        for name, shard in sorted(self._shards.items()):
+            for number, row in enumerate(shard.rows, start=1):
+                row_id = self._row_id(name, number, row)
+                documents[row_id] = Document(row, doc_id=row_id)
+        updates = sorted(update for shard in self._shards.values() for update in shard.updates)
+        for _, doc_id, fields in updates:
+            if doc_id in documents:
+                documents[doc_id] = Document({**documents[doc_id], **fields}, doc_id=doc_id)
+        # A session rebuilt on one machine may still have its original row in another machine's shard
+        by_filepath: dict[str, Document] = {}
+        for doc_id, document in list(documents.items()):
+            filepath = document.get("filepath")
+            if filepath is None:
+                continue
+            kept = by_filepath.setdefault(filepath, document)
+            if kept is document:
+                continue
+            if kept.get("recovered") and not document.get("recovered"):
+                by_filepath[filepath] = document
+                del documents[kept.doc_id]
+            else:
+                del documents[doc_id]
+        return sorted(documents.values(), key=lambda document: document.get("timestamp", ""))
+
+    @staticmethod
+    def _row_id(name: str, number: int, row: dict[str, Any]) -> str:
+        """Return the ID stored in a row, or its shard and position for rows written before IDs were stored."""
+        return row.get("id") or f"{name}:{number}"
+
+    def _append(self, records: list[dict[str, Any]]) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode()
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b"\n":
+                data = b"\n" + data  # keep a line torn by a crash from swallowing the next one
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def insert(self, document: dict[str, Any]) -> str:
+        return self.insert_multiple([document])[0]
+
+    def insert_multiple(self, documents: Iterable[dict[str, Any]]) -> list[str]:
+        """Append rows to this machine's shard and return their IDs."""
+        documents = [dict(document, id=uuid.uuid4().hex) for document in documents]
+        with self.lock.hold():
+            self._append(documents)
+        return [document["id"] for document in documents]
+
+    def update_each(self, fields: dict[str, dict[str, Any]]) -> None:
+        """Record new fields for several rows, keyed by row ID, with a single append to this machine's shard."""
+        if not fields:
+            return
+        at = datetime.now().isoformat()
+        with self.lock.hold():
+            self._append(
+                [
+                    {"$update": doc_id, "$at": at, "fields": document_fields}
+                    for doc_id, document_fields in fields.items()
+                ]
+            )
+
+    def replace_all(self, documents: Iterable[dict[str, Any]]) -> None:
+        """
+        Replace every row of this machine's shard with the given ones.
+
+        The other shards and the legacy database are left alone, their rows for the same
+        session files are merged with these on read. A row for a session file this shard already
+        has keeps that row's ID, so updates other machines recorded for it still apply to it.
+        """
+        documents = [dict(document) for document in documents]
+        with self.lock.hold():
+            self._refresh()
+            shard = self._shards.get(self.host, SessionShard())
+            known = {
+                row["filepath"]: self._row_id(self.host, number, row)
+                for number, row in enumerate(shard.rows, start=1)
+                if "filepath" in row
+            }
+            for document in documents:
+                document.setdefault("id", known.get(document.get("filepath")) or uuid.uuid4().hex)
+            data = "".join(json.dumps(document, ensure_ascii=False) + "\n" for document in documents)
+            self.dir.mkdir(parents=True, exist_ok=True)
+            temporary_path = self.path.with_name(f".{self.path.name}.tmp")
+            temporary_path.write_text(data, encoding="utf-8")
+            os.replace(temporary_path, self.path)
+
+    def signature(self) -> dict[str, list[int]]:
+        """Return the size and modification time of every shard, which change whenever a row is written."""
+        signature = {}
+        for name, path in self._shard_paths().items():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature[name] = [stat.st_size, stat.st_mtime_ns]
+        return signature
+
+    def all(self) -> list[Document]:
+        return list(self._refresh())
+
+    def search(self, condition: Callable[[Mapping[str, Any]], bool]) -> list[Document]:
+        return [document for document in self._refresh() if condition(document)]
+
+    def __iter__(self) -> Iterator[Document]:
+        return iter(self._refresh())
+
+    def __len__(self) -> int:
+        return len(self._refresh())
 
 
 class CategoryCompleter:
@@ -53,6 +376,1228 @@ class CategoryCompleter:
         return None
 
 
+class GrammarChecker:
+    """
+    Offline rule-based grammar checker that consumes completed sentences on a background thread.
+
+    Sentences are queued by the input loop and checked by a worker, so the error counter is
+    already finished when the session ends.
+    """
+
+    # A sentence ends at terminal punctuation or, in lists and unpunctuated drafts, at a blank line
+    SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n\s*\n\s*")
+    # The article goes by sound, so skip the spellings that break the letter rule and acronyms, read either way
+    RULES: list[tuple[str, re.Pattern[str]]] = [
+        ("repeated word", re.compile(r"\b(\w+)\s+\1\b", re.IGNORECASE)),
+        ("lowercase i", re.compile(r"(?<![\w'.])i(?![\w']|\.\w)")),
+        ("a before vowel", re.compile(r"\ba\s+(?!(?i:uni|use|usu|uti|eu|ewe|one\b|once)|[A-Z]{2,}\b)[aeiouAEIOU]\w")),
+        (
+            "an before consonant",
+            re.compile(r"\b[Aa]n\s+(?!(?i:hour|honest|hono|heir)|[A-Z]{2,}\b)[b-df-hj-np-tv-zB-DF-HJ-NP-TV-Z]\w"),
+        ),
+        ("space before punctuation", re.compile(r"\s+[,.;:!?]")),
+        ("missing space after comma", re.compile(r",(?=[^\s\d\"')])")),
+    ]
+
+    def __init__(self) -> None:
+        self.sentences = 0
+        self.errors = 0
+        self._queue: queue.Queue[str | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    def check(self, sentence: str) -> int:
+        """Return the number of grammar errors found in a single sentence."""
+        errors = 0
+        first = next((c for c in sentence if c.isalpha()), "")
+        if first and not first.isupper():
+            errors += 1
+        for _, pattern in self.RULES:
+            errors += len(pattern.findall(sentence))
+        return errors
+
+    def submit(self, sentence: str) -> None:
+        """Queue a completed sentence for checking without blocking the caller."""
+        sentence = sentence.strip()
+        if not sentence:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+        self._queue.put(sentence)
+
+    def _worker(self) -> None:
+        while True:
+            sentence = self._queue.get()
+            if sentence is None:
+                return
+            self.errors += self.check(sentence)
+            self.sentences += 1
+
+    def rate(self, text: str) -> int:
+        """Return grammar errors per sentence as a percentage for a whole text, checked on the calling thread."""
+        sentences = [sentence for sentence in self.SENTENCE_END.split(text) if sentence.strip()]
+        if not sentences:
+            return 0
+        return int(sum(self.check(sentence.strip()) for sentence in sentences) / len(sentences) * 100)
+
+    def finish(self, remainder: str = "") -> int:
+        """
+        Check any trailing sentence, stop the worker and return the percentage of grammar errors per sentence.
+
+        Args:
+            remainder (str): Text typed after the last completed sentence.
+
+        Returns:
+            int: Grammar errors per sentence as a percentage.
+        """
+        self.submit(remainder)
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+        if self.sentences == 0:
+            return 0
+        return int((self.errors / self.sentences) * 100)
+
+
+class SpellHighlighter:
+    """
+    Looks up completed words against a spelling dictionary on a background thread.
+
+    Words are queued as (start index, word) and misspelled ones come back on a result queue,
+    so the input loop only ever touches the queues.
+    """
+
+    def __init__(self, language: str = "en") -> None:
+        self.language = language
+        self._words: queue.Queue[tuple[int, str] | None] = queue.Queue()
+        self._results: queue.Queue[tuple[int, str]] = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start the worker, which loads the dictionary before serving lookups."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+
+    def submit(self, start: int, word: str) -> None:
+        """Queue a completed word starting at the given text index."""
+        self.start()
+        self._words.put((start, word))
+
+    def _worker(self) -> None:
+        try:
+            dictionary = load_dictionary(self.language)
+        except ValueError:
+            # Highlighting in the wrong language beats a worker that died without a word
+            dictionary = load_dictionary(DEFAULT_CONFIG["language"])
+        while True:
+            item = self._words.get()
+            if item is None:
+                return
+            start, word = item
+            if unknown_words([word.lower()], dictionary):
+                self._results.put((start, word))
+
+    def results(self) -> list[tuple[int, str]]:
+        """Return all misspelled words found so far without blocking."""
+        found = []
+        while True:
+            try:
+                found.append(self._results.get_nowait())
+            except queue.Empty:
+                return found
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._words.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+class SessionArchive:
+    """
+    Compressed per-month bundles of old session files.
+
+    Each session is compressed on its own and appended to `.archive/YYYY-MM.bundle`, with
+    `YYYY-MM.index.json` mapping its path relative to the session directory to an offset and
+    length, so a single session can be read back without unpacking the rest of the month.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.dir = directory
+        self.archive_dir = Path.joinpath(directory, ".archive")
+        self._indexes: dict[str, dict[str, list[int]]] = {}
+
+    @staticmethod
+    def month_of(relative_path: str) -> str | None:
+        """Return the YYYY-MM month a session belongs to, taken from its timestamped filename."""
+        match = re.match(r"(\d{4}-\d{2})-\d{2}_", Path(relative_path).name)
+        return match.group(1) if match else None
+
+    def bundle_path(self, month: str) -> Path:
+        return Path.joinpath(self.archive_dir, f"{month}.bundle")
+
+    def index_path(self, month: str) -> Path:
+        return Path.joinpath(self.archive_dir, f"{month}.index.json")
+
+    def index(self, month: str) -> dict[str, list[int]]:
+        """Return the index for a month, mapping relative paths to [offset, length, raw size]."""
+        if month not in self._indexes:
+            try:
+                with open(self.index_path(month), "r") as file:
+                    self._indexes[month] = json.load(file)
+            except FileNotFoundError:
+                self._indexes[month] = {}
+        return self._indexes[month]
+
+    def add(self, month: str, members: list[tuple[str, Path]]) -> tuple[int, int]:
+        """
+        Append session files to a month's bundle and update its index.
+
+        Args:
+            month (str): The YYYY-MM bundle to add to.
+            members (list[tuple[str, Path]]): (relative path, file path) pairs to pack.
+
+        Returns:
+            tuple[int, int]: Total bytes before and after compression.
+        """
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        index = self.index(month)
+        raw_bytes = packed_bytes = 0
+        with open(self.bundle_path(month), "ab") as bundle:
+            for relative_path, path in members:
+                with open(path, "rb") as file:
+                    raw = file.read()
+                packed = zlib.compress(raw, 9)
+                index[relative_path] = [bundle.tell(), len(packed), len(raw)]
+                bundle.write(packed)
+                raw_bytes += len(raw)
+                packed_bytes += len(packed)
+
+        with open(self.index_path(month), "w") as file:
+            json.dump(index, file, indent=0, sort_keys=True)
+        return raw_bytes, packed_bytes
+
+    def read(self, relative_path: str) -> str | None:
+        """Return an archived session's text, or None if it is not in the archive."""
+        month = self.month_of(relative_path)
+        if month is None:
+            return None
+        entry = self.index(month).get(relative_path)
+        if entry is None:
+            return None
+        offset, length, _ = entry
+        with open(self.bundle_path(month), "rb") as bundle:
+            bundle.seek(offset)
+            return zlib.decompress(bundle.read(length)).decode()
+
+
+@lru_cache(maxsize=4096)
+def char_width(char: str) -> int:
+    """Return the number of terminal cells a character takes up: 0 for combining marks, 2 for wide CJK characters."""
+    if unicodedata.combining(char) or unicodedata.category(char) in ("Me", "Cf"):
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in ("W", "F") else 1
+
+
+def spelling_languages() -> list[str]:
+    """Return the languages with a spelling dictionary."""
+    from spellchecker import SpellChecker
+
+    return list(SpellChecker.languages())
+
+
+@lru_cache(maxsize=DICTIONARY_CACHE_SIZE)
+def load_dictionary(language: str) -> frozenset[str]:
+    """Return the words of a language's spelling dictionary, loaded on first use and kept in a small LRU cache."""
+    from spellchecker import SpellChecker
+
+    return frozenset(SpellChecker(language=language).word_frequency.keys())
+
+
+def unknown_words(words: Iterable[str], dictionary: frozenset[str]) -> set[str]:
+    """Return the lowercase words missing from the dictionary, numbers are never misspelled."""
+    unknown = set()
+    for word in words:
+        if word in dictionary:
+            continue
+        try:
+            float(word)
+        except ValueError:
+            unknown.add(word)
+    return unknown
+
+
+def spelling_accuracy(lines: Iterable[str], dictionary: frozenset[str]) -> int:
+    """Return the percentage of correctly spelled words, reading the text a line at a time."""
+    # Only the distinct words are kept
+    total_words = 0
+    words: set[str] = set()
+    for line in lines:
+        # Split content into words and filter out non-word characters
+        line_words = re.findall(r"\b\w+\b", line.lower())
+        total_words += len(line_words)
+        words.update(line_words)
+
+    if not total_words:
+        return 0  # Return 0% if no words found
+
+    # Find misspelled words
+    misspelled = unknown_words(words, dictionary)
+
+    # Calculate percentage of correctly spelled words
+    correct_words = total_words - len(misspelled)
+    return int((correct_words / total_words) * 100)
+
+
+def normalize_word(token: str) -> str:
+    """Lowercase a whitespace separated token and strip surrounding punctuation, returning "" for non-words."""
+    word = token.strip(string.punctuation + "“”‘’«»…—–").lower()
+    return word if any(c.isalpha() for c in word) else ""
+
+
+@lru_cache(maxsize=100_000)
+def count_syllables(word: str) -> int:
+    """Estimate the syllables in a normalized word from its vowel groups, cached as words repeat a lot."""
+    groups = re.findall(r"[aeiouy]+", word)
+    count = len(groups)
+    # A final silent e, as in "make", is not a syllable but "table" keeps its "le"
+    if count > 1 and word.endswith("e") and not word.endswith(("le", "ee")) and groups[-1] == "e":
+        count -= 1
+    return max(count, 1)
+
+
+class TextStatistics:
+    """
+    Word, sentence and paragraph counts gathered in a single pass over a session's lines.
+
+    Sentences end at ., ! or ? (ignoring closing quotes and brackets) or at the end of a
+    paragraph, and paragraphs are runs of non-blank lines. Syllables are counted once per
+    distinct word from the frequency counter, so the readability scores cost little extra.
+    """
+
+    SENTENCE_END = re.compile(r"[.!?]+[\"'”’)\]]*$")
+
+    def __init__(self) -> None:
+        self.word_count = 0
+        self.frequencies: Counter[str] = Counter()
+        self.sentences = 0
+        self.paragraphs = 0
+        self._open_sentence = False
+        self._in_paragraph = False
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> "TextStatistics":
+        stats = cls()
+        for line in lines:
+            stats.feed(line)
+        return stats
+
+    def feed(self, line: str) -> None:
+        words = line.split()
+        if not words:
+            self._end_paragraph()
+            return
+        if not self._in_paragraph:
+            self._in_paragraph = True
+            self.paragraphs += 1
+        self.word_count += len(words)
+        self.frequencies.update(map(normalize_word, words))
+        for word in words:
+            if self.SENTENCE_END.search(word):
+                self.sentences += 1
+                self._open_sentence = False
+            else:
+                self._open_sentence = True
+
+    def _end_paragraph(self) -> None:
+        if self._open_sentence:
+            self.sentences += 1
+            self._open_sentence = False
+        self._in_paragraph = False
+
+    def metrics(self) -> dict[str, Any]:
+        """
+        Return the sentence, paragraph and readability figures stored with each session.
+
+        Returns:
+            dict[str, Any]: sentence_count, mean_sentence_length (words), paragraph_count,
+            flesch_reading_ease and flesch_kincaid_grade. The scores are None for text without words.
+        """
+        self._end_paragraph()
+        del self.frequencies[""]
+        words = sum(self.frequencies.values())
+        syllables = sum(count_syllables(word) * count for word, count in self.frequencies.items())
+        sentences = max(self.sentences, 1)
+        reading_ease = grade = None
+        if words:
+            words_per_sentence = words / sentences
+            syllables_per_word = syllables / words
+            reading_ease = round(206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word, 1)
+            grade = round(0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59, 1)
+        return {
+            "sentence_count": self.sentences,
+            "mean_sentence_length": round(self.word_count / sentences, 1),
+            "paragraph_count": self.paragraphs,
+            "flesch_reading_ease": reading_ease,
+            "flesch_kincaid_grade": grade,
+        }
+
+
+READABILITY_KEYS = (
+    "sentence_count",
+    "mean_sentence_length",
+    "paragraph_count",
+    "flesch_reading_ease",
+    "flesch_kincaid_grade",
+)
+
+
+def word_frequencies(lines: Iterable[str]) -> tuple[int, Counter[str]]:
+    """Count the words in some text along with how often each normalized word occurs."""
+    stats = TextStatistics.from_lines(lines)
+    del stats.frequencies[""]
+    return stats.word_count, stats.frequencies
+
+
+class VocabularyIndex:
+    """
+    Word frequency counters kept up to date once per session in cleanup().
+
+    The per-session counters, each tagged with its day and category, are appended to a JSON lines
+    log next to `path`. The aggregates the vocab queries need (totals, per-category and per-month
+    counters and the day each word was first used) are kept in a small JSON file at `path`, so
+    queries never have to reread the session files or the per-session log.
+    """
+
+    STOP_WORDS: frozenset[str] = frozenset(
+        "a about after all also an and any are as at be because been but by can could did do for from had has "
+        "have he her him his how i if in into is it its just me more my no not of on one or our out she so some "
+        "than that the their them then there they this to up was we were what when which who will with would you "
+        "your i'm it's don't".split()
+    )
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.log_path = path.with_suffix(".jsonl")
+        self.pending: list[dict[str, Any]] = []
+        self.data = self.empty()
+        try:
+            with open(path, "r") as file:
+                self.data = {**self.data, **json.load(file)}
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    @staticmethod
+    def empty() -> dict[str, Any]:
+        return {"sessions": {}, "totals": {}, "categories": {}, "months": {}, "first_seen": {}}
+
+    def add_session(self, filepath: str, timestamp: str, frequencies: dict[str, int]) -> None:
+        """Fold the word frequencies of a single session into the counters, ignoring sessions already added."""
+        if filepath in self.data["sessions"]:
+            return
+        day = timestamp[:10]
+        category = Path(filepath).parent.name
+        self.data["sessions"][filepath] = day
+        self.pending.append({"filepath": filepath, "day": day, "category": category, "counts": dict(frequencies)})
+
+        first_seen = self.data["first_seen"]
+        counters = (
+            self.data["totals"],
+            self.data["categories"].setdefault(category, {}),
+            self.data["months"].setdefault(day[:7], {}).setdefault(category, {}),
+        )
+        for word, count in frequencies.items():
+            for counter in counters:
+                counter[word] = counter.get(word, 0) + count
+            if word not in first_seen or day < first_seen[word]:
+                first_seen[word] = day
+
+    def save(self) -> None:
+        with open(self.path, "w") as file:
+            json.dump(self.data, file)
+        if self.pending:
+            with open(self.log_path, "a") as file:
+                file.writelines(json.dumps(session) + "\n" for session in self.pending)
+            self.pending = []
+
+    def sessions(self) -> Iterator[dict[str, Any]]:
+        """Yield the saved per-session counters, oldest first."""
+        try:
+            with open(self.log_path, "r") as file:
+                for line in file:
+                    yield json.loads(line)
+        except FileNotFoundError:
+            return
+
+    def days(self) -> dict[str, Counter[str]]:
+        """Return the word frequencies of each day, read from the per-session log."""
+        days: dict[str, Counter[str]] = {}
+        for session in self.sessions():
+            days.setdefault(session["day"], Counter()).update(session["counts"])
+        return days
+
+    def top(self, n: int, category: str | None = None, stop_words: bool = False) -> list[tuple[str, int]]:
+        """Return the most used words, leaving out common function words unless asked for."""
+        counts = Counter(self.data["totals"] if category is None else self.data["categories"].get(category, {}))
+        if not stop_words:
+            for word in self.STOP_WORDS:
+                del counts[word]
+        return counts.most_common(n)
+
+    def diversity(self, category: str | None = None) -> list[tuple[str, int, int]]:
+        """Return (month, distinct words, total words) for each month, oldest first."""
+        rows = []
+        for month, categories in sorted(self.data["months"].items()):
+            if category is None:
+                counters = list(categories.values())
+            elif category in categories:
+                counters = [categories[category]]
+            else:
+                continue
+            types = len(set().union(*counters))
+            rows.append((month, types, sum(sum(counter.values()) for counter in counters)))
+        return rows
+
+    def new_words_per_week(self) -> list[tuple[str, int]]:
+        """Return how many words were used for the first time in each ISO week, oldest first."""
+        weeks: Counter[str] = Counter()
+        for day, count in Counter(self.data["first_seen"].values()).items():
+            year, week, _ = datetime.strptime(day, "%Y-%m-%d").isocalendar()
+            weeks[f"{year}-W{week:02d}"] += count
+        return sorted(weeks.items())
+
+
+class CheckpointWorker:
+    """
+    Commits snapshots of the in-progress session file to a work in progress ref on a background thread.
+
+    Snapshots are built in a temporary index, so the working tree, index and branch are left
+    alone until cleanup() makes the real commit and discards the ref.
+    """
+
+    def __init__(
+        self,
+        repo: "git.Repo",
+        path: Path,
+        git_lock: FileLock,
+        timings: dict[str, float],
+        push: bool = False,
+    ) -> None:
+        self.repo = repo
+        self.path = path
+        self.ref = f"refs/bones/wip/{path.stem}"
+        self.git_lock = git_lock
+        self.timings = timings
+        self.push = push
+        self.count = 0
+        self.error: str | None = None
+        self._requested = threading.Event()
+        self._pending = False
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+
+    def request(self) -> None:
+        """Ask for a snapshot without waiting for it."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+        self._pending = True
+        self._requested.set()
+
+    def _worker(self) -> None:
+        import git
+
+        while True:
+            self._requested.wait()
+            self._requested.clear()
+            if self._pending:
+                self._pending = False
+                try:
+                    self.snapshot()
+                except git.GitCommandError as e:
+                    self.error = str(e)
+            if self._stopping:
+                return
+
+    def snapshot(self) -> None:
+        """Commit the session file as it is on disk on top of the previous snapshot."""
+        import git
+
+        start = time.perf_counter()
+        index_file = Path.joinpath(Path(self.repo.git_dir), f"bones_wip_{self.path.stem}.index")
+        env = {"GIT_INDEX_FILE": str(index_file)}
+        relative_path = Path(os.path.relpath(self.path, self.repo.working_dir)).as_posix()
+        with self.git_lock.hold():
+            try:
+                parent = self.repo.git.rev_parse("--verify", "-q", self.ref)
+            except git.GitCommandError:
+                parent = self.repo.head.commit.hexsha
+            self.repo.git.read_tree(parent, env=env)
+            blob = self.repo.git.hash_object("-w", str(self.path))
+            self.repo.git.update_index("--add", "--cacheinfo", f"100644,{blob},{relative_path}", env=env)
+            tree = self.repo.git.write_tree(env=env)
+            commit = self.repo.git.commit_tree(tree, "-p", parent, "-m", f"checkpoint: {self.path.name}")
+            self.repo.git.update_ref(self.ref, commit)
+        index_file.unlink(missing_ok=True)
+        if self.push:
+            self.repo.git.push("origin", f"+{self.ref}:{self.ref}")
+        self.count += 1
+        self.timings["checkpoint"] = self.timings.get("checkpoint", 0.0) + time.perf_counter() - start
+
+    def stop(self) -> None:
+        """Let a requested snapshot finish and stop the worker."""
+        if self._thread is not None:
+            self._stopping = True
+            self._requested.set()
+            self._thread.join()
+            self._thread = None
+            self._stopping = False
+
+    def discard(self) -> None:
+        """Delete the work in progress ref once the session has been committed for real."""
+        import git
+
+        self.stop()
+        if self.count == 0:
+            return
+        try:
+            self.repo.git.update_ref("-d", self.ref)
+            if self.push:
+                self.repo.git.push("origin", f":{self.ref}")
+        except git.GitCommandError as e:
+            print(f"Could not remove checkpoint ref {self.ref}: {e}")
+
+
+SESSION_FILENAME = re.compile(r"(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})(?:_.*)?\.Rmd$")
+
+
+def recover_session_stats(directory: Path, relative_path: str, language: str = "en") -> dict[str, Any] | None:
+    """
+    Recompute the stats of one session file (or archived session) for rebuild-db.
+
+    Runs in a worker process. The title header added at the end of the session is left out,
+    so the counts match what cleanup() recorded.
+    """
+    path = Path.joinpath(directory, relative_path)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            text = file.read()
+        modified: float | None = path.stat().st_mtime
+    except FileNotFoundError:
+        text = SessionArchive(directory).read(relative_path)
+        if text is None:
+            return None
+        modified = None
+
+    title = None
+    if text.startswith("## "):
+        header, _, text = text.partition("\n")
+        title = header[3:].strip()
+        text = text.removeprefix("\n")
+
+    keylog_seconds = None
+    try:
+        keylog = KeystrokeLog.load(path.with_suffix(".keys"))
+        keylog_seconds = sum(keylog.deltas) / 1000
+    except (FileNotFoundError, ValueError):
+        pass
+
+    text_stats = TextStatistics.from_lines(text.splitlines())
+    return {
+        "relative_path": relative_path,
+        "title": title,
+        "modified": modified,
+        "keylog_seconds": keylog_seconds,
+        "word_count": text_stats.word_count,
+        "readability": text_stats.metrics(),
+        "spelling_accuracy": spelling_accuracy(text.splitlines(), load_dictionary(language)),
+        "grammar_error_rate": GrammarChecker().rate(text),
+    }
+
+
+class SessionMetrics:
+    """
+    Running aggregates of the sessions table and internal timings.
+
+    The aggregates are updated once per session in cleanup() and kept in a small JSON file,
+    so exporting metrics never has to scan the sessions table. The file also records the
+    signature of the shards the aggregates were built from, so a stat per shard tells whether
+    sessions were added elsewhere.
+    """
+
+    WPM_BUCKETS: tuple[int, ...] = (10, 20, 30, 40, 50, 60, 80, 100)
+    WORDS_PER_DAY_DAYS: int = 30  # only export recent days to keep label cardinality bounded
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.data = self.empty()
+        try:
+            with open(path, "r") as file:
+                self.data = {**self.data, **json.load(file)}
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    @staticmethod
+    def empty() -> dict[str, Any]:
+        return {
+            "sessions": 0,
+            "words": 0,
+            "duration_seconds": 0,
+            "words_per_day": {},
+            "wpm_counts": {},
+            "wpm_sum": 0,
+            "spelling_sum": 0,
+            "goals_met": 0,
+            "timings": {},
+            "shards": {},  # SessionTable.signature() of the rows counted
+        }
+
+    def add_session(self, session: dict[str, Any]) -> None:
+        """Fold a single session row into the aggregates."""
+        day = session["timestamp"][:10]
+        self.data["sessions"] += 1
+        self.data["words"] += session["word_count"]
+        self.data["duration_seconds"] += session["duration_seconds"]
+        self.data["words_per_day"][day] = self.data["words_per_day"].get(day, 0) + session["word_count"]
+        bucket = str(next((b for b in self.WPM_BUCKETS if session["wpm"] <= b), "+Inf"))
+        self.data["wpm_counts"][bucket] = self.data["wpm_counts"].get(bucket, 0) + 1
+        self.data["wpm_sum"] += session["wpm"]
+        self.data["spelling_sum"] += session["spelling_accuracy"]
+        self.data["goals_met"] += bool(session.get("goal_met"))
+
+    def add_timings(self, timings: dict[str, float]) -> None:
+        """Record the duration of each internal phase of a session."""
+        for phase, seconds in timings.items():
+            timing = self.data["timings"].setdefault(phase, {"sum": 0.0, "count": 0, "last": 0.0})
+            timing["sum"] += seconds
+            timing["count"] += 1
+            timing["last"] = seconds
+
+    def rebuild(self, sessions: Iterable[dict[str, Any]]) -> None:
+        """Recompute the session aggregates from scratch, keeping the recorded timings."""
+        timings = self.data["timings"]
+        self.data = self.empty()
+        self.data["timings"] = timings
+        for session in sessions:
+            self.add_session(session)
+
+    def save(self) -> None:
+        with open(self.path, "w") as file:
+            json.dump(self.data, file)
+
+    def to_json(self) -> dict[str, Any]:
+        sessions = self.data["sessions"]
+        return {
+            **self.data,
+            "wpm_mean": self.data["wpm_sum"] / sessions if sessions else 0,
+            "spelling_accuracy_mean": self.data["spelling_sum"] / sessions if sessions else 0,
+        }
+
+    def to_openmetrics(self) -> str:
+        """Render the aggregates in the OpenMetrics text format."""
+        data = self.data
+        lines = [
+            "# TYPE bones_sessions counter",
+            f"bones_sessions_total {data['sessions']}",
+            "# TYPE bones_words counter",
+            f"bones_words_total {data['words']}",
+            "# TYPE bones_writing_seconds counter",
+            f"bones_writing_seconds_total {data['duration_seconds']}",
+            "# TYPE bones_goals_met counter",
+            f"bones_goals_met_total {data['goals_met']}",
+            "# TYPE bones_words_per_day gauge",
+        ]
+        for day in sorted(data["words_per_day"])[-self.WORDS_PER_DAY_DAYS :]:
+            lines.append(f'bones_words_per_day{{date="{day}"}} {data["words_per_day"][day]}')
+
+        lines.append("# TYPE bones_wpm histogram")
+        cumulative = 0
+        for bucket in [*map(str, self.WPM_BUCKETS), "+Inf"]:
+            cumulative += data["wpm_counts"].get(bucket, 0)
+            lines.append(f'bones_wpm_bucket{{le="{bucket}"}} {cumulative}')
+        lines.append(f"bones_wpm_sum {data['wpm_sum']}")
+        lines.append(f"bones_wpm_count {data['sessions']}")
+
+        lines.append("# TYPE bones_spelling_accuracy_percent gauge")
+        lines.append(f"bones_spelling_accuracy_percent {self.to_json()['spelling_accuracy_mean']:.2f}")
+
+        lines.append("# TYPE bones_phase_duration_seconds summary")
+        for phase, timing in sorted(data["timings"].items()):
+            lines.append(f'bones_phase_duration_seconds_sum{{phase="{phase}"}} {timing["sum"]:.6f}')
+            lines.append(f'bones_phase_duration_seconds_count{{phase="{phase}"}} {timing["count"]}')
+        lines.append("# TYPE bones_phase_last_duration_seconds gauge")
+        for phase, timing in sorted(data["timings"].items()):
+            lines.append(f'bones_phase_last_duration_seconds{{phase="{phase}"}} {timing["last"]:.6f}')
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def encode_varints(values: Iterable[int]) -> bytearray:
+    """Pack non-negative integers as LEB128 varints."""
+    out = bytearray()
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return out
+
+
+def decode_varints(data: bytes, count: int, offset: int = 0) -> tuple[array, int]:
+    """Unpack count LEB128 varints starting at offset, returning them and the offset after the last one."""
+    values = array("I")
+    for _ in range(count):
+        value = shift = 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        values.append(value)
+    return values, offset
+
+
+class KeystrokeLog:
+    """
+    Compact columnar log of every keystroke in a session.
+
+    Each event is a delta in milliseconds since the previous one, the typed code point (0 for
+    backspace) and a backspace flag. On disk the deltas and keys are varint packed columns and
+    the flags a bitmap, which keeps an hour of typing to a few tens of KB.
+    """
+
+    MAGIC = b"BKL1"
+
+    def __init__(self, start_ns: int | None = None) -> None:
+        self.deltas = array("I")  # 4 bytes per event is plenty for milliseconds and code points
+        self.keys = array("I")
+        self.backspaces = bytearray()
+        self.last_ns = time.time_ns() if start_ns is None else start_ns
+
+    def __len__(self) -> int:
+        return len(self.deltas)
+
+    def record(self, key: int, backspace: bool = False, now_ns: int | None = None) -> None:
+        if now_ns is None:
+            now_ns = time.time_ns()
+        self.deltas.append(min(max(0, (now_ns - self.last_ns) // 1_000_000), 0xFFFFFFFF))
+        self.keys.append(key)
+        self.backspaces.append(backspace)
+        self.last_ns = now_ns
+
+    def to_bytes(self) -> bytes:
+        import numpy as np
+
+        flags = np.packbits(np.frombuffer(bytes(self.backspaces), dtype=np.uint8)).tobytes()
+        deltas = encode_varints(self.deltas)
+        keys = encode_varints(self.keys)
+        header = self.MAGIC + encode_varints([len(self), len(deltas), len(keys)])
+        return bytes(header + deltas + keys + flags)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "KeystrokeLog":
+        import numpy as np
+
+        if not data.startswith(cls.MAGIC):
+            raise ValueError("Not a keystroke log")
+        (count, _, _), offset = decode_varints(data, 3, len(cls.MAGIC))
+        log = cls(start_ns=0)
+        log.deltas, offset = decode_varints(data, count, offset)
+        log.keys, offset = decode_varints(data, count, offset)
+        flags = np.unpackbits(np.frombuffer(data, dtype=np.uint8, offset=offset))[:count]
+        log.backspaces = bytearray(flags.tobytes())
+        return log
+
+    def save(self, path: Path) -> None:
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: Path) -> "KeystrokeLog":
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+    def analyze(self, pause_ms: int = 2000) -> dict[str, Any]:
+        """
+        Summarise pauses and bursts of typing.
+
+        Args:
+            pause_ms (int): Gaps at least this long end a burst.
+
+        Returns:
+            dict[str, Any]: A pause histogram, burst lengths in keystrokes and backspace totals.
+        """
+        import numpy as np
+
+        deltas = np.frombuffer(self.deltas, dtype=self.deltas.typecode) if len(self) else np.zeros(0)
+        backspaces = np.frombuffer(bytes(self.backspaces), dtype=np.uint8)
+        edges = np.array([0, 100, 250, 500, 1000, 2000, 5000, 10000, np.inf])
+        counts, _ = np.histogram(deltas, bins=edges)
+        # A burst runs from one long pause to the next
+        breaks = np.flatnonzero(deltas >= pause_ms)
+        bounds = np.concatenate(([0], breaks, [len(deltas)]))
+        bursts = np.diff(bounds)
+        bursts = bursts[bursts > 0]
+        return {
+            "keystrokes": int(len(deltas)),
+            "backspaces": int(backspaces.sum()),
+            "pause_histogram_ms": {f"{int(lo)}-{hi:g}": int(n) for lo, hi, n in zip(edges[:-1], edges[1:], counts)},
+            "bursts": int(len(bursts)),
+            "mean_burst_keystrokes": float(bursts.mean()) if len(bursts) else 0.0,
+            "longest_burst_keystrokes": int(bursts.max()) if len(bursts) else 0,
+        }
+
+
+def replay_keystrokes(
+    log: KeystrokeLog, write: Callable[[str], None], backspace: Callable[[], None], speed: float = 1.0
+) -> None:
+    """
+    Play a keystroke log back into a sink, keeping the original timing scaled by speed.
+
+    Args:
+        log (KeystrokeLog): The recorded session.
+        write (Callable[[str], None]): Called with each typed character.
+        backspace (Callable[[], None]): Called for each backspace.
+        speed (float): Playback speed multiplier, 0 plays back without delays.
+    """
+    for delta, key, is_backspace in zip(log.deltas, log.keys, log.backspaces):
+        if speed > 0:
+            time.sleep(delta / 1000 / speed)
+        if is_backspace:
+            backspace()
+        else:
+            write(chr(key))
+
+
+class SessionEngine:
+    """
+    The curses independent part of a writing session.
+
+    Consumes typed characters and backspaces (or bulk text), writes them to the session file
+    and keeps the live word count, keystroke log and grammar checker up to date.
+    """
+
+    WORD = re.compile(r"[^ \n]+")
+    SENTENCE_LIMIT = 1000  # characters, a run-on past this is checked in pieces
+
+    def __init__(self, outfile: IO[str] | None = None, start_ns: int | None = None) -> None:
+        self.outfile = outfile
+        self.keylog = KeystrokeLog(start_ns)
+        self.chars: list[str] = []  # typed characters, needed to undo word boundaries on backspace
+
+        # used to track when new words start for live word count
+        self.in_word = False
+        self.live_word_count = 0
+
+        # Sentences are handed to a background grammar checker as they are completed
+        self.grammar_checker = GrammarChecker()
+        self.sentence_buffer: list[str] = []
+
+    @staticmethod
+    def key_to_char(key: int | str) -> str | None:
+        """Return the character to write for a key from getch() or get_wch(), or None if the key is not text."""
+        if isinstance(key, str):  # get_wch() returns typed characters as strings, in any script
+            if key == "\n" or key == "\r":
+                return "\n"
+            return key if key.isprintable() else None
+        if key == 10 or key == 13:  # Enter key (ASCII 10 or 13)
+            return "\n"
+        if 32 <= key <= 126:  # Space and printable ASCII characters
+            return chr(key)
+        return None
+
+    def type_char(self, char: str) -> None:
+        """Write a typed character and update the live stats."""
+        if char == " " or char == "\n":
+            self.in_word = False
+        else:
+            if self.in_word is False:
+                self.live_word_count += 1
+            self.in_word = True
+
+        self.outfile.write(char)
+        self.keylog.record(ord(char))
+        self.chars.append(char)
+        self.track_sentence(char)
+
+    def backspace(self) -> str | None:
+        """Remove the last typed character from the stats, returning it or None if there was nothing to delete."""
+        if not self.chars:
+            return None
+        self.keylog.record(0, backspace=True)
+
+        char = self.chars.pop()
+        if self.sentence_buffer:
+            self.sentence_buffer.pop()
+
+        # Update word count if we're deleting a word boundary
+        if char == " " or char == "\n":
+            self.in_word = False
+        elif self.in_word and len(self.chars) > 0:
+            # Check if we're at the start of a new word (after a space)
+            if self.chars[-1] == " ":
+                self.in_word = False
+        elif not self.in_word and len(self.chars) > 0:
+            # Check if we're at the start of a word (after a space)
+            if self.chars[-1] == " ":
+                self.in_word = True
+        elif not self.in_word and len(self.chars) == 0:
+            # If we're deleting the first character, reset word count
+            self.live_word_count = 0
+
+        # Update live word count if we deleted a word boundary
+        if char == " " and self.in_word:
+            self.live_word_count -= 1
+            self.in_word = False
+        elif char == "\n":
+            self.in_word = False
+        return char
+
+    def track_sentence(self, char: str) -> None:
+        """Collect typed characters and hand each completed sentence to the grammar checker."""
+        ended = self.sentence_buffer and (self.sentence_buffer[-1] in ".!?" or char == "\n" == self.sentence_buffer[-1])
+        if char.isspace() and ended:
+            self.grammar_checker.submit("".join(self.sentence_buffer))
+            self.sentence_buffer = []
+            return
+        if char.isspace() and not self.sentence_buffer:
+            return
+        self.sentence_buffer.append(char)
+        if len(self.sentence_buffer) >= self.SENTENCE_LIMIT:
+            self.cap_sentence()
+
+    def cap_sentence(self) -> None:
+        """
+        Hand the start of an overlong sentence to the grammar checker at a word boundary.
+
+        Text without terminal punctuation or blank lines would otherwise be kept whole for the
+        rest of the session, past the in-memory history limit.
+        """
+        while len(self.sentence_buffer) >= self.SENTENCE_LIMIT:
+            text = "".join(self.sentence_buffer)
+            cut = max(text.rfind(" ", 0, self.SENTENCE_LIMIT), text.rfind("\n", 0, self.SENTENCE_LIMIT)) + 1
+            cut = cut or self.SENTENCE_LIMIT
+            self.grammar_checker.submit(text[:cut])
+            self.sentence_buffer = list(text[cut:].lstrip())
+
+    def forget(self, count: int) -> None:
+        """Drop the oldest typed characters, which can no longer be deleted with backspace."""
+        del self.chars[:count]
+
+    def feed_text(self, text: str) -> None:
+        """
+        Write a block of text in one go, as if it had been typed.
+
+        This is the fast path for piped input, so keystrokes are neither logged nor kept for backspace.
+        """
+        if not text:
+            return
+        self.outfile.write(text)
+
+        words = len(self.WORD.findall(text))
+        if self.in_word and text[0] not in " \n":
+            words -= 1  # the first word continues one from the previous block
+        self.live_word_count += words
+        self.in_word = text[-1] not in " \n"
+
+        sentences = GrammarChecker.SENTENCE_END.split("".join(self.sentence_buffer) + text)
+        for sentence in sentences[:-1]:
+            self.grammar_checker.submit(sentence)
+        self.sentence_buffer = list(sentences[-1].lstrip())
+        self.cap_sentence()
+
+    def feed_stream(self, stream: IO[str], chunk_size: int = 1 << 16) -> None:
+        """Write everything from a text stream, such as standard input."""
+        while chunk := stream.read(chunk_size):
+            self.feed_text(chunk)
+
+    def finish(self) -> int:
+        """Return grammar errors per sentence once the worker has checked everything."""
+        return self.grammar_checker.finish("".join(self.sentence_buffer))
+
+
+class MemoryProfile:
+    """
+    Tracks Python allocations during a session with tracemalloc, for --memprofile.
+
+    Growth is measured from when the profile is created, so it reflects the session itself
+    rather than imports and startup.
+    """
+
+    def __init__(self, frames: int = 1) -> None:
+        tracemalloc.start(frames)
+        self.baseline = tracemalloc.get_traced_memory()[0]
+
+    def growth(self) -> int:
+        """Return the bytes allocated since the profile started that are still alive."""
+        return tracemalloc.get_traced_memory()[0] - self.baseline
+
+    def per_keystroke(self, keystrokes: int) -> float:
+        return self.growth() / keystrokes if keystrokes else 0.0
+
+    def status_text(self, keystrokes: int) -> str:
+        return f"Mem: {humanize.naturalsize(self.growth())} {self.per_keystroke(keystrokes):.0f}B/key"
+
+    def report(self, keystrokes: int, top: int = 10) -> str:
+        """Summarise peak memory and the allocation sites holding the most memory."""
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ]
+        )
+        _, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"Keystrokes: {keystrokes}",
+            f"Growth: {humanize.naturalsize(self.growth())} ({self.per_keystroke(keystrokes):.1f} bytes per keystroke)",
+            f"Peak traced: {humanize.naturalsize(peak)}",
+            # ru_maxrss is in kilobytes on Linux
+            f"Peak RSS: {humanize.naturalsize(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)}",
+            "Top allocation sites:",
+        ]
+        for stat in snapshot.statistics("lineno")[:top]:
+            frame = stat.traceback[0]
+            lines.append(f"  {humanize.naturalsize(stat.size):>10} {stat.count:>8} {frame.filename}:{frame.lineno}")
+        return "\n".join(lines)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+
+
+class SessionGoal:
+    """
+    A word, time and/or WPM goal for hostage mode.
+
+    Every goal that is set must be reached. Progress is checked against the live word count and
+    elapsed time the session already keeps, so each check is constant time however long the session.
+    """
+
+    WPM_WARMUP_SECONDS = 60  # a burst of typing in the first minute does not meet a WPM floor
+
+    def __init__(self, words: int | None = None, minutes: float | None = None, wpm: int | None = None) -> None:
+        self.words = words
+        self.minutes = minutes
+        self.wpm = wpm
+        self.words_reached = words is None
+        self.minutes_reached = minutes is None
+
+    def met(self, words: int, seconds: float) -> bool:
+        """
+        Return True if every goal is reached.
+
+        The word and time goals stay met once reached, the WPM floor is checked against the whole
+        session's average every time, and only after the first minute.
+        """
+        self.words_reached = self.words_reached or words >= self.words
+        self.minutes_reached = self.minutes_reached or seconds >= self.minutes * 60
+        return (
+            self.words_reached
+            and self.minutes_reached
+            and (self.wpm is None or (seconds >= self.WPM_WARMUP_SECONDS and words * 60 / seconds >= self.wpm))
+        )
+
+    def progress_text(self, words: int, seconds: float) -> str:
+        if self.met(words, seconds):
+            return "Goal met"
+        parts = []
+        if self.words is not None:
+            parts.append(f"{words}/{self.words} words")
+        if self.minutes is not None:
+            parts.append(f"{int(seconds // 60)}/{self.minutes:g} min")
+        if self.wpm is not None:
+            parts.append(f"{int(words * 60 / seconds) if seconds > 0 else 0}/{self.wpm} WPM")
+        return "Goal: " + " ".join(parts)
+
+
+class StatusWidget:
+    """A status bar segment whose text is recomputed at most once per interval."""
+
+    def __init__(self, name: str, compute: Callable[[], str], interval: float = 1.0) -> None:
+        self.name = name
+        self.compute = compute
+        self.interval = interval
+        self.text = ""
+        self.last_update = float("-inf")
+
+    def update(self, now: float) -> bool:
+        """Recompute the text if the interval has passed, returning True if it changed."""
+        if now - self.last_update < self.interval:
+            return False
+        self.last_update = now
+        text = self.compute()
+        if text == self.text:
+            return False
+        self.text = text
+        return True
+
+
+class StatusBar:
+    """
+    Lays out widgets right to left on the top line and rewrites only the cells that changed.
+
+    Widgets are listed in priority order, the first sits in the top right corner and the last
+    is the first to be dropped on a narrow terminal.
+    """
+
+    def __init__(self, widgets: list[StatusWidget], gap: int = 2) -> None:
+        self.widgets = widgets
+        self.gap = gap
+        self.cells = ""  # the line as currently drawn
+
+    def layout(self, width: int) -> str:
+        """Return the full status line for the given width."""
+        segments: list[str] = []
+        used = 0
+        for widget in self.widgets:
+            if not widget.text:
+                continue
+            needed = len(widget.text) + (self.gap if segments else 0)
+            if used + needed > width:
+                break
+            segments.append(widget.text)
+            used += needed
+        return (" " * self.gap).join(reversed(segments)).rjust(width)
+
+    def invalidate(self) -> None:
+        """Forget what is on screen so the next render redraws the whole line."""
+        self.cells = ""
+
+    def render(self, stdscr: curses.window, width: int, now: float, attr: int) -> bool:
+        """
+        Update due widgets and write the cells that differ from what is on screen.
+
+        Returns:
+            bool: True if anything was written.
+        """
+        changed = False
+        for widget in self.widgets:
+            changed |= widget.update(now)
+        if not changed and len(self.cells) == width:
+            return False
+
+        line = self.layout(width)
+        old = self.cells.ljust(width)[:width]
+        runs: list[list[int]] = []
+        for x in range(width):
+            if line[x] == old[x]:
+                continue
+            # Join runs separated by a few unchanged cells, one call is cheaper than several
+            if runs and x - runs[-1][1] <= self.gap + 1:
+                runs[-1][1] = x + 1
+            else:
+                runs.append([x, x + 1])
+        for start, end in runs:
+            stdscr.addstr(0, start, line[start:end], attr)
+        self.cells = line
+        return bool(runs)
+
+
 class BonesWriter:
     def __init__(
         self,
@@ -60,7 +1605,15 @@ class BonesWriter:
         config_path: Path | None = None,
         blank_timeout: float | None = None,
         stats_brightness: int | None = None,
+        highlight_spelling: bool | None = None,
+        checkpoint_minutes: float | None = None,
+        checkpoint_words: int | None = None,
+        goal_words: int | None = None,
+        goal_minutes: float | None = None,
+        goal_wpm: int | None = None,
     ) -> None:
+        init_start = time.perf_counter()
+        self.timings: dict[str, float] = {}  # internal phase durations in seconds, exported as metrics
         self.running = True
         now = datetime.now()
 
@@ -74,11 +1627,18 @@ class BonesWriter:
         else:
             self.dir = Path(self.config["directory"])
 
-        self.db_path = Path.joinpath(self.dir, ".bones_database.json")
         # Ensure the directory exists
         self.dir.mkdir(parents=True, exist_ok=True)
-        self.db = TinyDB(self.db_path)
-        self.stats_table = self.db.table("sessions")
+        self.stats_table = SessionTable(self.dir, self.config["host"] or machine_name())
+        self.db_path = self.stats_table.legacy_path
+        self.archive = SessionArchive(self.dir)
+        self.git_lock = FileLock(Path.joinpath(self.dir, ".bones_git.lock"))
+        self.checkpoints: CheckpointWorker | None = None
+        self.checkpoint_time = time.time()
+        self.checkpoint_word_count = 0
+        # Local to this machine and not committed, so it never dirties the repository
+        self.metrics_path = Path.joinpath(self.dir, ".bones_metrics.json")
+        self.vocabulary_path = Path.joinpath(self.dir, ".bones_vocabulary.json")
 
         if blank_timeout is not None:
             self.config["blank_timeout"] = blank_timeout
@@ -86,12 +1646,41 @@ class BonesWriter:
         if stats_brightness is not None:
             self.config["stats_brightness"] = stats_brightness
 
+        if highlight_spelling is not None:
+            self.config["highlight_spelling"] = highlight_spelling
+
+        if checkpoint_minutes is not None:
+            self.config["checkpoint_minutes"] = checkpoint_minutes
+
+        if checkpoint_words is not None:
+            self.config["checkpoint_words"] = checkpoint_words
+
+        if goal_words is not None:
+            self.config["goal_words"] = goal_words
+
+        if goal_minutes is not None:
+            self.config["goal_minutes"] = goal_minutes
+
+        if goal_wpm is not None:
+            self.config["goal_wpm"] = goal_wpm
+
+        # An unknown language would otherwise only fail when the finished session is checked
+        self.check_languages()
+
+        # Hostage mode holds on to the keyboard until the goal is met
+        self.goal: SessionGoal | None = None
+        if any(self.config[key] is not None for key in ("goal_words", "goal_minutes", "goal_wpm")):
+            self.goal = SessionGoal(self.config["goal_words"], self.config["goal_minutes"], self.config["goal_wpm"])
+
         self.filename = now.strftime("%Y-%m-%d_%H-%M-%S") + ".Rmd"
         self.filepath = Path.joinpath(self.dir, self.filename)
 
         # I am tracking sub-second time in case I want to do something with average time per keypress
         self.start_time = time.time_ns()
-        self.elapsed = ""
+        self.engine = SessionEngine(start_ns=self.start_time)
+        # Preset names skip the prompt at the end of the session
+        self.category: str | None = None
+        self.title: str | None = None
         try:
             os.mkdir(self.dir)
         except FileExistsError:
@@ -101,45 +1690,130 @@ class BonesWriter:
         self.margin_bottom = self.margin_top
         self.margin_sides = 6
 
-        # used to track when new words start for live word count
-        self.in_word = False
-        self.live_word_count = 0
-
         # Text fading related variables
         self.last_keypress_time = time.time()
         self.blank = False
         self.text_content: list[tuple[str, int, int, int]] = []  # (char, y, x, color_pair)
+        self.columns = array("I")  # display column of each character within its logical line
         self.current_line = 0
         self.current_col = 0
         self.current_fade_step = 0
         self.last_fade_time = time.time()
 
+        # Logical line index used to reflow only the visible text after a resize or scroll
+        self.line_starts: list[int] = [0]  # index in text_content where each logical line begins
+        self.visible_start = 0  # index in text_content of the first character on screen
+        self.win_height = 0
+        self.win_width = 0
+
+        # Live stats in the top right corner
+        self.git_state = ""  # short git sync state shown in the status bar
+        self.status = StatusBar(self.status_widgets())
+
+        # Live misspelling highlighting, looked up on a worker thread
+        self.spell_highlighter = SpellHighlighter() if self.config["highlight_spelling"] else None
+        self.word_start: int | None = None  # index in text_content where the current word began
+        self.misspelled: set[int] = set()  # indices in text_content of misspelled characters
+        self.history_trimmed = 0  # characters dropped from the start of text_content by trim_history()
+        self.memprofile: MemoryProfile | None = None
+
+        # A running `bones_writer daemon` keeps the dictionary and repository warm between sessions
+        self.language: str | None = None  # overrides the category's dictionary for this session
+        self.daemon: DaemonClient | None = DaemonClient(directory=self.dir)
+
+        # The daemon already has the repository open, so only the path of its root is needed here
+        self._repo: "git.Repo | None | object" = UNSET
+        self.daemon_repo_root: str | None | object = UNSET  # the root the daemon reported, None if not in a repo
+        response = self.daemon.request("repo")
+        if response is not None:
+            self.daemon_repo_root = response["result"]
+        else:
+            self.discover_repo()
+
+        self.timings["startup"] = time.perf_counter() - init_start
+
+    def discover_repo(self) -> None:
         """Check if the given path is within a git repository."""
+        import git
 
         try:
-            self.repo = git.Repo(self.dir, search_parent_directories=True)
-            print("Using git repository")
+            self._repo = git.Repo(self.dir, search_parent_directories=True)
+            print("Using git repository", file=sys.stderr)
         except git.InvalidGitRepositoryError:
-            self.repo = None
+            self._repo = None
+
+    @property
+    def repo(self) -> "git.Repo | None":
+        """The git repository holding the session directory, opened on first use when the daemon is running."""
+        if self._repo is UNSET:
+            self.discover_repo()
+        return self._repo
+
+    @repo.setter
+    def repo(self, repo: "git.Repo | None") -> None:
+        self._repo = repo
+
+    def repo_root(self) -> Path | None:
+        """Return the root of the repository holding the session directory, without opening it if the daemon knows."""
+        if self._repo is UNSET and self.daemon_repo_root is not UNSET:
+            return None if self.daemon_repo_root is None else Path(self.daemon_repo_root)
+        return None if self.repo is None else Path(self.repo.working_dir)
+
+    # The live stats are kept by the engine, these keep the writer's attributes working
+    @property
+    def outfile(self) -> IO[str] | None:
+        return self.engine.outfile
+
+    @outfile.setter
+    def outfile(self, outfile: IO[str] | None) -> None:
+        self.engine.outfile = outfile
+
+    @property
+    def in_word(self) -> bool:
+        return self.engine.in_word
+
+    @in_word.setter
+    def in_word(self, in_word: bool) -> None:
+        self.engine.in_word = in_word
+
+    @property
+    def live_word_count(self) -> int:
+        return self.engine.live_word_count
+
+    @live_word_count.setter
+    def live_word_count(self, live_word_count: int) -> None:
+        self.engine.live_word_count = live_word_count
+
+    @contextmanager
+    def timed(self, phase: str) -> Iterator[None]:
+        """Add the time spent in the block to the named phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] = self.timings.get(phase, 0.0) + time.perf_counter() - start
 
     def load_config(self, config_path: Path) -> Dict[str, Any]:
         """Load configuration from file or return defaults if not found."""
-        try:
-            with open(config_path, "r") as f:
-                config = yaml.safe_load(f)
-                return {**DEFAULT_CONFIG, **config}
-        except (FileNotFoundError, yaml.YAMLError):
-            # Create config directory if it doesn't exist
-            config_path.parent.mkdir(parents=True, exist_ok=True)
-            # Write default config
-            with open(config_path, "w") as f:
-                yaml.dump(DEFAULT_CONFIG, f)
-            return DEFAULT_CONFIG
+        config = read_config(config_path)
+        if config is not None:
+            return config
+        # Create config directory if it doesn't exist
+        config_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write default config
+        with open(config_path, "w") as f:
+            yaml.dump(DEFAULT_CONFIG, f)
+        return dict(DEFAULT_CONFIG)
 
     def write_char(self, win: curses.window, char: str) -> None:
-        self.outfile.write(char)
+        self.engine.type_char(char)
 
         y, x = win.getyx()
+        width = char_width(char)
+        if not self.text_content or self.text_content[-1][0] == "\n":
+            self.columns.append(0)
+        else:
+            self.columns.append(self.columns[-1] + char_width(self.text_content[-1][0]))
         self.text_content.append((char, y, x, 2))  # 2 is the first text color pair (full brightness)
 
         if self.timeout():
@@ -154,40 +1828,115 @@ class BonesWriter:
         if char == "\n":
             self.current_line += 1
             self.current_col = 0
+            self.line_starts.append(len(self.text_content))
         else:
-            self.current_col += 1
+            self.current_col += width
+        self.trim_history()
+
+        # Writing past the last row scrolled the window, so the stored coordinates moved up
+        if self.win_height and y == self.win_height - 1 and (char == "\n" or x + width >= self.win_width):
+            self.layout_tail()
+
+        if self.spell_highlighter is not None:
+            self.track_word()
+
+    def trim_history(self) -> None:
+        """
+        Drop the oldest text from memory once it grows past history_limit characters.
+
+        Only text that is no longer on screen is dropped, whole lines where possible and otherwise
+        whole wrapped rows of a long line, so a session typed without Enter is capped too. A quarter
+        of the limit is let through before trimming again so the cost per keystroke stays constant.
+        """
+        limit = self.config["history_limit"]
+        if not limit or len(self.text_content) <= limit + limit // 4:
+            return
+        target = min(len(self.text_content) - limit, self.visible_start)
+        line = bisect.bisect_right(self.line_starts, target) - 1
+        cut = self.line_starts[line]
+        shift = 0  # display columns dropped from the start of the first remaining line
+        if self.win_width and target > cut:
+            # Cut at the start of the wrapped row holding the target, the rows below keep their wrapping
+            shift = self.columns[target] // self.win_width * self.win_width
+            cut = bisect.bisect_left(self.columns, shift, cut, target + 1)
+        if cut == 0:
+            return
+
+        if shift:
+            line_end = self.line_starts[line + 1] if line + 1 < len(self.line_starts) else len(self.columns)
+            for index in range(cut, line_end):
+                self.columns[index] -= shift
+        del self.text_content[:cut]
+        del self.columns[:cut]  # relative to their line, so they stay valid
+        self.engine.forget(cut)
+        self.line_starts = [0] + [start - cut for start in self.line_starts[line + 1 :]]
+        self.visible_start -= cut
+        if self.word_start is not None:
+            self.word_start = self.word_start - cut if self.word_start >= cut else None
+        self.misspelled = {index - cut for index in self.misspelled if index >= cut}
+        self.history_trimmed += cut
+
+    def track_word(self) -> None:
+        """Queue the word that was just finished for a spelling lookup."""
+        index = len(self.text_content) - 1
+        char = self.text_content[index][0]
+        if char.isalnum() or char == "'":
+            if self.word_start is None:
+                self.word_start = index
+            return
+        if self.word_start is not None:
+            word = "".join(c for c, _, _, _ in self.text_content[self.word_start : index])
+            # Submitted with the absolute position so trimming the history in the meantime is harmless
+            self.spell_highlighter.submit(self.history_trimmed + self.word_start, word)
+            self.word_start = None
+
+    def text_attr(self, index: int, color_pair: int) -> int:
+        """Return the curses attribute for the character at the given text index."""
+        attr = curses.color_pair(color_pair)
+        if index in self.misspelled:
+            attr |= curses.A_UNDERLINE
+        return attr
+
+    def apply_spelling_highlights(self, win: curses.window) -> None:
+        """Underline misspelled words reported by the background worker."""
+        if self.spell_highlighter is None:
+            return
+        results = self.spell_highlighter.results()
+        if not results:
+            return
+
+        cursor_y, cursor_x = win.getyx()
+        for start, word in results:
+            start -= self.history_trimmed
+            end = start + len(word)
+            if start < 0:
+                continue
+            # Skip words that were deleted or retyped while the lookup was pending
+            if "".join(c for c, _, _, _ in self.text_content[start:end]) != word:
+                continue
+            for index in range(start, end):
+                self.misspelled.add(index)
+                if self.blank:
+                    continue
+                _, y, x, color_pair = self.text_content[index]
+                try:
+                    win.chgat(y, x, 1, self.text_attr(index, color_pair))
+                except curses.error:
+                    pass
+        win.move(cursor_y, cursor_x)
+        win.refresh()
 
     def delete_char(self, win: curses.window) -> None:
         """Delete the character before the cursor."""
-        if not self.text_content:
+        if not self.text_content or self.engine.backspace() is None:
             return
 
         # Remove the last character from text content
         char, y, x, color_pair = self.text_content.pop()
-
-        # Update word count if we're deleting a word boundary
-        if char == " " or char == "\n":
-            self.in_word = False
-        elif self.in_word and len(self.text_content) > 0:
-            # Check if we're at the start of a new word (after a space)
-            prev_char = self.text_content[-1][0] if self.text_content else ""
-            if prev_char == " ":
-                self.in_word = False
-        elif not self.in_word and len(self.text_content) > 0:
-            # Check if we're at the start of a word (after a space)
-            prev_char = self.text_content[-1][0] if self.text_content else ""
-            if prev_char == " ":
-                self.in_word = True
-        elif not self.in_word and len(self.text_content) == 0:
-            # If we're deleting the first character, reset word count
-            self.live_word_count = 0
-
-        # Update live word count if we deleted a word boundary
-        if char == " " and self.in_word:
-            self.live_word_count -= 1
-            self.in_word = False
-        elif char == "\n":
-            self.in_word = False
+        self.columns.pop()
+        self.misspelled.discard(len(self.text_content))
+        if self.word_start is not None and self.word_start >= len(self.text_content):
+            self.word_start = None
 
         # Move cursor to deleted character position and clear it
         win.move(y, x)
@@ -203,10 +1952,11 @@ class BonesWriter:
 
         # Update current position
         if char == "\n":
+            self.line_starts.pop()
             self.current_line -= 1
             self.current_col = 0
         else:
-            self.current_col -= 1
+            self.current_col -= char_width(char)
 
     def blank_text(self, win: curses.window) -> None:
         # Only run once per fade step
@@ -226,9 +1976,10 @@ class BonesWriter:
             else:
                 # Update color pair for all text
                 new_color_pair = self.current_fade_step + 2
-                for char, y, x, _ in self.text_content:
+                for index in range(self.visible_start, len(self.text_content)):
+                    char, y, x, _ = self.text_content[index]
                     try:
-                        win.addstr(y, x, char, curses.color_pair(new_color_pair))
+                        win.addstr(y, x, char, self.text_attr(index, new_color_pair))
                     except curses.error:
                         pass
                 win.refresh()
@@ -239,9 +1990,10 @@ class BonesWriter:
     def show_text(self, win: curses.window) -> None:
         cursor_y, cursor_x = win.getyx()  # Save cursor position
         win.clear()
-        for char, y, x, color_pair in self.text_content:
+        for index in range(self.visible_start, len(self.text_content)):
+            char, y, x, color_pair = self.text_content[index]
             try:
-                win.addstr(y, x, char, curses.color_pair(2))  # Always show at full brightness
+                win.addstr(y, x, char, self.text_attr(index, 2))  # Always show at full brightness
                 win.refresh()  # Refresh after each character to ensure proper display
             except curses.error:
                 pass  # Handle potential curses errors when writing at window boundaries
@@ -253,12 +2005,16 @@ class BonesWriter:
         """Check if it's time to start fading the text"""
         return time.time() - self.last_keypress_time > self.config["blank_timeout"]
 
-    def make_win(self) -> curses.window:
+    def window_size(self) -> tuple[int, int]:
         # other things will depend on this, not sure if this is the safest location
         self.screen_height, self.screen_width = self.stdscr.getmaxyx()
 
-        win_height = self.screen_height - self.margin_top - self.margin_bottom
-        win_width = self.screen_width - self.margin_sides * 2
+        self.win_height = max(1, self.screen_height - self.margin_top - self.margin_bottom)
+        self.win_width = max(1, self.screen_width - self.margin_sides * 2)
+        return self.win_height, self.win_width
+
+    def make_win(self) -> curses.window:
+        win_height, win_width = self.window_size()
         win_x = self.margin_sides
         win_y = self.margin_top
 
@@ -266,34 +2022,129 @@ class BonesWriter:
 
         return win
 
-    def status_bar(self, stdscr: curses.window, raw_string: str | int, gap: int) -> None:
-        string = str(raw_string)
+    def layout_tail(self) -> tuple[int, int]:
+        """
+        Recompute screen coordinates for the text that fits in the window.
+
+        Logical lines are wrapped from the bottom up using the line index and the display column
+        of each character, so the cost is bounded by the window size rather than the length of the
+        session, whatever the width of the characters.
+
+        Returns:
+            tuple[int, int]: The cursor position after the last character.
+        """
+        end = len(self.text_content)
+        rows_left = self.win_height
+        line = len(self.line_starts) - 1
+        visible: list[tuple[int, int, int, int]] = []  # (start, stop, skipped rows, rows), bottom up
+        while line >= 0 and rows_left > 0:
+            start = self.line_starts[line]
+            stop = self.line_starts[line + 1] - 1 if line + 1 < len(self.line_starts) else end
+            # curses moves to the next row after filling the last column, hence the extra row
+            rows = self.line_width(start, stop) // self.win_width + 1
+            skip = max(0, rows - rows_left)
+            visible.append((start, stop, skip, rows - skip))
+            rows_left -= rows - skip
+            line -= 1
+
+        y = 0
+        cursor = (0, 0)
+        for start, stop, skip, rows in reversed(visible):
+            first = bisect.bisect_left(self.columns, skip * self.win_width, start, stop)
+            # include the line's newline character, which sits after its last visible character
+            for index in range(first, min(stop + 1, end)):
+                char, _, _, color_pair = self.text_content[index]
+                col = self.columns[index]
+                self.text_content[index] = (char, y + col // self.win_width - skip, col % self.win_width, color_pair)
+            length = self.line_width(start, stop)
+            cursor = (y + length // self.win_width - skip, length % self.win_width)
+            y += rows
+
+        top_start, top_stop, top_skip, _ = visible[-1]
+        self.visible_start = bisect.bisect_left(self.columns, top_skip * self.win_width, top_start, top_stop)
+        return cursor
+
+    def line_width(self, start: int, stop: int) -> int:
+        """Return the display width of the logical line from start up to, not including, stop."""
+        if stop <= start:
+            return 0
+        return self.columns[stop - 1] + char_width(self.text_content[stop - 1][0])
+
+    def reflow(self, win: curses.window) -> None:
+        """Wrap and redraw the visible text for the current window size."""
+        cursor_y, cursor_x = self.layout_tail()
+        win.clear()
+        if not self.blank:
+            for index in range(self.visible_start, len(self.text_content)):
+                char, y, x, _ = self.text_content[index]
+                try:
+                    win.addstr(y, x, char, self.text_attr(index, 2))
+                except curses.error:
+                    pass
+        win.move(cursor_y, cursor_x)
+        win.refresh()
 
-        # start from top right stacking strings
-        self.status_y -= gap + len(string)
-        stdscr.addstr(0, self.status_y, string, curses.color_pair(GRAY_PAIR))
+    def handle_resize(self, win: curses.window) -> None:
+        """Resize the writing window to the new terminal size and reflow the text into it."""
+        win_height, win_width = self.window_size()
+        win.resize(win_height, win_width)
+        self.stdscr.clear()
+        self.stdscr.refresh()
+        self.status.invalidate()  # the screen was cleared, redraw at the new width
+        self.reflow(win)
+
+    def status_widgets(self) -> list[StatusWidget]:
+        """Return the status bar widgets, from the top right corner leftwards."""
+        return [
+            StatusWidget("timer", lambda: str(timedelta(seconds=self.elapsed_seconds())), 1.0),
+            StatusWidget("words", lambda: f"Words: {self.live_word_count}", 0.1),
+            StatusWidget("wpm", lambda: f"WPM: {self.live_wpm()}", 1.0),
+            StatusWidget("goal", self.goal_text, 0.5),
+            StatusWidget("streak", self.streak_text, 300.0),
+            StatusWidget("git", lambda: self.git_state, 1.0),
+            StatusWidget("memory", self.memory_text, 5.0),
+        ]
+
+    def goal_text(self) -> str:
+        if self.goal is None:
+            return ""
+        return self.goal.progress_text(self.live_word_count, self.elapsed_seconds())
+
+    def goal_met(self) -> bool:
+        """Return True if there is no goal or it has been reached."""
+        return self.goal is None or self.goal.met(self.live_word_count, self.elapsed_seconds())
+
+    def memory_text(self) -> str:
+        if self.memprofile is None:
+            return ""
+        return self.memprofile.status_text(len(self.engine.keylog))
+
+    def live_wpm(self) -> int:
+        try:
+            return int(self.live_word_count / (self.elapsed_seconds() / 60))
+        except ZeroDivisionError:
+            return 0
+
+    def current_streak(self, goals_only: bool = False) -> int:
+        """Return the number of consecutive days with a session (that met its goal), ending today or yesterday."""
+        days = {session["timestamp"][:10] for session in self.stats_table if not goals_only or session.get("goal_met")}
+        return streak_length(days, datetime.now().date())
+
+    def streak_text(self) -> str:
+        if self.goal is not None:
+            streak = self.current_streak(goals_only=True)
+            return f"Goal streak: {streak}" if streak else ""
+        streak = self.current_streak()
+        return f"Streak: {streak}" if streak else ""
 
     def update_status_bar(self, stdscr: curses.window, win: curses.window) -> None:
-        delta = self.elapsed_seconds()
-        if self.elapsed != delta:
-            self.status_y = self.screen_width
-            self.elapsed = delta
-            timer = str(timedelta(seconds=delta))
-            try:
-                wpm = int(self.live_word_count / (delta / 60))
-            except ZeroDivisionError:
-                wpm = 0
-            cursor_y, cursor_x = win.getyx()
-            stdscr.addstr(0, 0, " " * self.screen_width)
-            self.status_bar(stdscr, timer, 2)
-            self.status_bar(stdscr, self.live_word_count, 2)
-            self.status_bar(stdscr, "Words:", 1)
-            self.status_bar(stdscr, wpm, 2)
-            self.status_bar(stdscr, "WPM:", 1)
+        cursor_y, cursor_x = win.getyx()
+        if self.status.render(stdscr, self.screen_width, time.time(), curses.color_pair(GRAY_PAIR)):
             win.move(cursor_y, cursor_x)
             stdscr.refresh()
 
-    def sanitize_path(self, title: str) -> str:
+    @staticmethod
+    def sanitize_path(title: str) -> str:
         # Replace spaces with underscores
         title = title.replace(" ", "_")
         # Remove any non-alphanumeric characters except underscores
@@ -322,49 +2173,83 @@ class BonesWriter:
         shutil.move(self.filepath, new_filepath)
         self.filepath = new_filepath
 
-    def check_spelling(self) -> int:
-        """Check the spelling of words in the file and return the percentage of correctly spelled words."""
-        spell = SpellChecker()
-
-        # Read the file content
-        with open(self.filepath, "r") as file:
-            content = file.read()
-
-        # Split content into words and filter out non-word characters
-        words = re.findall(r"\b\w+\b", content.lower())
-
-        if not words:
-            return 0  # Return 0% if no words found
+    def check_languages(self) -> None:
+        """Replace unknown spelling languages in the config with the default language, with a warning."""
+        supported = spelling_languages()
+        if self.config["language"] not in supported:
+            print(
+                f"Unknown spelling language {self.config['language']!r}, using {DEFAULT_CONFIG['language']!r}",
+                file=sys.stderr,
+            )
+            self.config["language"] = DEFAULT_CONFIG["language"]
+        languages = {}
+        for category, language in self.config["languages"].items():
+            if language in supported:
+                languages[category] = language
+            else:
+                print(
+                    f"Unknown spelling language {language!r} for {category}, using {self.config['language']!r}",
+                    file=sys.stderr,
+                )
+        self.config["languages"] = languages
 
-        # Find misspelled words
-        misspelled = spell.unknown(words)
+    def language_for(self, category: str | None) -> str:
+        """
+        Return the spelling language of a session: the one chosen for the session, else the
+        category's from the `languages` config, else the default `language`.
+        """
+        if self.language is not None:
+            return self.language
+        if category is not None:
+            # Category directories are sanitized, so match names the way they end up on disk
+            languages = {self.sanitize_path(name).lower(): lang for name, lang in self.config["languages"].items()}
+            if self.sanitize_path(category).lower() in languages:
+                return languages[self.sanitize_path(category).lower()]
+        return self.config["language"]
+
+    def check_spelling(self, path: Path | None = None, language: str | None = None) -> int:
+        """Check the spelling of words in the file and return the percentage of correctly spelled words."""
+        if path is None:
+            path = self.filepath
+        if language is None:
+            language = self.language_for(self.category)
 
-        # Calculate percentage of correctly spelled words
-        total_words = len(words)
-        correct_words = total_words - len(misspelled)
-        percentage = int((correct_words / total_words) * 100)
+        if self.daemon is not None:
+            response = self.daemon.request("spelling", path=str(path), language=language)
+            if response is not None:
+                return response["result"]
 
-        return percentage
+        with open(path, "r", encoding="utf-8") as file:
+            return spelling_accuracy(file, load_dictionary(language))
 
     def cleanup(self) -> None:
         diff_seconds = self.elapsed_seconds()
         humanize.precisedelta(diff_seconds)
 
-        word_count = 0
-        with open(self.filepath, "r") as file:
-            for line in file:
-                words = line.split()
-                word_count += len(words)
+        with self.timed("cleanup_word_count"):
+            with open(self.filepath, "r", encoding="utf-8") as file:
+                text_stats = TextStatistics.from_lines(file)
+            readability = text_stats.metrics()
+            word_count, frequencies = text_stats.word_count, text_stats.frequencies
 
-        wpm = int(word_count / (diff_seconds / 60.0))
-        spelling_percentage = self.check_spelling()
+        wpm = int(word_count / (diff_seconds / 60.0)) if diff_seconds else 0
+        with self.timed("cleanup_grammar"):
+            grammar_error_rate = self.engine.finish()
 
         print(f"Session time: {humanize.precisedelta(diff_seconds)}")
         print(f"Words: {word_count}")
         print(f"WPM: {wpm}")
-        print(f"Spelling accuracy: {spelling_percentage}%")
-
-        category, title = self.prompt_name()
+        print(f"Grammar errors per sentence: {grammar_error_rate}%")
+        if readability["flesch_reading_ease"] is not None:
+            print(f"Sentences: {readability['sentence_count']}, {readability['mean_sentence_length']} words on average")
+            print(
+                f"Reading ease: {readability['flesch_reading_ease']}, grade level: {readability['flesch_kincaid_grade']}"
+            )
+
+        if self.category is not None or self.title is not None:
+            category, title = self.category or "uncategorized", self.title or "untitled"
+        else:
+            category, title = self.prompt_name()
 
         # If both category and title are empty, move file to trash directory and return
         if category is None and title is None:
@@ -376,14 +2261,28 @@ class BonesWriter:
             trash_filename = f"{int(time.time())}_{self.filepath.name}"
             trash_filepath = Path.joinpath(trash_dir, trash_filename)
             shutil.move(self.filepath, trash_filepath)
+            if self.keylog_path().exists():
+                shutil.move(self.keylog_path(), trash_filepath.with_suffix(".keys"))
+            if self.checkpoints is not None:
+                self.checkpoints.discard()
             print(f"\nNo category or title provided. File moved to trash: {trash_filepath}")
             return
 
-        self.rename_file(category, title)  # updates self.filepath
-        self.add_title(self.filepath, title)
+        # The category picks the dictionary, so spelling is only checked once it is known
+        language = self.language_for(category)
+        with self.timed("cleanup_spelling"):
+            spelling_percentage = self.check_spelling(language=language)
+        print(f"Spelling accuracy: {spelling_percentage}%")
+
+        with self.timed("cleanup_file"):
+            keylog_path = self.keylog_path()
+            self.rename_file(category, title)  # updates self.filepath
+            self.add_title(self.filepath, title)
+            if keylog_path.exists():
+                shutil.move(keylog_path, self.keylog_path())
         print(f"\nFile written to: {self.filepath}")
 
-        # Store session data in TinyDB
+        # Append session data to this machine's shard
         session_data = {
             "timestamp": datetime.now().isoformat(),
             "filepath": str(self.relative_filepath(self.filepath)),
@@ -391,24 +2290,103 @@ class BonesWriter:
             "word_count": word_count,
             "wpm": wpm,
             "spelling_accuracy": spelling_percentage,
+            "grammar_error_rate": grammar_error_rate,
+            "language": language,
+            **readability,
         }
-        self.stats_table.insert(session_data)
+        if self.goal is not None:
+            session_data["goal_met"] = self.goal_met()
+        with self.timed("cleanup_database"):
+            shards = self.stats_table.signature()
+            self.stats_table.insert(session_data)
+        with self.timed("cleanup_vocabulary"):
+            self.record_vocabulary(session_data, frequencies)
+
+        with self.timed("git_push"):
+            files = [self.filepath, self.stats_table.path]
+            if self.keylog_path().exists():
+                files.append(self.keylog_path())
+            self.git_commit_and_push(files, f"{category}: {title}")
+        # The real commit supersedes the work in progress snapshots
+        if self.checkpoints is not None:
+            self.checkpoints.discard()
+
+        self.record_metrics(session_data, shards)
+
+    def record_metrics(self, session_data: dict[str, Any], shards: dict[str, list[int]] | None = None) -> None:
+        """
+        Fold the finished session and this run's timings into the metrics aggregates.
 
-        self.git_commit_and_push([self.filepath, self.db_path], f"{category}: {title}")
+        Args:
+            session_data (dict[str, Any]): The row just inserted.
+            shards (dict[str, list[int]] | None): The shard signature from before the insert. If the
+                aggregates were up to date with it they are marked up to date with the new one.
+        """
+        with self.stats_table.lock.hold():
+            metrics = SessionMetrics(self.metrics_path)
+            metrics.add_session(session_data)
+            metrics.add_timings(self.timings)
+            if shards is not None and metrics.data["shards"] == shards:
+                metrics.data["shards"] = self.stats_table.signature()
+            metrics.save()
+
+        textfile = self.config["metrics_textfile"]
+        if textfile:
+            # The textfile collector may read at any time, so it only ever sees a complete file
+            path = Path(textfile).expanduser()
+            temporary_path = path.with_name(f".{path.name}.tmp")
+            with open(temporary_path, "w") as file:
+                file.write(metrics.to_openmetrics())
+            os.replace(temporary_path, path)
+
+    def load_metrics(self) -> SessionMetrics:
+        """Return the metrics aggregates, rebuilding them if sessions were added elsewhere (e.g. pulled from git)."""
+        metrics = SessionMetrics(self.metrics_path)
+        shards = self.stats_table.signature()
+        if metrics.data["shards"] != shards:
+            metrics.rebuild(self.stats_table)
+            metrics.data["shards"] = shards
+            metrics.save()
+        return metrics
+
+    def record_vocabulary(self, session_data: dict[str, Any], frequencies: dict[str, int]) -> None:
+        """Fold the finished session's word frequencies into the vocabulary counters."""
+        with self.stats_table.lock.hold():
+            vocabulary = VocabularyIndex(self.vocabulary_path)
+            vocabulary.add_session(session_data["filepath"], session_data["timestamp"], frequencies)
+            vocabulary.save()
+
+    def load_vocabulary(self) -> VocabularyIndex:
+        """Return the vocabulary counters, counting any sessions they are missing (e.g. older or pulled from git)."""
+        with self.stats_table.lock.hold():
+            vocabulary = VocabularyIndex(self.vocabulary_path)
+            known = vocabulary.data["sessions"]
+            missing = [
+                session for session in self.stats_table if "filepath" in session and session["filepath"] not in known
+            ]
+            for session in missing:
+                try:
+                    _, frequencies = word_frequencies(self.read_session_body(self.session_path(session)))
+                except FileNotFoundError:
+                    frequencies = Counter()  # recorded empty so it is not looked for again
+                vocabulary.add_session(session["filepath"], session["timestamp"], frequencies)
+            if missing:
+                vocabulary.save()
+        return vocabulary
 
     def add_title(self, path: Path, title: str) -> None:
         # Add title to the top of the file
-        # There may be a more efficient method
-
-        with open(path, "r") as file:
-            content = file.read()
-
-        with open(self.filepath, "w") as file:
-            file.write(f"## {title}\n\n{content}")
+        # The content is copied in chunks into a new file, so long sessions are never held in memory
+        temporary_path = self.filepath.with_name(f".{self.filepath.name}.tmp")
+        with open(path, "r", encoding="utf-8") as file, open(temporary_path, "w", encoding="utf-8") as new_file:
+            new_file.write(f"## {title}\n\n")
+            shutil.copyfileobj(file, new_file)
+        os.replace(temporary_path, self.filepath)
 
     def prompt_name(self) -> tuple[str | None, str | None]:
         # Set up tab completion for categories
-        categories = [d.name for d in self.dir.iterdir() if d.is_dir()]
+        # Dot directories hold the sessions table, its backup and the archive, not sessions
+        categories = [d.name for d in self.dir.iterdir() if d.is_dir() and not d.name.startswith(".")]
         completer = CategoryCompleter(categories)
         readline.set_completer(completer.complete)
         readline.parse_and_bind("tab: complete")
@@ -429,37 +2407,45 @@ class BonesWriter:
 
         return category, title
 
+    def interrupt(self) -> None:
+        """Handle Ctrl-C: end the session, unless hostage mode is holding on until the goal is met."""
+        if self.goal_met():
+            self.running = False
+
     def inner_loop(self, win: curses.window) -> None:
         try:
-            key = win.getch()
+            key = win.get_wch()
         except KeyboardInterrupt:
-            self.running = False
+            self.interrupt()
             return
+        except curses.error:  # no input waiting
+            key = -1
 
         if key == -1:
             if self.timeout():
                 self.blank_text(win)
             return
 
-        if key == ord(" "):  # Space key
-            self.in_word = False
-            self.write_char(win, " ")
-        elif key == 10 or key == 13:  # Enter key (ASCII 10 or 13)
-            self.in_word = False
-            self.write_char(win, "\n")
-        elif key == 127 or key == 8:  # Backspace key
+        if key in (3, "\x03"):  # Ctrl-C read as a key in raw mode
+            self.interrupt()
+        elif key in (127, 8, "\x7f", "\b", curses.KEY_BACKSPACE):  # Backspace key
             self.delete_char(win)
-        elif 32 <= key <= 126:  # Printable ASCII characters
-            if self.in_word is False:
-                self.live_word_count += 1
-            self.in_word = True
-            self.write_char(win, f"{chr(key)}")
+        elif key == curses.KEY_RESIZE:
+            self.handle_resize(win)
+        else:
+            char = SessionEngine.key_to_char(key)
+            if char is not None:
+                self.write_char(win, char)
 
     def curses_loop(self, stdscr: curses.window) -> None:
         stdscr.clear()
         stdscr.refresh()
 
         stdscr.timeout(50)
+        if self.goal is not None:
+            # Hostage mode: Ctrl-C arrives as a key between keystrokes rather than as a signal
+            # that could land halfway through updating the text
+            curses.raw()
 
         curses.start_color()
         # Initialize stats color
@@ -490,14 +2476,56 @@ class BonesWriter:
 
         win = self.make_win()
         win.scrollok(True)
-        win.nodelay(True)  # Make getch() non-blocking on writing window
+        win.nodelay(True)  # Make get_wch() non-blocking on writing window
 
-        with open(self.filepath, "a") as outfile:
+        with open(self.filepath, "a", encoding="utf-8") as outfile:
             # Is this bad practice?
             self.outfile = outfile
+            if self.spell_highlighter is not None:
+                self.spell_highlighter.language = self.language_for(self.category)
+                self.spell_highlighter.start()
+            self.start_checkpoints()
             while self.running:
                 self.inner_loop(win)
+                self.apply_spelling_highlights(win)
+                self.maybe_checkpoint()
                 self.update_status_bar(stdscr, win)
+            if self.spell_highlighter is not None:
+                self.spell_highlighter.stop()
+            if self.checkpoints is not None:
+                self.checkpoints.stop()
+        self.engine.keylog.save(self.keylog_path())
+
+    def start_checkpoints(self) -> None:
+        """Set up background checkpoint commits if they are enabled and there is a repository."""
+        if not (self.config["checkpoint_minutes"] or self.config["checkpoint_words"]) or self.repo_root() is None:
+            return
+        self.checkpoints = CheckpointWorker(
+            self.repo, self.filepath, self.git_lock, self.timings, push=self.config["checkpoint_push"]
+        )
+        self.checkpoint_time = time.time()
+
+    def maybe_checkpoint(self) -> None:
+        """Hand a snapshot to the checkpoint worker once enough time has passed or words were written."""
+        if self.checkpoints is None:
+            return
+        minutes = self.config["checkpoint_minutes"]
+        words = self.config["checkpoint_words"]
+        now = time.time()
+        due = (minutes and now - self.checkpoint_time >= minutes * 60) or (
+            words and self.live_word_count - self.checkpoint_word_count >= words
+        )
+        if not due:
+            return
+        self.outfile.flush()  # the worker snapshots the file as it is on disk
+        self.checkpoint_time = now
+        self.checkpoint_word_count = self.live_word_count
+        self.git_state = "checkpoint"
+        self.checkpoints.request()
+
+    def keylog_path(self) -> Path:
+        """Return the path of the keystroke log stored next to the session file."""
+        return self.filepath.with_suffix(".keys")
 
     def seconds(self, ns: int) -> int:
         # convert nanoseconds from time_ns to seconds
@@ -513,59 +2541,31 @@ class BonesWriter:
         curses.wrapper(self.curses_loop)
         self.cleanup()
 
-    def plot_writing_stats(self, time_delta_days: int) -> None:
+    def main_stdin(self, stream: IO[str]) -> None:
+        """Run a session from piped text instead of the keyboard, naming it without prompting."""
+        self.pause_on_dirty_repo()
+        if self.category is None and self.title is None:
+            self.category = "uncategorized"
+        with open(self.filepath, "a", encoding="utf-8") as outfile:
+            self.outfile = outfile
+            self.engine.feed_stream(stream)
+        self.cleanup()
+
+    def plot_writing_stats(self, time_delta_days: int, readability: bool = False) -> None:
         """
         Query the database for writing sessions within the specified time range and plot the data.
         Only includes sessions with word counts >= 100.
 
         Args:
             time_delta_days (int): Number of days to look back for writing sessions.
+            readability (bool): Plot sentence and readability metrics instead of the session stats.
         """
         # Query the database for sessions after the cutoff time with word count >= 100
         sessions = self.query_high_word_count_sessions(time_delta_days)
-
-        if not sessions:
-            print("No writing sessions with 100+ words found in the specified time range.")
-            return
-
-        # Extract data for plotting
-        timestamps = [datetime.fromisoformat(session["timestamp"]) for session in sessions]
-        durations = [session["duration_seconds"] / 60 for session in sessions]  # Convert to minutes
-        word_counts = [session["word_count"] for session in sessions]
-        wpms = [session["wpm"] for session in sessions]
-        spelling_accuracies = [session["spelling_accuracy"] for session in sessions]
-
-        # Create a figure with subplots
-        fig, (ax1, ax2, ax3, ax4) = plt.subplots(4, 1, figsize=(10, 12))
-        fig.suptitle(f"Writing Stats for the Last {time_delta_days} Days (100+ words only)")
-
-        # Plot duration
-        ax1.plot(timestamps, durations, marker="o", color="b")
-        ax1.set_ylabel("Duration (min)")
-        ax1.grid(True)
-
-        # Plot word count
-        ax2.plot(timestamps, word_counts, marker="o", color="g")
-        ax2.set_ylabel("Word Count")
-        ax2.grid(True)
-
-        # Plot WPM
-        ax3.plot(timestamps, wpms, marker="o", color="r")
-        ax3.set_ylabel("WPM")
-        ax3.grid(True)
-
-        # Plot spelling accuracy
-        ax4.plot(timestamps, spelling_accuracies, marker="o", color="m")
-        ax4.set_ylabel("Spelling Accuracy (%)")
-        ax4.grid(True)
-
-        # Rotate x-axis labels for better readability
-        for ax in [ax1, ax2, ax3, ax4]:
-            plt.sca(ax)
-            plt.xticks(rotation=45)
-
-        plt.tight_layout()
-        plt.show()
+        if readability:
+            plot_readability(sessions, time_delta_days)
+        else:
+            plot_sessions(sessions, time_delta_days)
 
     def query_high_word_count_sessions(self, time_delta_days: int) -> list[dict[str, Any]]:
         """
@@ -581,16 +2581,51 @@ class BonesWriter:
         cutoff_time = datetime.now() - timedelta(days=time_delta_days)
 
         # Query the database for sessions after the cutoff time and with word count >= 100
-        WritingSession = Query()
-        sessions = self.stats_table.search(
-            (WritingSession.timestamp >= cutoff_time.isoformat()) & (WritingSession.word_count >= 100)
-        )
+        return list(self.query_sessions(since=cutoff_time, min_words=100))
+
+    SORT_KEYS = (
+        "timestamp",
+        "word_count",
+        "duration_seconds",
+        "wpm",
+        "spelling_accuracy",
+        "grammar_error_rate",
+        *READABILITY_KEYS,
+    )
 
-        return sessions
+    def query_sessions(
+        self,
+        category: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        min_words: int | None = None,
+        min_duration: float | None = None,
+        goal_met: bool | None = None,
+        sort: str = "timestamp",
+        descending: bool = False,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Yield sessions from the sessions table matching every given filter, see query_sessions()."""
+        return query_sessions(
+            self.stats_table,
+            category=category,
+            since=since,
+            until=until,
+            min_words=min_words,
+            min_duration=min_duration,
+            goal_met=goal_met,
+            sort=sort,
+            descending=descending,
+            offset=offset,
+            limit=limit,
+        )
 
     def pause_on_dirty_repo(self) -> None:
         error: str | None = self.check_repo_status()
         if error is None:
+            if self.repo_root() is not None:
+                self.git_state = "synced"
             return
         print(error)
         exit(1)
@@ -603,30 +2638,42 @@ class BonesWriter:
         Returns:
             str: A message indicating the status of the repository.
         """
-        if self.repo is None:
+        import git
+
+        # Decided without opening the repository, which only the in-process fallback below needs
+        if self.repo_root() is None:
             # return "No Git repository found."
             return None
 
+        if self.daemon is not None:
+            response = self.daemon.request("status")
+            if response is not None:
+                return response["result"]
+
         try:
-            # Check for uncommitted changes (staged or unstaged)
-            if self.repo.is_dirty(untracked_files=False):
+            # Check for uncommitted changes (staged or unstaged), only under the bones directory
+            # since the repository may be a much larger parent, e.g. a home directory
+            if self.repo.is_dirty(untracked_files=False, path=self.git_pathspec()):
                 return "There are uncommitted changes in the working tree."
 
-            # Fetch the latest changes from the remote
-            for remote in self.repo.remotes:
-                remote.fetch()
-
-            # Get the active branch
+            # Get the active branch and the remote branch it tracks
             active_branch = self.repo.active_branch
-            remote_name = f"origin/{active_branch.name}"
+            tracking_branch = active_branch.tracking_branch()
 
             # Check if the remote branch exists
-            if remote_name not in self.repo.refs:
-                return f"Remote branch '{remote_name}' does not exist."
+            if tracking_branch is None:
+                return f"Branch '{active_branch.name}' has no remote tracking branch."
+
+            # Ask the remote for the tracking branch's commit only, instead of fetching every remote
+            remote_ref = self.repo.git.ls_remote(
+                tracking_branch.remote_name, f"refs/heads/{tracking_branch.remote_head}"
+            )
+            if not remote_ref:
+                return f"Remote branch '{tracking_branch.name}' does not exist."
 
             # Compare the local and remote branches
-            local_commit = self.repo.head.commit
-            remote_commit = self.repo.refs[remote_name].commit
+            local_commit = self.repo.head.commit.hexsha
+            remote_commit = remote_ref.split()[0]
 
             if local_commit == remote_commit:
                 return None
@@ -644,23 +2691,39 @@ class BonesWriter:
             file_paths (list[Path]): The paths of the files to add and commit.
             commit_message (str): The commit message to use.
         """
-        if self.repo is None:
+        import git
+
+        if self.repo_root() is None:
             return None
 
+        if self.daemon is not None:
+            response = self.daemon.request(
+                "commit", files=[str(file_path) for file_path in file_paths], message=commit_message
+            )
+            if response is not None:
+                print("Pushed upstream")
+                return None
+
         try:
-            # Add the files to Git
-            for file_path in file_paths:
-                self.repo.git.add(str(file_path))
+            # Other writers on this directory commit one at a time
+            with self.git_lock.hold():
+                # Add the files to Git, removed files are staged as removals
+                paths = [str(file_path) for file_path in file_paths]
+                self.repo.git.add("--", *paths)
 
-            # Commit the changes
-            self.repo.git.commit("-m", commit_message)
+                # Commit only these files, leaving anything else staged or changed alone
+                self.repo.git.commit("-m", commit_message, "--", *paths)
 
-            # Push the changes to the remote
-            self.repo.git.push()
+                # Push the changes to the remote
+                self.repo.git.push()
             print("Pushed upstream")
         except git.GitCommandError as e:
             raise RuntimeError(f"Failed to commit and push changes: {e}")
 
+    def git_pathspec(self) -> str:
+        """Return the bones directory as a pathspec relative to the repository root, to scope git operations."""
+        return Path(os.path.relpath(Path(self.dir).resolve(), Path(self.repo.working_dir).resolve())).as_posix()
+
     def relative_filepath(self, filepath: Path) -> Path:
         """
         Returns the relative path from the repository root to the file.
@@ -672,14 +2735,842 @@ class BonesWriter:
         Returns:
             Path: The relative path from the repo root or the absolute path.
         """
-        if self.repo is None:
+        root = self.repo_root()
+        if root is None:
+            return filepath
+        return Path(os.path.relpath(filepath, root))
+
+    def session_path(self, session: dict[str, Any]) -> Path:
+        """
+        Returns the absolute path of a session's file, reversing relative_filepath.
+
+        Args:
+            session (dict[str, Any]): A row from the sessions table.
+
+        Returns:
+            Path: The absolute path to the session file.
+        """
+        filepath = Path(session["filepath"])
+        if filepath.is_absolute():
             return filepath
-        return Path(os.path.relpath(filepath, self.repo.working_dir))
+        root = self.repo_root()
+        if root is not None:
+            return Path.joinpath(root, filepath)
+        return Path.joinpath(self.dir, filepath)
+
+    def select_sessions(self, category: str | None = None, since: datetime | None = None) -> list[dict[str, Any]]:
+        """
+        Select sessions from the sessions table in chronological order.
+
+        Args:
+            category (str | None): Only include sessions filed under this category.
+            since (datetime | None): Only include sessions on or after this time.
+
+        Returns:
+            list[dict[str, Any]]: The matching session rows, oldest first.
+        """
+        return [session for session in self.query_sessions(category=category, since=since) if "filepath" in session]
+
+    def read_session_lines(self, path: Path) -> Iterator[str]:
+        """Yield the lines of a session file one at a time, reading archived sessions from their bundle."""
+        try:
+            file = open(path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            text = self.archive.read(os.path.relpath(path, self.dir))
+            if text is None:
+                raise
+            yield from text.splitlines(keepends=True)
+            return
+        with file:
+            yield from file
+
+    def read_session_body(self, path: Path) -> Iterator[str]:
+        """Yield the lines of a session without the title added by add_title(), as cleanup() saw them."""
+        lines = self.read_session_lines(path)
+        first = next(lines, "")
+        if first.startswith("## "):
+            next(lines, None)  # and the blank line after it
+        else:
+            yield first
+        yield from lines
+
+    def backfill_readability(self) -> int:
+        """
+        Compute the readability metrics of sessions recorded before they were tracked, in one database write.
+
+        Returns:
+            int: The number of sessions updated.
+        """
+        updates = {}
+        for session in self.stats_table:
+            if "filepath" not in session or all(key in session for key in READABILITY_KEYS):
+                continue
+            try:
+                updates[session.doc_id] = TextStatistics.from_lines(
+                    self.read_session_body(self.session_path(session))
+                ).metrics()
+            except FileNotFoundError:
+                continue
+        self.stats_table.update_each(updates)
+        return len(updates)
+
+    def archive_sessions(self, months: int) -> tuple[int, int, int]:
+        """
+        Pack sessions older than the given number of months into compressed per-month bundles.
+
+        The packed files are removed from the working tree and the change is committed. Git history keeps the
+        original files, so only the working tree and shallow clones (`git clone --depth 1`) get smaller.
+
+        Args:
+            months (int): Sessions older than this many months are archived.
+
+        Returns:
+            tuple[int, int, int]: Number of sessions archived and their total size before and after compression.
+        """
+        import git
+
+        cutoff = datetime.now() - timedelta(days=30 * months)
+        WritingSession = Query()
+        sessions = self.stats_table.search(WritingSession.timestamp < cutoff.isoformat())
+
+        by_month: dict[str, list[tuple[str, Path]]] = {}
+        for session in sessions:
+            path = self.session_path(session)
+            if not path.exists():
+                continue  # already archived or deleted
+            relative_path = os.path.relpath(path, self.dir)
+            month = SessionArchive.month_of(relative_path) or session["timestamp"][:7]
+            by_month.setdefault(month, []).append((relative_path, path))
+
+        if not by_month:
+            return 0, 0, 0
+
+        # Ask git which sessions it tracks before writing any bundle, so a git failure leaves nothing half done
+        tracked: set[Path] = set()
+        if self.repo is not None:
+            paths = [str(path) for members in by_month.values() for _, path in members]
+            try:
+                listed = self.repo.git.ls_files("-z", "--", *paths)
+            except git.GitCommandError as e:
+                raise RuntimeError(f"Failed to list tracked sessions: {e}")
+            root = Path(self.repo.working_dir).resolve()
+            tracked = {root / name for name in listed.split("\0") if name}
+
+        count = raw_bytes = packed_bytes = 0
+        changed: list[Path] = []
+        removed: list[Path] = []
+        for month, members in sorted(by_month.items()):
+            raw, packed = self.archive.add(month, members)
+            count += len(members)
+            raw_bytes += raw
+            packed_bytes += packed
+            changed += [self.archive.bundle_path(month), self.archive.index_path(month)]
+            removed += [path for _, path in members]
+
+        # Untracked sessions have nothing to commit, their removal is enough
+        removed_tracked = [path for path in removed if path.resolve() in tracked]
+        for path in removed:
+            path.unlink()
+        if self.repo is not None:
+            self.git_commit_and_push(changed + removed_tracked, f"archive: {count} sessions")
+        return count, raw_bytes, packed_bytes
+
+    def session_files(self) -> list[str]:
+        """Return the paths, relative to the session directory, of every session file including archived ones."""
+        paths = [
+            path.relative_to(self.dir).as_posix()
+            for path in self.dir.rglob("*.Rmd")
+            if not any(part.startswith(".") for part in path.relative_to(self.dir).parts)
+        ]
+        for index_path in sorted(self.archive.archive_dir.glob("*.index.json")):
+            paths += self.archive.index(index_path.name.removesuffix(".index.json"))
+        return sorted(path for path in set(paths) if SESSION_FILENAME.search(path))
+
+    def session_commits(self) -> dict[str, tuple[float, str]]:
+        """
+        Return the commit time and message of the commit that added each session file.
+
+        Returns:
+            dict[str, tuple[float, str]]: (unix time, subject) keyed by path relative to the session directory.
+        """
+        if self.repo is None:
+            return {}
+        log = self.repo.git.log(
+            "--reverse", "--diff-filter=A", "--name-only", "--format=%x00%ct %s", "--", self.git_pathspec()
+        )
+        commits: dict[str, tuple[float, str]] = {}
+        root = Path(self.repo.working_dir).resolve()
+        directory = self.dir.resolve()
+        for entry in log.split("\x00")[1:]:
+            header, *names = entry.splitlines()
+            committed, _, subject = header.partition(" ")
+            for name in filter(None, names):
+                relative_path = os.path.relpath(Path.joinpath(root, name), directory)
+                commits.setdefault(Path(relative_path).as_posix(), (float(committed), subject))
+        return commits
+
+    def rebuild_database(self, workers: int | None = None) -> int:
+        """
+        Rebuild the sessions table from the session files and git history, replacing it in one write.
+
+        The git log and the file tree are read concurrently, then the stats of every session are
+        recomputed in a pool of worker processes. The session start comes from the timestamped
+        filename and the end from the commit that added the file (or its modification time). The
+        duration comes from the keystroke log when there is one, otherwise from those two times.
+
+        Args:
+            workers (int | None): Number of worker processes, defaults to the number of CPUs. 1 works in process.
+
+        Returns:
+            int: The number of sessions recovered.
+        """
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            commits_future = pool.submit(self.session_commits)
+            files_future = pool.submit(self.session_files)
+            relative_paths = files_future.result()
+            commits = commits_future.result()
+
+        # Group sessions by language so each worker mostly stays on the dictionaries it has loaded
+        languages = [self.language_for(Path(relative_path).parent.name) for relative_path in relative_paths]
+        relative_paths = [path for _, path in sorted(zip(languages, relative_paths))]
+        tasks = [self.dir] * len(relative_paths), relative_paths, sorted(languages)
+        if workers == 1:
+            results = list(map(recover_session_stats, *tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(recover_session_stats, *tasks, chunksize=16))
+
+        sessions = []
+        for stats, language in zip(results, tasks[2]):
+            if stats is None:
+                continue
+            relative_path = stats["relative_path"]
+            start = datetime.strptime(SESSION_FILENAME.search(relative_path).group(1), "%Y-%m-%d_%H-%M-%S")
+            committed, subject = commits.get(relative_path, (stats["modified"], None))
+            end = datetime.fromtimestamp(committed) if committed is not None else start
+            if stats["keylog_seconds"] is not None:
+                duration = stats["keylog_seconds"]
+            else:
+                duration = max(0.0, (end - start).total_seconds())
+            session = {
+                "timestamp": max(start, end).isoformat(),
+                "filepath": str(self.relative_filepath(Path.joinpath(self.dir, relative_path))),
+                "duration_seconds": duration,
+                "word_count": stats["word_count"],
+                "wpm": int(stats["word_count"] / (duration / 60.0)) if duration else 0,
+                "spelling_accuracy": stats["spelling_accuracy"],
+                "grammar_error_rate": stats["grammar_error_rate"],
+                "language": language,
+                **stats["readability"],
+                "recovered": True,
+            }
+            # Commit messages hold the title as typed, before it was sanitized for the filename
+            title = subject.partition(": ")[2] if subject and ": " in subject else stats["title"]
+            if title:
+                session["title"] = title
+            sessions.append(session)
+        sessions.sort(key=lambda session: session["timestamp"])
+
+        # A corrupted database can not even be read, so keep a copy of what was there
+        if self.db_path.exists():
+            shutil.copy2(self.db_path, self.db_path.with_suffix(".json.bak"))
+        if self.stats_table.dir.exists():
+            shutil.rmtree(self.backup_dir(), ignore_errors=True)
+            shutil.copytree(self.stats_table.dir, self.backup_dir())
+        self.stats_table.replace_all(sessions)
+        return len(sessions)
+
+    def backup_dir(self) -> Path:
+        """Return where rebuild-db keeps the session shards it replaced."""
+        return self.stats_table.dir.with_name(f"{self.stats_table.dir.name}.bak")
+
+    def export_sections(self, sessions: Iterable[dict[str, Any]]) -> Iterator[tuple[str, str, Iterator[str]]]:
+        """
+        Yield (title, timestamp, body lines) for each session, stripping the header written by add_title.
+
+        Each body is read lazily, so it must be consumed before moving on to the next section.
+        """
+        for session in sessions:
+            path = self.session_path(session)
+            lines = self.read_session_lines(path)
+            title = path.stem
+            try:
+                first = next(lines, None)
+            except FileNotFoundError:
+                print(f"Skipping missing session file: {path}", file=sys.stderr)
+                continue
+            if first is not None and first.startswith("## "):
+                title = first[3:].strip()
+                first = next(lines, None)
+                if first is not None and not first.strip():
+                    first = None
+
+            body = itertools.chain([first] if first is not None else [], lines)
+            yield title, session["timestamp"], body
+
+    def export(
+        self, output: Path, export_format: str, category: str | None = None, since: datetime | None = None
+    ) -> int:
+        """
+        Compile the selected sessions into a single document, writing it as it is read.
+
+        Args:
+            output (Path): The file to write.
+            export_format (str): One of md, html or epub.
+            category (str | None): Only include sessions filed under this category.
+            since (datetime | None): Only include sessions on or after this time.
+
+        Returns:
+            int: The number of sessions selected.
+        """
+        sessions = self.select_sessions(category, since)
+        sections = self.export_sections(sessions)
+        if export_format == "epub":
+            write_epub(sections, output, title=category or "Bones")
+        else:
+            chunks = export_markdown(sections) if export_format == "md" else export_html(sections, category or "Bones")
+            with open(output, "w", encoding="utf-8") as outfile:
+                for chunk in chunks:
+                    outfile.write(chunk)
+        return len(sessions)
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """Reads one JSON request line and writes one JSON response line."""
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+        except json.JSONDecodeError as e:
+            response: dict[str, Any] = {"error": f"Invalid request: {e}"}
+        else:
+            response = self.server.bones_daemon.handle(request)
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class BonesDaemon:
+    """
+    Keeps a BonesWriter warm and serves analysis, stats and commit requests over a Unix domain socket.
+
+    Requests are handled one at a time because the sessions table and git handles are not thread safe.
+    """
+
+    def __init__(self, writer: BonesWriter, socket_path: Path = DAEMON_SOCKET) -> None:
+        self.writer = writer
+        self.writer.daemon = None  # never forward requests back to ourselves
+        self.socket_path = socket_path
+        self.server: socketserver.UnixStreamServer | None = None
+        self.lock = threading.Lock()
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        """
+        Run a single request against the warm writer.
+
+        Args:
+            request (dict[str, Any]): The request, with an "op" and its arguments.
+
+        Returns:
+            dict[str, Any]: {"result": ...} on success, {"error": ...} on failure, or a
+            "wrong_directory" status when the client writes to a different directory.
+        """
+        directory = request.get("directory")
+        if directory is not None and Path(directory).resolve() != self.writer.dir.resolve():
+            return {"status": "wrong_directory"}
+
+        op = request.get("op")
+        with self.lock:
+            try:
+                if op == "ping":
+                    result: Any = True
+                elif op == "repo":
+                    result = None if self.writer.repo is None else self.writer.repo.working_dir
+                elif op == "spelling":
+                    result = self.writer.check_spelling(Path(request["path"]), request.get("language"))
+                elif op == "status":
+                    result = self.writer.check_repo_status()
+                elif op == "stats":
+                    # The sessions index notices shards written by other processes on its own
+                    result = self.writer.query_high_word_count_sessions(request["days"])
+                elif op == "commit":
+                    files = [Path(file_path) for file_path in request["files"]]
+                    self.writer.git_commit_and_push(files, request["message"])
+                    result = self.writer.repo is not None
+                else:
+                    return {"error": f"Unknown request: {op}"}
+            except (KeyError, OSError, RuntimeError) as e:
+                return {"error": str(e)}
+        return {"result": result}
+
+    def serve_forever(self) -> None:
+        """Load the dictionary and serve requests until shutdown() is called."""
+        if self.socket_path.exists():
+            if DaemonClient(self.socket_path).request("ping") is not None:
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            self.socket_path.unlink()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+        load_dictionary(self.writer.config["language"])
+        self.server = socketserver.UnixStreamServer(str(self.socket_path), DaemonRequestHandler)
+        self.server.bones_daemon = self
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+
+
+class DaemonClient:
+    """Sends requests to a running `bones_writer daemon`, returning None when it is not available."""
+
+    def __init__(self, socket_path: Path = DAEMON_SOCKET, directory: Path | None = None, timeout: float = 60.0) -> None:
+        self.socket_path = socket_path
+        self.directory = directory
+        self.timeout = timeout
+
+    def request(self, op: str, **kwargs: Any) -> dict[str, Any] | None:
+        """
+        Send a request to the daemon.
+
+        Args:
+            op (str): The request type, one of ping, repo, spelling, status, stats or commit.
+            **kwargs: Arguments for the request.
+
+        Returns:
+            dict[str, Any] | None: The response holding a "result", or None if the caller should
+            do the work in-process.
+
+        Raises:
+            RuntimeError: If the daemon failed to carry out the request.
+        """
+        if not self.socket_path.exists():
+            return None
+
+        payload = {"op": op, **kwargs}
+        if self.directory is not None:
+            payload["directory"] = str(self.directory)
+
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(str(self.socket_path))
+                sock.sendall(json.dumps(payload).encode() + b"\n")
+                with sock.makefile("rb") as response_file:
+                    line = response_file.readline()
+        except OSError:
+            return None
+
+        if not line:
+            return None
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        if "result" not in response:
+            return None
+        return response
+
+
+def export_markdown(sections: Iterable[tuple[str, str, Iterator[str]]]) -> Iterator[str]:
+    """Yield a markdown document with one top level heading per session."""
+    for title, timestamp, body in sections:
+        yield f"# {title}\n\n*{timestamp[:10]}*\n\n"
+        last = "\n"
+        for line in body:
+            yield line
+            last = line
+        yield "\n" if last.endswith("\n") else "\n\n"
+
+
+def html_section(title: str, timestamp: str, body: Iterator[str]) -> Iterator[str]:
+    """Yield the HTML for one session, one paragraph per line of text."""
+    yield f"<section>\n<h1>{html.escape(title)}</h1>\n<p><em>{timestamp[:10]}</em></p>\n"
+    for line in body:
+        if line.strip():
+            yield f"<p>{html.escape(line.rstrip())}</p>\n"
+    yield "</section>\n"
+
+
+def export_html(sections: Iterable[tuple[str, str, Iterator[str]]], title: str) -> Iterator[str]:
+    """Yield a standalone HTML document containing every session."""
+    yield f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>{html.escape(title)}</title>\n</head>\n<body>\n'
+    for section in sections:
+        yield from html_section(*section)
+    yield "</body>\n</html>\n"
+
+
+def write_epub(sections: Iterable[tuple[str, str, Iterator[str]]], output: Path, title: str) -> None:
+    """
+    Write an EPUB with one chapter per session.
+
+    Chapters are streamed into the archive as they are read, only the chapter list is kept
+    in memory for the package document written at the end.
+    """
+    import zipfile
+
+    chapters: list[tuple[str, str]] = []
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as epub:
+        # The mimetype must be the first entry and stored uncompressed
+        epub.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        epub.writestr(
+            "META-INF/container.xml",
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">\n'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            "</rootfiles>\n</container>\n",
+        )
+
+        for number, (section_title, timestamp, body) in enumerate(sections, start=1):
+            name = f"chapter{number}.xhtml"
+            chapters.append((name, section_title))
+            with epub.open(f"OEBPS/{name}", "w") as chapter:
+                chapter.write(
+                    '<?xml version="1.0" encoding="UTF-8"?>\n<html xmlns="http://www.w3.org/1999/xhtml">\n'
+                    f"<head><title>{html.escape(section_title)}</title></head>\n<body>\n".encode()
+                )
+                for chunk in html_section(section_title, timestamp, body):
+                    chapter.write(chunk.encode())
+                chapter.write(b"</body>\n</html>\n")
+
+        manifest = "".join(
+            f'<item id="c{number}" href="{name}" media-type="application/xhtml+xml"/>\n'
+            for number, (name, _) in enumerate(chapters, start=1)
+        )
+        spine = "".join(f'<itemref idref="c{number}"/>\n' for number in range(1, len(chapters) + 1))
+        navigation = "".join(
+            f'<li><a href="{name}">{html.escape(section_title)}</a></li>\n' for name, section_title in chapters
+        )
+        epub.writestr(
+            "OEBPS/nav.xhtml",
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">\n'
+            f'<head><title>{html.escape(title)}</title></head>\n<body><nav epub:type="toc"><ol>\n{navigation}'
+            "</ol></nav></body>\n</html>\n",
+        )
+        epub.writestr(
+            "OEBPS/content.opf",
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="id">\n'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            f'<dc:identifier id="id">bones-{html.escape(title)}</dc:identifier>\n'
+            f"<dc:title>{html.escape(title)}</dc:title>\n<dc:language>en</dc:language>\n"
+            f'<meta property="dcterms:modified">{datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")}</meta>\n'
+            "</metadata>\n<manifest>\n"
+            '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>\n'
+            f"{manifest}</manifest>\n<spine>\n{spine}</spine>\n</package>\n",
+        )
+
+
+def plot_sessions(sessions: list[dict[str, Any]], time_delta_days: int) -> None:
+    """
+    Plot duration, word count, WPM and spelling accuracy for writing sessions.
+
+    Args:
+        sessions (list[dict[str, Any]]): Session rows from the sessions table.
+        time_delta_days (int): Number of days the sessions were selected from.
+    """
+    if not sessions:
+        print("No writing sessions with 100+ words found in the specified time range.")
+        return
+    import matplotlib.pyplot as plt  # slow to import, only needed once there is something to plot
+
+    # Extract data for plotting
+    timestamps = [datetime.fromisoformat(session["timestamp"]) for session in sessions]
+    durations = [session["duration_seconds"] / 60 for session in sessions]  # Convert to minutes
+    word_counts = [session["word_count"] for session in sessions]
+    wpms = [session["wpm"] for session in sessions]
+    spelling_accuracies = [session["spelling_accuracy"] for session in sessions]
+
+    # Create a figure with subplots
+    fig, (ax1, ax2, ax3, ax4) = plt.subplots(4, 1, figsize=(10, 12))
+    fig.suptitle(f"Writing Stats for the Last {time_delta_days} Days (100+ words only)")
+
+    # Plot duration
+    ax1.plot(timestamps, durations, marker="o", color="b")
+    ax1.set_ylabel("Duration (min)")
+    ax1.grid(True)
+
+    # Plot word count
+    ax2.plot(timestamps, word_counts, marker="o", color="g")
+    goals = [
+        (timestamp, words)
+        for session, timestamp, words in zip(sessions, timestamps, word_counts)
+        if session.get("goal_met")
+    ]
+    if goals:
+        ax2.scatter(*zip(*goals), marker="*", s=200, color="gold", zorder=3, label="Goal met")
+        ax2.legend()
+    ax2.set_ylabel("Word Count")
+    ax2.grid(True)
+
+    # Plot WPM
+    ax3.plot(timestamps, wpms, marker="o", color="r")
+    ax3.set_ylabel("WPM")
+    ax3.grid(True)
+
+    # Plot spelling accuracy
+    ax4.plot(timestamps, spelling_accuracies, marker="o", color="m")
+    ax4.set_ylabel("Spelling Accuracy (%)")
+    ax4.grid(True)
+
+    # Rotate x-axis labels for better readability
+    for ax in [ax1, ax2, ax3, ax4]:
+        plt.sca(ax)
+        plt.xticks(rotation=45)
+
+    plt.tight_layout()
+    plt.show()
+
+
+def plot_readability(sessions: list[dict[str, Any]], time_delta_days: int) -> None:
+    """
+    Plot sentence length, reading ease, grade level and paragraph count for writing sessions.
+
+    Args:
+        sessions (list[dict[str, Any]]): Session rows from the sessions table.
+        time_delta_days (int): Number of days the sessions were selected from.
+    """
+    # Sessions recorded before the metrics existed have none until `backfill-readability` is run
+    sessions = [session for session in sessions if session.get("flesch_reading_ease") is not None]
+    if not sessions:
+        print("No writing sessions with readability metrics found in the specified time range.")
+        return
+    import matplotlib.pyplot as plt
+
+    timestamps = [datetime.fromisoformat(session["timestamp"]) for session in sessions]
+    panels = [
+        ("mean_sentence_length", "Words per Sentence", "b"),
+        ("flesch_reading_ease", "Reading Ease", "g"),
+        ("flesch_kincaid_grade", "Grade Level", "r"),
+        ("paragraph_count", "Paragraphs", "m"),
+    ]
+
+    fig, axes = plt.subplots(len(panels), 1, figsize=(10, 12))
+    fig.suptitle(f"Readability for the Last {time_delta_days} Days (100+ words only)")
+    for ax, (key, label, color) in zip(axes, panels):
+        ax.plot(timestamps, [session[key] for session in sessions], marker="o", color=color)
+        ax.set_ylabel(label)
+        ax.grid(True)
+        plt.sca(ax)
+        plt.xticks(rotation=45)
+
+    plt.tight_layout()
+    plt.show()
+
+
+def read_session_table(config_path: Path = CONFIG) -> SessionTable:
+    """
+    Return the sessions table without creating directories, writing the config or opening the git repository.
+
+    Args:
+        config_path (Path): The config file naming the session directory, defaults are used if it is missing.
+
+    Returns:
+        SessionTable: The table, only to be read from. Reading the shards takes no lock and writes nothing.
+    """
+    config = read_config(config_path) or DEFAULT_CONFIG
+    return SessionTable(Path(config["directory"]), config["host"] or machine_name())
+
+
+def read_sessions(config_path: Path = CONFIG) -> list[dict[str, Any]]:
+    """Return every session row from read_session_table(), empty if there are none yet."""
+    try:
+        return read_session_table(config_path).all()
+    except json.JSONDecodeError:
+        return []
+
+
+def query_sessions(
+    table: SessionTable,
+    category: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    min_words: int | None = None,
+    min_duration: float | None = None,
+    goal_met: bool | None = None,
+    sort: str = "timestamp",
+    descending: bool = False,
+    offset: int = 0,
+    limit: int | None = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Yield the session rows matching every given filter, sorted and paginated.
+
+    Args:
+        table (SessionTable): The sessions table, e.g. BonesWriter.stats_table or read_session_table().
+        category (str | None): Only include sessions filed under this category.
+        since (datetime | None): Only include sessions on or after this time.
+        until (datetime | None): Only include sessions before this time.
+        min_words (int | None): Only include sessions with at least this many words.
+        min_duration (float | None): Only include sessions lasting at least this many seconds.
+        goal_met (bool | None): Only include sessions that met (True) or missed (False) their goal.
+        sort (str): Field to sort by, one of BonesWriter.SORT_KEYS.
+        descending (bool): Sort from highest to lowest.
+        offset (int): Number of sorted sessions to skip.
+        limit (int | None): Maximum number of sessions to yield.
+
+    Yields:
+        dict[str, Any]: The matching session rows.
+    """
+    if sort not in BonesWriter.SORT_KEYS:
+        raise ValueError(f"Cannot sort sessions by {sort}")
+
+    WritingSession = Query()
+    condition = WritingSession.timestamp.exists()
+    if category is not None:
+        sanitized_category = BonesWriter.sanitize_path(category)
+        condition &= WritingSession.filepath.test(lambda filepath: Path(filepath).parent.name == sanitized_category)
+    if since is not None:
+        condition &= WritingSession.timestamp >= since.isoformat()
+    if until is not None:
+        condition &= WritingSession.timestamp < until.isoformat()
+    if min_words is not None:
+        condition &= WritingSession.word_count >= min_words
+    if min_duration is not None:
+        condition &= WritingSession.duration_seconds >= min_duration
+    if goal_met is not None:
+        condition &= WritingSession.goal_met == goal_met
+
+    matching = table.search(condition)
+
+    def key(session: dict[str, Any]) -> tuple[Any, str]:
+        value = session.get(sort)  # older sessions lack newer fields
+        return (0 if value is None else value), session["timestamp"]
+
+    if limit is None:
+        ordered = sorted(matching, key=key, reverse=descending)
+    else:
+        # Only the requested page and the ones before it are ever sorted
+        select = heapq.nlargest if descending else heapq.nsmallest
+        ordered = select(offset + limit, matching, key=key)
+    yield from itertools.islice(ordered, offset, None)
+
+
+SPARK_BARS = "▁▂▃▄▅▆▇█"
+HEATMAP_SHADES = " ░▒▓█"  # without colour
+HEATMAP_COLORS = (237, 22, 28, 34, 40)  # 256 colour greens, from no session to the busiest days
+
+
+def sparkline(values: list[float | None]) -> str:
+    """Draw values as a line of block characters scaled to their maximum, None is left blank."""
+    present = [value for value in values if value is not None]
+    low, high = min(present, default=0), max(present, default=0)
+    bars = []
+    for value in values:
+        if value is None:
+            bars.append(" ")
+        elif high == low:
+            bars.append(SPARK_BARS[-1] if high else SPARK_BARS[0])
+        else:
+            bars.append(SPARK_BARS[round((value - low) / (high - low) * (len(SPARK_BARS) - 1))])
+    return "".join(bars)
+
+
+def render_dashboard(
+    sessions: list[dict[str, Any]], today: date, days: int = 7, width: int = 80, color: bool = True
+) -> str:
+    """
+    Render a calendar heatmap of words per day, sparklines of the last days and the current streak as text.
+
+    Args:
+        sessions (list[dict[str, Any]]): Session rows from the sessions table.
+        today (date): The last day shown.
+        days (int): Number of days the sparklines and totals cover.
+        width (int): Terminal width, the heatmap shows as many weeks as fit (up to a year).
+        color (bool): Use ANSI colours, otherwise shade the heatmap with block characters.
+
+    Returns:
+        str: The dashboard, ready to print.
+    """
+    by_day: dict[str, list[dict[str, Any]]] = {}
+    for session in sessions:
+        by_day.setdefault(session["timestamp"][:10], []).append(session)
+    words = {day: sum(session.get("word_count", 0) for session in rows) for day, rows in by_day.items()}
+
+    def paint(text: str, code: int) -> str:
+        return f"\x1b[38;5;{code}m{text}\x1b[0m" if color else text
+
+    # Calendar heatmap, one column per week starting on Monday, shaded by the quartiles of busy days
+    weeks = max(1, min(53, (width - 4) // 2))
+    start = today - timedelta(days=today.weekday(), weeks=weeks - 1)
+    busy = sorted(count for count in words.values() if count)
+    thresholds = [busy[len(busy) * quarter // 4] for quarter in (1, 2, 3)] if busy else []
+    months = ""
+    for week in range(weeks):
+        first = start + timedelta(weeks=week)
+        # Label the first week of each month where there is room
+        if first.day <= 7 and len(months) <= week * 2:
+            months = months.ljust(week * 2) + first.strftime("%b")
+    lines = ["    " + months]
+    for weekday, name in enumerate(("Mo", "", "We", "", "Fr", "", "Su")):
+        row = f"{name:<3} "
+        for week in range(weeks):
+            day = start + timedelta(weeks=week, days=weekday)
+            if day > today:
+                break
+            count = words.get(day.isoformat(), 0)
+            level = 0 if not count else 1 + bisect.bisect_right(thresholds, count)
+            row += paint("■ ", HEATMAP_COLORS[level]) if color else HEATMAP_SHADES[level] * 2
+        lines.append(row.rstrip())
+
+    # Sparklines of the last days, days without a session are gaps
+    period = [(today - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+    rows = [by_day.get(day, []) for day in period]
+    daily_words = [words.get(day, 0) for day in period]
+
+    def mean(key: str, day_rows: list[dict[str, Any]]) -> float | None:
+        values = [session[key] for session in day_rows if session.get(key) is not None]
+        return sum(values) / len(values) if values else None
+
+    wpms = [mean("wpm", day_rows) for day_rows in rows]
+    accuracies = [mean("spelling_accuracy", day_rows) for day_rows in rows]
+    period_sessions = [session for day_rows in rows for session in day_rows]
+    mean_wpm = mean("wpm", period_sessions)
+    mean_accuracy = mean("spelling_accuracy", period_sessions)
+    lines += [
+        "",
+        f"Last {days} days: {len(period_sessions)} sessions, {sum(daily_words)} words",
+        f"Words    {sparkline(daily_words)}  {max(daily_words, default=0)} max",
+        f"WPM      {sparkline(wpms)}  {0 if mean_wpm is None else round(mean_wpm)} avg",
+        f"Accuracy {sparkline(accuracies)}  {0 if mean_accuracy is None else round(mean_accuracy)}% avg",
+    ]
+
+    # Streaks
+    written = set(by_day)
+    longest = run = 0
+    previous = None
+    for day in sorted(written):
+        current = date.fromisoformat(day)
+        run = run + 1 if previous is not None and current - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = current
+
+    def days_text(count: int) -> str:
+        return f"{count} day" if count == 1 else f"{count} days"
+
+    lines += ["", f"Streak: {days_text(streak_length(written, today))} (longest {days_text(longest)})"]
+    goal_days = {day for day, day_rows in by_day.items() if any(session.get("goal_met") for session in day_rows)}
+    if goal_days:
+        lines.append(f"Goal streak: {days_text(streak_length(goal_days, today))}")
+    return "\n".join(lines)
 
 
 app = typer.Typer()
 
 
+def validate_language(language: str | None) -> str | None:
+    """Reject a --language without a spelling dictionary before the session starts."""
+    if language is not None and language not in spelling_languages():
+        raise typer.BadParameter(
+            f"No spelling dictionary for {language!r}, choose from {', '.join(spelling_languages())}"
+        )
+    return language
+
+
 @app.command()
 def main(
     directory: Path | None = None,
@@ -691,27 +3582,307 @@ def main(
         min=0,
         max=1000,
     ),
+    highlight_spelling: bool | None = typer.Option(
+        None, "--highlight-spelling/--no-highlight-spelling", help="Underline misspelled words while writing"
+    ),
+    stdin: bool = typer.Option(False, "--stdin", help="Write the session from standard input instead of the keyboard"),
+    category: str | None = typer.Option(None, help="Category to file the session under, skipping the prompt"),
+    title: str | None = typer.Option(None, help="Title of the session, skipping the prompt"),
+    checkpoint_minutes: float | None = typer.Option(
+        None, help="Commit a work in progress snapshot every N minutes in the background"
+    ),
+    checkpoint_words: int | None = typer.Option(None, help="Commit a work in progress snapshot every N words"),
+    goal_words: int | None = typer.Option(None, help="Hostage mode: ignore Ctrl-C until N words are written"),
+    goal_minutes: float | None = typer.Option(None, help="Hostage mode: ignore Ctrl-C until N minutes have passed"),
+    goal_wpm: int | None = typer.Option(None, help="Hostage mode: ignore Ctrl-C while WPM is below this floor"),
+    memprofile: bool = typer.Option(False, "--memprofile", help="Track memory use and print a report at the end"),
+    language: str | None = typer.Option(
+        None,
+        help="Spelling dictionary for this session, overriding the category's (en, es, fr, de, ...)",
+        callback=validate_language,
+    ),
 ) -> None:
     """Start the bones writer application."""
+    profile = MemoryProfile() if memprofile else None
     writer = BonesWriter(
         directory=directory,
         config_path=config,
         blank_timeout=blank_timeout,
         stats_brightness=stats_brightness,
+        highlight_spelling=highlight_spelling,
+        checkpoint_minutes=checkpoint_minutes,
+        checkpoint_words=checkpoint_words,
+        goal_words=goal_words,
+        goal_minutes=goal_minutes,
+        goal_wpm=goal_wpm,
     )
-    writer.main()
+    writer.category = category
+    writer.title = title
+    writer.language = language
+    writer.memprofile = profile
+    if stdin:
+        writer.main_stdin(sys.stdin)
+    else:
+        writer.main()
+    if profile is not None:
+        print(profile.report(len(writer.engine.keylog)))
+        profile.stop()
 
 
 @app.command()
 def stats(
     days: int = typer.Option(7, help="Number of days to look back for writing sessions"),
+    output_json: bool = typer.Option(
+        False, "--json", help="Write matching sessions to standard output as JSON lines instead of plotting"
+    ),
+    category: str | None = typer.Option(None, help="Only include sessions in this category"),
+    since: datetime | None = typer.Option(
+        None, formats=["%Y-%m-%d"], help="Only include sessions on or after this date"
+    ),
+    until: datetime | None = typer.Option(None, formats=["%Y-%m-%d"], help="Only include sessions before this date"),
+    min_words: int | None = typer.Option(None, help="Only include sessions with at least this many words"),
+    min_minutes: float | None = typer.Option(None, help="Only include sessions lasting at least this many minutes"),
+    goal_met: bool | None = typer.Option(
+        None, "--goal-met/--goal-missed", help="Only include sessions that met or missed their goal"
+    ),
+    sort: str = typer.Option("timestamp", help=f"Sort by one of: {', '.join(BonesWriter.SORT_KEYS)}"),
+    descending: bool = typer.Option(False, "--desc", help="Sort from highest to lowest"),
+    offset: int = typer.Option(0, min=0, help="Skip this many sessions"),
+    limit: int | None = typer.Option(None, min=1, help="Show at most this many sessions"),
+    readability: bool = typer.Option(
+        False, "--readability", help="Plot sentence length, reading ease, grade level and paragraphs"
+    ),
+    tui: bool = typer.Option(
+        False, "--tui", help="Print a heatmap, sparklines and streak in the terminal instead of plotting"
+    ),
     config: Path | None = None,
 ) -> None:
     """
     Show writing statistics for the specified time period.
     """
+    if tui:
+        # Read only: no BonesWriter, so no directories or config are created and git is never touched
+        sessions = read_sessions(CONFIG if config is None else config)
+        color = sys.stdout.isatty() and "NO_COLOR" not in os.environ
+        width = shutil.get_terminal_size().columns
+        print(render_dashboard(sessions, date.today(), days=days, width=width, color=color))
+        return
+    if sort not in BonesWriter.SORT_KEYS:
+        raise typer.BadParameter(f"Unknown sort field: {sort}", param_hint="--sort")
+    if output_json:
+        # Read only, like --tui, so nothing but JSON lines ever reaches standard output
+        sessions = query_sessions(
+            read_session_table(CONFIG if config is None else config),
+            category=category,
+            since=since,
+            until=until,
+            min_words=min_words,
+            min_duration=None if min_minutes is None else min_minutes * 60,
+            goal_met=goal_met,
+            sort=sort,
+            descending=descending,
+            offset=offset,
+            limit=limit,
+        )
+        for session in sessions:
+            sys.stdout.write(json.dumps(session) + "\n")
+        return
+
+    if config is None:
+        # The daemon only answers for the directory it was started in
+        directory = Path((read_config(CONFIG) or DEFAULT_CONFIG)["directory"])
+        response = DaemonClient(directory=directory).request("stats", days=days)
+        if response is not None:
+            (plot_readability if readability else plot_sessions)(response["result"], days)
+            return
+
+    writer = BonesWriter(config_path=config)
+    writer.plot_writing_stats(days, readability=readability)
+
+
+@app.command("backfill-readability")
+def backfill_readability(config: Path | None = None) -> None:
+    """
+    Compute sentence and readability metrics for sessions recorded before they were tracked.
+    """
+    writer = BonesWriter(config_path=config)
+    start = time.perf_counter()
+    count = writer.backfill_readability()
+    print(f"Updated {count} sessions in {time.perf_counter() - start:.1f}s")
+
+
+@app.command()
+def export(
+    output: Path,
+    category: str | None = typer.Option(None, help="Only export sessions in this category"),
+    since: datetime | None = typer.Option(
+        None, formats=["%Y-%m-%d"], help="Only export sessions on or after this date"
+    ),
+    export_format: str = typer.Option("md", "--format", help="Output format: md, html or epub"),
+    config: Path | None = None,
+) -> None:
+    """
+    Compile writing sessions into a single document.
+    """
+    if export_format not in ("md", "html", "epub"):
+        raise typer.BadParameter(f"Unknown format: {export_format}", param_hint="--format")
+    writer = BonesWriter(config_path=config)
+    count = writer.export(output, export_format, category=category, since=since)
+    print(f"Exported {count} sessions to {output}")
+
+
+@app.command()
+def archive(
+    months: int = typer.Option(12, help="Archive sessions older than this many months"),
+    config: Path | None = None,
+) -> None:
+    """
+    Pack old sessions into compressed per-month bundles.
+    """
+    writer = BonesWriter(config_path=config)
+    count, raw_bytes, packed_bytes = writer.archive_sessions(months)
+    if not count:
+        print("No sessions to archive.")
+        return
+    print(f"Archived {count} sessions")
+    print(f"Size: {humanize.naturalsize(raw_bytes)} -> {humanize.naturalsize(packed_bytes)}")
+
+
+@app.command("rebuild-db")
+def rebuild_db(
+    workers: int | None = typer.Option(None, min=1, help="Number of worker processes, defaults to the number of CPUs"),
+    config: Path | None = None,
+) -> None:
+    """
+    Rebuild the sessions database from the session files and git history.
+    """
+    writer = BonesWriter(config_path=config)
+    start = time.perf_counter()
+    count = writer.rebuild_database(workers)
+    print(f"Recovered {count} sessions in {time.perf_counter() - start:.1f}s")
+    print(f"The previous sessions were kept in {writer.backup_dir()}")
+
+
+@app.command()
+def metrics(
+    output_format: str = typer.Option("openmetrics", "--format", help="Output format: openmetrics or json"),
+    output: Path | None = typer.Option(None, help="Write to this file instead of standard output"),
+    config: Path | None = None,
+) -> None:
+    """
+    Export session and internal performance metrics.
+    """
+    if output_format not in ("openmetrics", "json"):
+        raise typer.BadParameter(f"Unknown format: {output_format}", param_hint="--format")
+    writer = BonesWriter(config_path=config)
+    session_metrics = writer.load_metrics()
+    if output_format == "json":
+        text = json.dumps(session_metrics.to_json(), indent=2) + "\n"
+    else:
+        text = session_metrics.to_openmetrics()
+
+    if output is None:
+        sys.stdout.write(text)
+    else:
+        with open(output, "w") as file:
+            file.write(text)
+
+
+@app.command()
+def vocab(
+    top: int = typer.Option(20, help="Number of most used words to show"),
+    category: str | None = typer.Option(None, help="Only include sessions from this category"),
+    weeks: int = typer.Option(8, help="Number of recent weeks to show new words for"),
+    stop_words: bool = typer.Option(False, "--stop-words", help="Include common words like 'the' in the top words"),
+    config: Path | None = None,
+) -> None:
+    """
+    Show most used words, lexical diversity and vocabulary growth.
+    """
     writer = BonesWriter(config_path=config)
-    writer.plot_writing_stats(days)
+    vocabulary = writer.load_vocabulary()
+    if category is not None:
+        category = writer.sanitize_path(category)
+
+    print("Most used words:")
+    for word, count in vocabulary.top(top, category=category, stop_words=stop_words):
+        print(f"  {word:<20} {count}")
+
+    print("\nType/token ratio by month:")
+    for month, types, tokens in vocabulary.diversity(category=category):
+        print(f"  {month}  {types:>7} / {tokens:<8} {types / tokens if tokens else 0:.3f}")
+
+    print("\nNew words per week:")
+    for week, count in vocabulary.new_words_per_week()[-weeks:]:
+        print(f"  {week}  {count}")
+
+
+@app.command()
+def replay(
+    session: Path,
+    speed: float = typer.Option(1.0, help="Playback speed multiplier, 0 for no delays"),
+    headless: bool = typer.Option(False, help="Print to standard output instead of drawing with curses"),
+    analyze: bool = typer.Option(False, help="Print pause and burst statistics instead of replaying"),
+) -> None:
+    """
+    Play back a session from its keystroke log.
+    """
+    log = KeystrokeLog.load(session.with_suffix(".keys"))
+
+    if analyze:
+        print(json.dumps(log.analyze(), indent=2))
+        return
+
+    if headless:
+
+        def write(char: str) -> None:
+            sys.stdout.write(char)
+            sys.stdout.flush()
+
+        def backspace() -> None:
+            write("\b \b")
+
+        replay_keystrokes(log, write, backspace, speed)
+        print()
+        return
+
+    def play(stdscr: curses.window) -> None:
+        stdscr.clear()
+        stdscr.scrollok(True)
+
+        def backspace() -> None:
+            y, x = stdscr.getyx()
+            if x > 0:
+                stdscr.addstr(y, x - 1, " ")
+                stdscr.move(y, x - 1)
+            stdscr.refresh()
+
+        def write(char: str) -> None:
+            stdscr.addstr(char)
+            stdscr.refresh()
+
+        replay_keystrokes(log, write, backspace, speed)
+        stdscr.nodelay(False)
+        stdscr.getch()
+
+    curses.wrapper(play)
+
+
+@app.command()
+def daemon(
+    directory: Path | None = None,
+    config: Path | None = None,
+) -> None:
+    """
+    Keep the dictionary, database and git repository loaded for other bones_writer commands.
+    """
+    writer = BonesWriter(directory=directory, config_path=config)
+    bones_daemon = BonesDaemon(writer)
+    print(f"Listening on {bones_daemon.socket_path}")
+    try:
+        bones_daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
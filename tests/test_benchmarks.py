@@ -0,0 +1,463 @@
+"""
+Benchmarks for latency-sensitive paths.
+
+These run as part of the normal suite with small workloads and print their measurements,
+use `pytest tests/test_benchmarks.py -s` to see the numbers.
+"""
+
+import gc
+import io
+import json
+import os
+import random
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import time
+from unittest.mock import MagicMock, patch
+
+import git
+from tinydb import Query
+
+from src.bones_writer import (
+    BonesWriter,
+    MemoryProfile,
+    SessionEngine,
+    SessionTable,
+    SpellHighlighter,
+    VocabularyIndex,
+    char_width,
+    load_dictionary,
+    read_sessions,
+    render_dashboard,
+)
+from tests.test_bones_writer import (  # noqa: F401
+    MockCursesWindow,
+    bones_writer,
+    init_repo_with_remote,
+    mock_repo,
+    plain_writer,
+    writer_without_repo,
+)
+
+WPM = 150
+KEYSTROKE_INTERVAL = 60 / (WPM * 6)  # five letters and a space per word
+# Long simulated sessions are shortened by this factor, use BONES_BENCH_SCALE=1 for full length
+SCALE = int(os.environ.get("BONES_BENCH_SCALE", "20"))
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def type_paced(writer, win, text: str) -> list[float]:
+    """Type text at the benchmark WPM and return the latency of each write_char call."""
+    latencies = []
+    for char in text:
+        start = time.perf_counter()
+        writer.write_char(win, char)
+        latencies.append(time.perf_counter() - start)
+        writer.apply_spelling_highlights(win)
+        time.sleep(KEYSTROKE_INTERVAL)
+    return latencies
+
+
+def test_highlighting_keystroke_latency(bones_writer):  # noqa: F811
+    """Keystroke latency with live spelling highlighting matches latency without it at 150 WPM"""
+    text = "the quikc brown fox jumsp "
+    bones_writer.outfile = MagicMock()
+
+    with patch("curses.color_pair", return_value=0):
+        win = MockCursesWindow()
+        win.chgat = MagicMock()
+        baseline = type_paced(bones_writer, win, text)
+
+        bones_writer.text_content = []
+        bones_writer.columns = []
+        bones_writer.spell_highlighter = SpellHighlighter()
+        bones_writer.spell_highlighter.start()
+        time.sleep(1)  # let the worker finish loading the dictionary, as it does before the first keystroke
+        win = MockCursesWindow()
+        win.chgat = MagicMock()
+        highlighted = type_paced(bones_writer, win, text)
+        bones_writer.spell_highlighter.stop()
+        bones_writer.apply_spelling_highlights(win)
+
+    baseline_median = statistics.median(baseline)
+    highlighted_median = statistics.median(highlighted)
+    print(
+        f"\nwrite_char median latency: {baseline_median * 1e6:.1f}us plain, {highlighted_median * 1e6:.1f}us highlighted"
+    )
+
+    assert bones_writer.misspelled
+    # The worker only shares the queues with the input loop, so typing costs the same
+    assert highlighted_median < baseline_median * 1.2 + 5e-6
+
+
+def reflow_time(writer, length: int) -> float:
+    """Return the time taken to lay out a session of the given length after a resize."""
+    text = ("lorem ipsum dolor sit amet " * (length // 27 + 1))[:length]
+    writer.text_content = [(char, 0, 0, 2) for char in text]
+    writer.line_starts = [0] + [i + 1 for i, char in enumerate(text) if char == "\n"]
+    writer.columns = list(range(length))  # a single line of single width characters
+    writer.win_height, writer.win_width = 40, 120
+
+    start = time.perf_counter()
+    for _ in range(20):
+        writer.layout_tail()
+    return (time.perf_counter() - start) / 20
+
+
+def test_resize_cost_bounded_by_screen(bones_writer):  # noqa: F811
+    """Reflowing a 50k character session costs about the same as a short one"""
+    short = reflow_time(bones_writer, 5_000)
+    long = reflow_time(bones_writer, 50_000)
+    print(f"\nlayout_tail: {short * 1e3:.2f}ms for 5k chars, {long * 1e3:.2f}ms for 50k chars")
+    assert long < short * 3
+
+
+def test_stdin_throughput():
+    """Piped text goes through the session engine at megabytes per second"""
+    paragraph = "The quick brown fox jumps over the lazy dog. It was not amused!\n" * 2_000
+    text = paragraph * 8  # about 1 MB
+    engine = SessionEngine(io.StringIO())
+
+    start = time.perf_counter()
+    engine.feed_stream(io.StringIO(text))
+    elapsed = time.perf_counter() - start
+    engine.finish()
+
+    megabytes = len(text) / 1e6
+    print(f"\n--stdin engine throughput: {megabytes / elapsed:.1f} MB/s")
+    assert engine.live_word_count == 13 * 2_000 * 8
+    assert megabytes / elapsed > 1
+
+
+def test_vocabulary_queries_on_large_archive(tmp_path):
+    """Vocabulary queries over years of sessions answer from the counters in well under a second"""
+    rng = random.Random(0)
+    lexicon = [f"word{i}" for i in range(20_000)]
+    vocabulary = VocabularyIndex(tmp_path / "vocab.json")
+    for number in range(2_000):  # a session a day for five and a half years
+        day = (date(2020, 1, 1) + timedelta(days=number)).isoformat()
+        words = rng.choices(lexicon[: 2_000 + number * 9], k=300)
+        vocabulary.add_session(f"cat{number % 5}/{number}.Rmd", f"{day}T09:00:00", dict.fromkeys(words, 1))
+    vocabulary.save()
+
+    start = time.perf_counter()
+    vocabulary = VocabularyIndex(tmp_path / "vocab.json")
+    vocabulary.top(20)
+    vocabulary.top(20, category="cat1")
+    vocabulary.diversity()
+    vocabulary.new_words_per_week()
+    elapsed = time.perf_counter() - start
+    print(f"\nvocab queries on 2000 sessions: {elapsed * 1e3:.0f}ms")
+    assert elapsed < 1
+
+
+class ScrollingWindow:
+    """A window that only tracks the cursor, so the benchmark does not measure its own bookkeeping."""
+
+    def __init__(self, height: int = 40, width: int = 100):
+        self.height, self.width = height, width
+        self.y = self.x = 0
+
+    def getyx(self):
+        return self.y, self.x
+
+    def addstr(self, *args):
+        if len(args) >= 3:
+            self.y, self.x = args[0], args[1]
+        char = args[2] if len(args) >= 3 else args[0]
+        if char == "\n" or self.x + char_width(char) >= self.width:
+            self.y, self.x = min(self.y + 1, self.height - 1), 0
+        else:
+            self.x += char_width(char)
+
+    def move(self, y, x):
+        self.y, self.x = y, x
+
+    def refresh(self):
+        pass
+
+    def clear(self):
+        pass
+
+
+def simulated_session_growth(tmp_path, hours: int) -> tuple[int, int, str]:
+    """Type an hours long session at the benchmark WPM and return the memory growth, keystrokes and report."""
+    with patch("curses.color_pair", new=lambda pair: 0):
+        writer = writer_without_repo(tmp_path)
+        writer.config["history_limit"] //= SCALE
+        win = ScrollingWindow()
+        writer.win_height, writer.win_width = win.height, win.width
+        paragraph = "The quick brown fox jumps over the lazy dog and keeps on running. " * 8 + "\n"
+        # After the first hour the writer stops punctuating and never leaves a blank line
+        draft = "the quick brown fox jumps over the lazy dog and keeps on running " * 8 + "\n"
+        keystrokes = hours * 60 * WPM * 6 // SCALE
+        punctuated = 60 * WPM * 6 // SCALE
+
+        with open(os.devnull, "w") as outfile:
+            writer.outfile = outfile
+            # A full collection empties the tuple free list, which would otherwise hide or hold on to
+            # thousands of the layout tuples depending on where in the trim cycle the session stops
+            gc.collect()
+            profile = MemoryProfile()
+            for i in range(keystrokes):
+                text = paragraph if i < punctuated else draft
+                writer.write_char(win, text[i % len(text)])
+            gc.collect()
+            growth = profile.growth()
+            report = profile.report(keystrokes, top=5)
+            profile.stop()
+    return growth, keystrokes, report
+
+
+def test_memory_growth_of_long_sessions(tmp_path):
+    """Memory retained by 1, 3 and 8 hour sessions levels off once the in-memory history is capped"""
+    growth = {}
+    for hours in (1, 3, 8):
+        growth[hours], keystrokes, report = simulated_session_growth(tmp_path / f"{hours}h", hours)
+        print(f"\n{hours} hour session (1/{SCALE} scale):\n{report}")
+
+    # Past the cap only the compact keystroke log keeps growing
+    assert growth[8] < growth[3] * 1.5
+    assert growth[8] / keystrokes < 60
+
+
+def write_latencies(tmp_path, text: str, repeat: int = 20) -> list[float]:
+    """Return the latency of each write_char call while typing text into a fresh writer."""
+    with patch("curses.color_pair", new=lambda pair: 0):
+        writer = writer_without_repo(tmp_path)
+        win = ScrollingWindow()
+        writer.win_height, writer.win_width = win.height, win.width
+        latencies = []
+        with open(os.devnull, "w", encoding="utf-8") as outfile:
+            writer.outfile = outfile
+            for char in text * repeat:
+                start = time.perf_counter()
+                writer.write_char(win, char)
+                latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def test_cjk_keystroke_latency(tmp_path):
+    """Keystroke latency for wide CJK characters matches latency for ASCII"""
+    ascii_text = "The quick brown fox jumps over the lazy dog.\n" * 5
+    cjk_text = "敏捷的棕色狐狸跳过了懒狗，然后继续奔跑。日本語のテキストも混ぜます。\n" * 5
+    ascii_median = statistics.median(write_latencies(tmp_path / "ascii", ascii_text))
+    cjk_median = statistics.median(write_latencies(tmp_path / "cjk", cjk_text))
+    print(f"\nwrite_char median latency: {ascii_median * 1e6:.1f}us ASCII, {cjk_median * 1e6:.1f}us CJK")
+    assert cjk_median < ascii_median * 1.5 + 5e-6
+
+
+def parent_repo_with_files(root, files: int):
+    """Create a repository with many unrelated files, a bones directory inside it and an up to date remote."""
+    repo = init_repo_with_remote(root)
+    for i in range(files):
+        directory = root / "dotfiles" / f"d{i // 1000}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"f{i}").write_text(f"{i}\n")
+    bones = root / "bones"
+    (bones / "journal").mkdir(parents=True)
+    (bones / "journal" / "a.Rmd").write_text("## A\n\nSome words.\n")
+
+    repo.git.add("-A")
+    repo.git.commit("-q", "-m", "files")
+    repo.git.push("-q")
+    repo.git.repack("-adq")  # real repositories this size are packed
+    # An unrelated change elsewhere in the parent repository must not block sessions
+    (root / "dotfiles" / "d0" / "f0").write_text("changed\n")
+    return bones
+
+
+def session_startup_time(bones) -> float:
+    """Return the time to create a writer and run the pre-session repository check."""
+    start = time.perf_counter()
+    writer = BonesWriter(directory=bones, config_path=bones.parent / "config.yaml")
+    writer.daemon = None
+    status = writer.check_repo_status()
+    elapsed = time.perf_counter() - start
+    assert status is None, status
+    return elapsed
+
+
+def test_startup_independent_of_parent_repo_size(tmp_path):
+    """Starting a session in a bones directory inside a huge repository costs the same as inside a small one"""
+    large_files = 100_000 // SCALE
+    small = parent_repo_with_files(tmp_path / "small", 100)
+    large = parent_repo_with_files(tmp_path / "large", large_files)
+
+    small_time = min(session_startup_time(small) for _ in range(3))
+    large_time = min(session_startup_time(large) for _ in range(3))
+    print(f"\nsession startup: {small_time * 1e3:.0f}ms with 100 files, {large_time * 1e3:.0f}ms with {large_files}")
+    # Reading git's index is the only cost left that grows with the parent, about 20ms at 100k files
+    assert large_time < small_time * 1.5 + 0.05
+
+
+def test_mixed_language_spelling_does_not_reload(tmp_path, plain_writer):  # noqa: F811
+    """Alternating English and Spanish sessions load each dictionary once, repeat checks only look words up"""
+    english = tmp_path / "english.Rmd"
+    english.write_text("The quick brown fox jumps over the lazy dog and keeps on running.\n" * 50)
+    spanish = tmp_path / "spanish.Rmd"
+    spanish.write_text("El rápido zorro marrón salta sobre el perro perezoso y sigue corriendo.\n" * 50)
+
+    load_dictionary.cache_clear()
+    start = time.perf_counter()
+    plain_writer.check_spelling(english, language="en")
+    plain_writer.check_spelling(spanish, language="es")
+    first = time.perf_counter() - start
+
+    checks = []
+    for _ in range(20):
+        start = time.perf_counter()
+        plain_writer.check_spelling(english, language="en")
+        plain_writer.check_spelling(spanish, language="es")
+        checks.append(time.perf_counter() - start)
+    repeat = statistics.median(checks)
+    print(f"\nen + es spelling check: {first * 1e3:.0f}ms loading, {repeat * 1e3:.2f}ms once loaded")
+
+    assert load_dictionary.cache_info().misses == 2
+    assert repeat < first / 10
+
+
+def multi_year_history(tmp_path, today) -> tuple[Path, int]:
+    """Write five years of sessions, two a day, and return the config naming their directory and the count."""
+    rng = random.Random(0)
+    sessions = {}
+    for number in range(5 * 365 * 2):  # two sessions a day for five years
+        day = today - timedelta(days=number // 2)
+        sessions[str(number + 1)] = {
+            "timestamp": f"{day.isoformat()}T09:00:00",
+            "filepath": f"journal/{day.isoformat()}_09-00-00_Title.Rmd",
+            "duration_seconds": rng.randint(300, 3600),
+            "word_count": rng.randint(100, 2000),
+            "wpm": rng.randint(20, 60),
+            "spelling_accuracy": rng.randint(85, 100),
+            "grammar_error_rate": rng.randint(0, 50),
+        }
+    (tmp_path / "bones").mkdir()
+    (tmp_path / "bones" / ".bones_database.json").write_text(json.dumps({"sessions": sessions}))
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(f"directory: {tmp_path / 'bones'}\n")
+    return config_path, len(sessions)
+
+
+def test_dashboard_on_multi_year_history(tmp_path):
+    """stats --tui reads and renders five years of sessions in well under 100ms"""
+    today = date(2026, 1, 1)
+    config_path, count = multi_year_history(tmp_path, today)
+
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        render_dashboard(read_sessions(config_path), today, days=30, width=120)
+        timings.append(time.perf_counter() - start)
+    elapsed = statistics.median(timings)
+    print(f"\nstats --tui on {count} sessions: {elapsed * 1e3:.1f}ms")
+    assert elapsed < 0.1
+
+
+def run_time(env: dict[str, str], *args: str) -> float:
+    """Return the best wall clock time of a few runs of a Python subprocess, after one to warm the bytecode cache."""
+    timings = []
+    for _ in range(6):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], check=True, stdout=subprocess.DEVNULL, cwd=ROOT, env=env)
+        timings.append(time.perf_counter() - start)
+    return min(timings[1:])
+
+
+def test_dashboard_command_end_to_end(tmp_path):
+    """`stats --tui` as a command costs little more than starting the CLI, git, numpy and pyspellchecker stay unloaded"""
+    config_path, count = multi_year_history(tmp_path, date.today())
+    # Compiled modules are cached as they are for an installed copy, even where the checkout is read only
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    env["PYTHONPYCACHEPREFIX"] = str(tmp_path / "pycache")
+
+    command = ["-m", "src.bones_writer", "stats", "--tui", "--config", str(config_path)]
+    elapsed = run_time(env, *command)
+    floor = run_time(env, "-c", "import typer, yaml, tinydb")
+    imports = subprocess.run(
+        [sys.executable, "-X", "importtime", *command], check=True, capture_output=True, text=True, cwd=ROOT, env=env
+    ).stderr
+    loaded = {line.split("|")[-1].strip() for line in imports.splitlines()}
+    print(f"\nstats --tui end to end on {count} sessions: {elapsed * 1e3:.0f}ms, CLI imports alone {floor * 1e3:.0f}ms")
+    assert not loaded & {"git", "numpy", "spellchecker", "matplotlib"}
+    assert elapsed < floor + 0.15
+
+
+def sharded_table(directory, shards: int, sessions: int = 4_000):
+    """Spread sessions over shards and return a table reading them."""
+    shard_dir = directory / ".bones_sessions"
+    shard_dir.mkdir(parents=True)
+    for shard in range(shards):
+        with open(shard_dir / f"host{shard}.jsonl", "w") as file:
+            for number in range(shard, sessions, shards):
+                row = {"timestamp": f"2024-01-01T00:00:{number:06d}", "word_count": number % 2_000, "wpm": 40}
+                file.write(json.dumps(row) + "\n")
+    return SessionTable(directory, "host0")
+
+
+def test_sharded_query_latency_flat_in_shard_count(tmp_path):
+    """Queries over the merged sessions index cost about the same with 1 or 200 machine shards"""
+    condition = Query().word_count >= 1_000
+    tables = {shards: sharded_table(tmp_path / str(shards), shards) for shards in (1, 20, 200)}
+    first = {}
+    for shards, table in tables.items():
+        start = time.perf_counter()
+        table.search(condition)
+        first[shards] = time.perf_counter() - start
+
+    # Take turns so a slow patch of the machine hits every shard count alike, and keep the fastest run
+    cached = {shards: float("inf") for shards in tables}
+    for _ in range(50):
+        for shards, table in tables.items():
+            start = time.perf_counter()
+            assert len(table.search(condition)) == 2_000
+            cached[shards] = min(cached[shards], time.perf_counter() - start)
+    for shards in tables:
+        print(f"\n{shards} shards: {first[shards] * 1e3:.1f}ms merging, {cached[shards] * 1e3:.2f}ms per cached query")
+    # Past the first read each query only stats the shards
+    assert cached[200] < cached[1] * 1.5 + 0.002
+
+
+def clone_size(remote, destination, *args: str) -> int:
+    """Clone the remote and return the total size of the clone on disk, working tree included."""
+    git.Repo.clone_from(f"file://{remote}", destination, multi_options=list(args))
+    return sum(path.stat().st_size for path in destination.rglob("*") if path.is_file())
+
+
+def test_archive_shrinks_shallow_clone(tmp_path):
+    """Archiving old sessions makes a shallow clone smaller, a full clone still carries them in history"""
+    vocabulary = ["quick", "brown", "fox", "jumps", "over", "lazy", "dog", "writing", "morning", "coffee", "idea"]
+    vocabulary += [f"word{i}" for i in range(200)]
+    sessions = 4_000 // SCALE
+    generator = random.Random(0)
+    repo = init_repo_with_remote(tmp_path / "repo")
+    remote = tmp_path / "repo.git"
+    bones = tmp_path / "repo" / "bones"
+    (bones / "journal").mkdir(parents=True)
+    writer = BonesWriter(directory=bones, config_path=tmp_path / "config.yaml")
+    writer.daemon = None
+    for number in range(sessions):
+        day = datetime(2020, 1, 1) + timedelta(days=number)
+        path = bones / "journal" / f"{day:%Y-%m-%d}_09-00-00_Day.Rmd"
+        paragraphs = [" ".join(generator.choices(vocabulary, k=120)) for _ in range(5)]
+        path.write_text("## Day\n\n" + "\n\n".join(paragraphs) + "\n")
+        writer.stats_table.insert({"timestamp": day.isoformat(), "filepath": str(path)})
+    repo.git.add("--", "bones/journal")
+    repo.git.commit("-q", "-m", "sessions")
+    repo.git.push("-q")
+
+    shallow_before = clone_size(remote, tmp_path / "shallow_before", "--depth=1")
+    count, raw_bytes, packed_bytes = writer.archive_sessions(months=1)
+    shallow_after = clone_size(remote, tmp_path / "shallow_after", "--depth=1")
+    full_after = clone_size(remote, tmp_path / "full_after")
+
+    print(
+        f"\narchived {count} sessions, {raw_bytes / 1e3:.0f}kB -> {packed_bytes / 1e3:.0f}kB; clone size "
+        f"{shallow_before / 1e3:.0f}kB -> {shallow_after / 1e3:.0f}kB shallow, {full_after / 1e3:.0f}kB full"
+    )
+    assert count == sessions
+    assert shallow_after < shallow_before * 0.75
+    assert full_after > shallow_after
@@ -1,12 +1,30 @@
 import pytest
 from unittest.mock import patch, MagicMock, mock_open
-from src.bones_writer import BonesWriter, NUM_FADE_STEPS
+from src.bones_writer import (
+    BonesWriter, NUM_FADE_STEPS, BonesDaemon, CategoryCompleter, CheckpointWorker, DaemonClient, FileLock,
+    GrammarChecker, KeystrokeLog, MemoryProfile, SessionArchive, SessionEngine, SessionGoal, SessionMetrics,
+    SessionTable, SpellHighlighter, StatusBar, StatusWidget, TextStatistics, VocabularyIndex, char_width,
+    count_syllables, export_markdown, load_dictionary, metrics, read_sessions, render_dashboard, replay_keystrokes,
+    sparkline, stats, validate_language, word_frequencies, write_epub,
+)
+import io
+import json
+import multiprocessing
 import os
+import sys
+import threading
+import zipfile
+from datetime import date, datetime, timedelta
 from pathlib import Path
 import time
 import shutil
 import curses
+import git
+import typer
 import yaml
+from tinydb import Query, TinyDB
+from tinydb.storages import MemoryStorage
+import matplotlib.pyplot  # noqa: F401  imported lazily by the app, load it before fixtures mock open()
 
 # Mock config file content
 MOCK_CONFIG = """
@@ -53,6 +71,9 @@ class MockCursesWindow:
     def getch(self):
         return -1  # Default to no input
 
+    def get_wch(self):
+        raise curses.error("no input")  # Default to no input
+
     def refresh(self):
         pass
 
@@ -72,9 +93,9 @@ def mock_repo():
     repo = MagicMock()
     repo.is_dirty.return_value = False
     repo.active_branch.name = "main"
-    repo.head.commit = "commit1"
-    repo.refs = {"origin/main": MagicMock(commit="commit1")}
-    repo.remotes = [MagicMock()]
+    repo.head.commit = MagicMock(hexsha="commit1")
+    repo.git.ls_remote.return_value = "commit1\trefs/heads/main"
+    repo.active_branch.tracking_branch.return_value = MagicMock(remote_name="origin", remote_head="main")
     repo.working_dir = "/mock/repo/dir"
     repo.git = MagicMock()
     return repo
@@ -89,10 +110,40 @@ def bones_writer(tmp_path, mock_repo):
          patch("pathlib.Path.unlink"), \
          patch("pathlib.Path.mkdir"):
         writer = BonesWriter(directory=tmp_path)
+        writer.daemon = None  # never talk to a real daemon from the tests
         yield writer
         # No need for cleanup since files are mocked
 
 
+def writer_without_repo(directory, config_path=None):
+    """Build a BonesWriter on real files in a directory outside any git repository"""
+    with patch("git.Repo", side_effect=git.InvalidGitRepositoryError):
+        return BonesWriter(directory=directory, config_path=config_path or directory / "config.yaml")
+
+
+@pytest.fixture
+def plain_writer(tmp_path):
+    return writer_without_repo(tmp_path)
+
+
+def init_repo_with_remote(path):
+    """Create a git repository at path with an empty first commit pushed to a bare remote beside it"""
+    repo = git.Repo.init(path, initial_branch="main")
+    repo.git.config("user.email", "test@example.com")
+    repo.git.config("user.name", "Test")
+    remote = path.parent / f"{path.name}.git"
+    git.Repo.init(remote, bare=True, initial_branch="main")
+    repo.git.remote("add", "origin", str(remote))
+    repo.git.commit("-q", "--allow-empty", "-m", "init")
+    repo.git.push("-q", "-u", "origin", "main")
+    return repo
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    return init_repo_with_remote(tmp_path / "repo")
+
+
 def test_write_char(bones_writer, mock_stdscr):
     bones_writer.outfile = MagicMock()  # Mock the outfile
     with patch("curses.color_pair", return_value=0):  # Mock color_pair
@@ -109,15 +160,15 @@ def test_word_counting(bones_writer, mock_stdscr):
 
     # Create a mock window with all required methods
     mock_win = MagicMock()
-    mock_win.getch.side_effect = [
-        ord("h"),
-        ord("e"),
-        ord("l"),
-        ord("l"),  # "hell"
-        ord("o"),
-        ord(" "),  # "o "
-        ord("w"),
-        ord("o"),  # "wo"
+    mock_win.get_wch.side_effect = [
+        "h",
+        "e",
+        "l",
+        "l",  # "hell"
+        "o",
+        " ",  # "o "
+        "w",
+        "o",  # "wo"
     ]
     mock_win.getyx.return_value = (0, 0)  # Return default cursor position
     mock_win.addstr = MagicMock()
@@ -162,13 +213,17 @@ def test_blank_text(bones_writer, mock_stdscr):
 def test_status_bar(bones_writer, mock_stdscr):
     # Test status bar updates
     bones_writer.screen_width = 80
-    bones_writer.status_y = 80
-    with patch("curses.color_pair", return_value=0):
+    bones_writer.live_word_count = 12
+    bones_writer.stats_table = MagicMock()
+    with patch("curses.color_pair", return_value=0), \
+         patch.object(bones_writer, "elapsed_seconds", return_value=60):
         # Update status bar
-        bones_writer.status_bar(mock_stdscr, "Test", 2)
+        bones_writer.update_status_bar(mock_stdscr, MockCursesWindow())
     # Verify status bar content
     assert len(mock_stdscr.content) > 0
-    assert mock_stdscr.content[0][2] == "Test"
+    # Only the non-blank cells are written, right aligned
+    text = "WPM: 12  Words: 12  0:01:00"
+    assert mock_stdscr.content[0][:3] == (0, 80 - len(text), text)
 
 
 def test_initialization(bones_writer):
@@ -315,24 +370,22 @@ def test_rename_file(bones_writer):
         mock_move.assert_called_once()
 
 
-def test_add_title(bones_writer):
+def test_add_title(tmp_path, plain_writer):
     """Test adding title to file content"""
-    original_content = "original content"
-    mock_file = mock_open(read_data=original_content)
-    
-    with patch("builtins.open", mock_file):
-        title = "Test Title"
-        bones_writer.add_title(bones_writer.filepath, title)
-        
-        # Verify content was written correctly
-        expected_content = f"## {title}\n\n{original_content}"
-        mock_file().write.assert_called_with(expected_content)
+    original_content = "original content, café 中文"
+    plain_writer.filepath = tmp_path / "session.Rmd"
+    plain_writer.filepath.write_text(original_content, encoding="utf-8")
+
+    title = "Test Title"
+    plain_writer.add_title(plain_writer.filepath, title)
+
+    # Verify content was written correctly
+    assert plain_writer.filepath.read_text(encoding="utf-8") == f"## {title}\n\n{original_content}"
+    assert not list(tmp_path.glob("*.tmp"))
 
 
 def test_category_completer():
     """Test category completion functionality"""
-    from src.bones_writer import CategoryCompleter
-
     categories = ["test1", "test2", "other"]
     completer = CategoryCompleter(categories)
 
@@ -344,6 +397,16 @@ def test_category_completer():
     assert completer.complete("x", 0) is None
 
 
+def test_prompt_name_completes_only_categories(bones_writer):
+    """Test that tab completion offers category directories, not the dot directories the writer keeps"""
+    for name in ["journal", "ideas", ".bones_sessions", ".bones_sessions.bak", ".archive"]:
+        os.makedirs(bones_writer.dir / name)  # Path.mkdir is patched out for this fixture
+    with patch("readline.set_completer") as mock_set_completer, patch("readline.parse_and_bind"), \
+         patch("builtins.input", side_effect=["journal", "Day"]), patch("builtins.print"):
+        bones_writer.prompt_name()
+    assert sorted(mock_set_completer.call_args.args[0].__self__.categories) == ["ideas", "journal"]
+
+
 def test_cleanup_word_count(bones_writer):
     """Test word count calculation in cleanup"""
     mock_file = mock_open(read_data="one two three\nfour five")  # 5 words
@@ -384,8 +447,9 @@ def test_cleanup_wpm(bones_writer):
 
 def test_git_commit_and_push(bones_writer):
     """Test git commit and push functionality"""
-    # Mock the git repository
+    # Mock the git repository, with the bones directory inside it
     mock_repo = MagicMock()
+    mock_repo.working_dir = str(bones_writer.dir.parent)
     bones_writer.repo = mock_repo
 
     # Test files to commit
@@ -396,12 +460,28 @@ def test_git_commit_and_push(bones_writer):
     bones_writer.git_commit_and_push(test_files, commit_message)
 
     # Verify git commands were called correctly
-    for file_path in test_files:
-        mock_repo.git.add.assert_any_call(str(file_path))
-    mock_repo.git.commit.assert_called_once_with("-m", commit_message)
+    mock_repo.git.add.assert_called_once_with("--", "test1.txt", "test2.txt")
+    mock_repo.git.commit.assert_called_once_with("-m", commit_message, "--", "test1.txt", "test2.txt")
     mock_repo.git.push.assert_called_once()
 
 
+def test_git_commit_leaves_other_staged_files(tmp_path, git_repo):
+    """Test that a session commit only includes its own files, even other changes staged in the bones directory"""
+    bones = tmp_path / "repo" / "bones"
+    bones.mkdir()
+    (bones / "draft.Rmd").write_text("draft\n")
+    git_repo.git.add("--", str(bones / "draft.Rmd"))
+    session = bones / "session.Rmd"
+    session.write_text("## Session\n")
+
+    writer = BonesWriter(directory=bones, config_path=tmp_path / "config.yaml")
+    writer.daemon = None
+    writer.git_commit_and_push([session], "journal: Session")
+
+    assert git_repo.git.show("--name-only", "--format=", "HEAD").split() == ["bones/session.Rmd"]
+    assert git_repo.git.diff("--cached", "--name-only").split() == ["bones/draft.Rmd"]
+
+
 def test_git_commit_and_push_no_repo(bones_writer):
     """Test git commit and push when no repo exists"""
     bones_writer.repo = None
@@ -415,18 +495,23 @@ def test_check_repo_status_clean(bones_writer):
     mock_repo = MagicMock()
     mock_repo.is_dirty.return_value = False
     mock_repo.active_branch.name = "main"
-    mock_repo.head.commit = "commit1"
-    mock_repo.refs = {"origin/main": MagicMock(commit="commit1")}
-    mock_repo.remotes = [MagicMock()]
-    
+    mock_repo.head.commit = MagicMock(hexsha="commit1")
+    mock_repo.active_branch.tracking_branch.return_value = MagicMock(remote_name="origin", remote_head="main")
+    mock_repo.git.ls_remote.return_value = "commit1\trefs/heads/main"
+    mock_repo.working_dir = str(bones_writer.dir)
+
     bones_writer.repo = mock_repo
     assert bones_writer.check_repo_status() is None
+    mock_repo.is_dirty.assert_called_once_with(untracked_files=False, path=".")
+    mock_repo.git.ls_remote.assert_called_once_with("origin", "refs/heads/main")
+    mock_repo.git.fetch.assert_not_called()
 
 
 def test_check_repo_status_dirty(bones_writer):
     """Test repo status check when repo is dirty"""
     mock_repo = MagicMock()
     mock_repo.is_dirty.return_value = True
+    mock_repo.working_dir = str(bones_writer.dir)
     bones_writer.repo = mock_repo
     
     assert "uncommitted changes" in bones_writer.check_repo_status()
@@ -437,14 +522,28 @@ def test_check_repo_status_behind(bones_writer):
     mock_repo = MagicMock()
     mock_repo.is_dirty.return_value = False
     mock_repo.active_branch.name = "main"
-    mock_repo.head.commit = "commit1"
-    mock_repo.refs = {"origin/main": MagicMock(commit="commit2")}
-    mock_repo.remotes = [MagicMock()]
-    
+    mock_repo.head.commit = MagicMock(hexsha="commit1")
+    mock_repo.active_branch.tracking_branch.return_value = MagicMock(remote_name="origin", remote_head="main")
+    mock_repo.git.ls_remote.return_value = "commit2\trefs/heads/main"
+    mock_repo.working_dir = str(bones_writer.dir)
+
     bones_writer.repo = mock_repo
     assert "behind the remote" in bones_writer.check_repo_status()
 
 
+def test_check_repo_status_without_tracking_branch(bones_writer):
+    """Test repo status check when the branch has no upstream"""
+    mock_repo = MagicMock()
+    mock_repo.is_dirty.return_value = False
+    mock_repo.active_branch.name = "main"
+    mock_repo.active_branch.tracking_branch.return_value = None
+    mock_repo.working_dir = str(bones_writer.dir)
+
+    bones_writer.repo = mock_repo
+    assert "no remote tracking branch" in bones_writer.check_repo_status()
+    mock_repo.git.ls_remote.assert_not_called()
+
+
 def test_relative_filepath_with_repo(bones_writer):
     """Test relative filepath calculation with repo"""
     mock_repo = MagicMock()
@@ -565,3 +664,1066 @@ def test_cleanup_trash_feature(bones_writer):
             
             # Verify no stats were recorded
             bones_writer.stats_table.insert.assert_not_called()
+
+
+def test_grammar_checker_rules():
+    """Test the rule-based grammar checks on single sentences"""
+    checker = GrammarChecker()
+    assert checker.check("This is a clean sentence.") == 0
+    assert checker.check("this starts lowercase.") == 1
+    assert checker.check("I saw the the cat.") == 1
+    assert checker.check("Then i left.") == 1
+    assert checker.check("It was a apple , maybe.") == 2
+    assert checker.check("He ate an banana.") == 1
+    # Articles go by sound, not spelling
+    for sentence in ["An honest man.", "It took an hour.", "An FBI agent.", "A university.", "That is, i.e. this."]:
+        assert checker.check(sentence) == 0, sentence
+    assert checker.rate("First item\n\nSecond item") == 0
+
+
+def test_grammar_checker_background_worker():
+    """Test that sentences are checked off-thread and the rate is ready at finish"""
+    checker = GrammarChecker()
+    checker.submit("Good sentence.")
+    checker.submit("bad sentence.")
+    # two lowercase sentence starts over three sentences
+    assert checker.finish("trailing text") == 66
+    assert checker.sentences == 3
+
+
+def test_write_char_submits_completed_sentences(bones_writer, mock_stdscr):
+    """Test that typing a sentence terminator followed by a space queues the sentence"""
+    bones_writer.outfile = MagicMock()
+    with patch("curses.color_pair", return_value=0), \
+         patch.object(bones_writer.engine.grammar_checker, "submit") as mock_submit:
+        for char in "Hi there. Next":
+            bones_writer.write_char(mock_stdscr, char)
+    mock_submit.assert_called_once_with("Hi there.")
+    assert "".join(bones_writer.engine.sentence_buffer) == "Next"
+
+
+def test_blank_line_ends_sentence(bones_writer, mock_stdscr):
+    """Test that a blank line ends an unpunctuated sentence, as it ends a paragraph in the text statistics"""
+    bones_writer.outfile = MagicMock()
+    with patch("curses.color_pair", return_value=0), \
+         patch.object(bones_writer.engine.grammar_checker, "submit") as mock_submit:
+        for char in "milk\neggs\n\nBread":
+            bones_writer.write_char(mock_stdscr, char)
+    mock_submit.assert_called_once_with("milk\neggs\n")
+    assert "".join(bones_writer.engine.sentence_buffer) == "Bread"
+
+
+def test_spell_highlighter_reports_misspelled_words():
+    """Test that the highlighter worker returns only misspelled words"""
+    highlighter = SpellHighlighter()
+    highlighter.submit(0, "hello")
+    highlighter.submit(6, "wrold")
+    highlighter.stop()
+    assert highlighter.results() == [(6, "wrold")]
+
+
+def test_apply_spelling_highlights(bones_writer, mock_stdscr):
+    """Test that misspelled words are underlined in place once the worker reports them"""
+    bones_writer.outfile = MagicMock()
+    bones_writer.spell_highlighter = SpellHighlighter()
+    mock_stdscr.chgat = MagicMock()
+    with patch("curses.color_pair", return_value=0):
+        for char in "the wrold ":
+            bones_writer.write_char(mock_stdscr, char)
+        bones_writer.spell_highlighter.stop()
+        bones_writer.apply_spelling_highlights(mock_stdscr)
+
+    assert bones_writer.misspelled == {4, 5, 6, 7, 8}
+    assert mock_stdscr.chgat.call_count == 5
+
+
+def test_layout_tail_wraps_visible_lines(bones_writer, mock_stdscr):
+    """Test that reflow wraps only the logical lines that fit in the window"""
+    bones_writer.outfile = MagicMock()
+    with patch("curses.color_pair", return_value=0):
+        for char in "abcdefgh\nij\nklm":
+            bones_writer.write_char(mock_stdscr, char)
+
+    bones_writer.win_height, bones_writer.win_width = 3, 5
+    cursor = bones_writer.layout_tail()
+
+    # "abcdefgh" wraps onto two rows, only its second row fits above "ij" and "klm"
+    assert bones_writer.visible_start == 5
+    assert bones_writer.text_content[5][:3] == ("f", 0, 0)
+    assert bones_writer.text_content[9][:3] == ("i", 1, 0)
+    assert bones_writer.text_content[12][:3] == ("k", 2, 0)
+    assert cursor == (2, 3)
+
+
+def test_resize_key_reflows_text(bones_writer, mock_stdscr):
+    """Test that KEY_RESIZE resizes the window and redraws the text at the new width"""
+    bones_writer.outfile = MagicMock()
+    bones_writer.stdscr = MagicMock()
+    bones_writer.stdscr.getmaxyx.return_value = (10, 20)
+    mock_stdscr.resize = MagicMock()
+    with patch("curses.color_pair", return_value=0):
+        for char in "hello world":
+            bones_writer.write_char(mock_stdscr, char)
+        mock_stdscr.get_wch = MagicMock(return_value=curses.KEY_RESIZE)
+        bones_writer.inner_loop(mock_stdscr)
+
+    mock_stdscr.resize.assert_called_once_with(6, 8)
+    assert bones_writer.text_content[8][:3] == ("r", 1, 0)
+    assert mock_stdscr.getyx() == (1, 3)
+
+
+def test_status_bar_only_rewrites_changed_cells(mock_stdscr):
+    """Test that a tick which only changes the timer rewrites just the changed digits"""
+    seconds = [59]
+    words = MagicMock(return_value="Words: 3")
+    bar = StatusBar([StatusWidget("timer", lambda: f"0:00:{seconds[0]}", 1.0), StatusWidget("words", words, 10.0)])
+    assert bar.render(mock_stdscr, 30, 0.0, 0)
+    mock_stdscr.content = []
+
+    seconds[0] = 58
+    assert bar.render(mock_stdscr, 30, 1.0, 0)
+    assert mock_stdscr.content == [(0, 29, "8", 0)]
+    # The throttled widget was not recomputed and nothing changed on a repeat tick
+    assert words.call_count == 1
+    assert not bar.render(mock_stdscr, 30, 1.5, 0)
+
+
+def test_status_bar_drops_widgets_on_narrow_terminal():
+    """Test that lower priority widgets that do not fit are left out"""
+    bar = StatusBar([StatusWidget("a", lambda: "first"), StatusWidget("b", lambda: "second")])
+    for widget in bar.widgets:
+        widget.update(0.0)
+    assert bar.layout(10) == "     first"
+    assert bar.layout(13) == "second  first"
+
+
+def test_current_streak(bones_writer, memory_table):
+    """Test counting consecutive writing days"""
+    today = datetime.now()
+    for days_ago in (1, 2, 4):
+        memory_table.insert({"timestamp": (today - timedelta(days=days_ago)).isoformat()})
+    bones_writer.stats_table = memory_table
+    assert bones_writer.current_streak() == 2
+    assert bones_writer.streak_text() == "Streak: 2"
+
+
+def test_daemon_client_without_daemon(tmp_path):
+    """Test that the client falls back when no daemon is listening"""
+    assert DaemonClient(tmp_path / "missing.sock").request("ping") is None
+
+
+def test_daemon_serves_requests(tmp_path):
+    """Test spelling, stats and directory checks against a running daemon"""
+    socket_path = tmp_path / "d.sock"
+    writer = MagicMock(dir=tmp_path)
+    writer.check_spelling.return_value = 90
+    writer.query_high_word_count_sessions.return_value = [{"word_count": 150}]
+    bones_daemon = BonesDaemon(writer, socket_path)
+    thread = threading.Thread(target=bones_daemon.serve_forever)
+    thread.start()
+    try:
+        for _ in range(100):
+            if socket_path.exists():
+                break
+            time.sleep(0.01)
+        client = DaemonClient(socket_path, directory=tmp_path)
+        assert client.request("spelling", path="x.Rmd") == {"result": 90}
+        assert client.request("stats", days=7) == {"result": [{"word_count": 150}]}
+        assert DaemonClient(socket_path, directory=tmp_path / "other").request("ping") is None
+        with pytest.raises(RuntimeError):
+            client.request("unknown")
+    finally:
+        bones_daemon.shutdown()
+        thread.join()
+    assert not socket_path.exists()
+
+
+@pytest.fixture
+def memory_table():
+    """Fixture for a real sessions table held in memory"""
+    return TinyDB(storage=MemoryStorage).table("sessions")
+
+
+def test_select_sessions(bones_writer, memory_table):
+    """Test selecting sessions by category and date, oldest first"""
+    memory_table.insert({"timestamp": "2024-03-02T10:00:00", "filepath": "bones/journal/b.Rmd"})
+    memory_table.insert({"timestamp": "2024-03-01T10:00:00", "filepath": "bones/journal/a.Rmd"})
+    memory_table.insert({"timestamp": "2024-03-03T10:00:00", "filepath": "bones/fiction/c.Rmd"})
+    memory_table.insert({"timestamp": "2024-01-01T10:00:00", "filepath": "bones/journal/old.Rmd"})
+    bones_writer.stats_table = memory_table
+
+    sessions = bones_writer.select_sessions("journal", datetime(2024, 2, 1))
+    assert [s["filepath"] for s in sessions] == ["bones/journal/a.Rmd", "bones/journal/b.Rmd"]
+
+
+def test_export_markdown_normalises_titles(bones_writer):
+    """Test that the add_title header becomes a top level heading in the compiled document"""
+    sessions = [{"timestamp": "2024-03-01T10:00:00", "filepath": "/bones/journal/a.Rmd"}]
+    with patch("pathlib.Path.exists", return_value=True), \
+         patch.object(bones_writer, "read_session_lines", return_value=iter(["## Morning\n", "\n", "Some words.\n"])):
+        document = "".join(export_markdown(bones_writer.export_sections(sessions)))
+
+    assert document == "# Morning\n\n*2024-03-01*\n\nSome words.\n\n"
+
+
+def test_write_epub(tmp_path):
+    """Test that the EPUB is a zip with an uncompressed mimetype first and one chapter per session"""
+    sections = [("One", "2024-03-01T10:00:00", iter(["a & b\n"])), ("Two", "2024-03-02T10:00:00", iter(["c\n"]))]
+    output = tmp_path / "out.epub"
+    write_epub(sections, output, title="journal")
+
+    with zipfile.ZipFile(output) as epub:
+        names = epub.namelist()
+        assert names[0] == "mimetype"
+        assert epub.getinfo("mimetype").compress_type == zipfile.ZIP_STORED
+        assert "OEBPS/chapter2.xhtml" in names
+        assert "<p>a &amp; b</p>" in epub.read("OEBPS/chapter1.xhtml").decode()
+        assert 'idref="c2"' in epub.read("OEBPS/content.opf").decode()
+
+
+def test_session_archive_round_trip(tmp_path):
+    """Test that archived sessions can be read back individually from a month bundle"""
+    first = tmp_path / "2023-01-05_10-00-00_a.Rmd"
+    second = tmp_path / "2023-01-09_10-00-00_b.Rmd"
+    first.write_text("## A\n\nfirst session " * 20)
+    second.write_text("## B\n\nsecond session")
+
+    archive = SessionArchive(tmp_path)
+    raw, packed = archive.add("2023-01", [(first.name, first)])
+    archive.add("2023-01", [(second.name, second)])
+    assert packed < raw
+
+    reopened = SessionArchive(tmp_path)
+    assert reopened.read(second.name) == "## B\n\nsecond session"
+    assert reopened.read(first.name) == first.read_text()
+    assert reopened.read("2023-02-01_10-00-00_missing.Rmd") is None
+
+
+def test_archive_sessions_reads_transparently(tmp_path, plain_writer):
+    """Test that old sessions are packed, removed and still readable for export"""
+    plain_writer.daemon = None
+
+    session_file = tmp_path / "journal" / "2020-05-01_09-00-00_Old.Rmd"
+    session_file.parent.mkdir()
+    session_file.write_text("## Old\n\nOld words.\n")
+    plain_writer.stats_table.insert({"timestamp": "2020-05-01T09:30:00", "filepath": str(session_file)})
+    plain_writer.stats_table.insert({"timestamp": "2999-01-01T09:30:00", "filepath": str(tmp_path / "new.Rmd")})
+
+    count, raw, packed = plain_writer.archive_sessions(months=1)
+
+    assert count == 1
+    assert not session_file.exists()
+    assert (tmp_path / ".archive" / "2020-05.bundle").exists()
+    assert list(plain_writer.read_session_lines(session_file)) == ["## Old\n", "\n", "Old words.\n"]
+
+
+def test_archive_sessions_commits_only_tracked_removals(tmp_path, git_repo):
+    """Test that archiving commits the bundles and tracked removals, and an untracked session is just removed"""
+    bones = tmp_path / "repo" / "bones"
+    tracked = bones / "journal" / "2020-05-01_09-00-00_Old.Rmd"
+    tracked.parent.mkdir(parents=True)
+    tracked.write_text("## Old\n\nOld words.\n")
+    untracked = bones / "journal" / "2020-05-02_09-00-00_Draft.Rmd"
+    git_repo.git.add("-A")
+    git_repo.git.commit("-q", "-m", "sessions")
+    git_repo.git.push("-q")
+    untracked.write_text("## Draft\n\nDraft words.\n")
+
+    writer = BonesWriter(directory=bones, config_path=tmp_path / "config.yaml")
+    writer.daemon = None
+    writer.stats_table.insert({"timestamp": "2020-05-01T09:30:00", "filepath": str(tracked)})
+    writer.stats_table.insert({"timestamp": "2020-05-02T09:30:00", "filepath": str(untracked)})
+
+    assert writer.archive_sessions(months=1)[0] == 2
+    assert not tracked.exists() and not untracked.exists()
+    assert git_repo.git.ls_files("bones/journal") == ""
+    assert "bones/.archive/2020-05.bundle" in git_repo.git.ls_files("bones/.archive")
+    assert git_repo.head.commit.message.strip() == "archive: 2 sessions"
+    assert list(writer.read_session_lines(untracked)) == ["## Draft\n", "\n", "Draft words.\n"]
+
+
+def test_archive_sessions_git_failure_writes_nothing(tmp_path, mock_repo):
+    """Test that a git failure while listing tracked sessions leaves the sessions and archive untouched"""
+    mock_repo.working_dir = str(tmp_path)
+    mock_repo.git.ls_files.side_effect = git.GitCommandError("ls-files", 128)
+    with patch("git.Repo", return_value=mock_repo):
+        writer = BonesWriter(directory=tmp_path, config_path=tmp_path / "config.yaml")
+    writer.daemon = None
+    session_file = tmp_path / "journal" / "2020-05-01_09-00-00_Old.Rmd"
+    session_file.parent.mkdir()
+    session_file.write_text("## Old\n\nOld words.\n")
+    writer.stats_table.insert({"timestamp": "2020-05-01T09:30:00", "filepath": str(session_file)})
+
+    with pytest.raises(RuntimeError):
+        writer.archive_sessions(months=1)
+    assert session_file.exists()
+    assert not (tmp_path / ".archive" / "2020-05.bundle").exists()
+
+
+def test_session_metrics_openmetrics(tmp_path):
+    """Test that aggregates persist and render as OpenMetrics without the sessions table"""
+    metrics = SessionMetrics(tmp_path / "metrics.json")
+    metrics.add_session({"timestamp": "2024-03-01T10:00:00", "word_count": 300, "duration_seconds": 600, "wpm": 30, "spelling_accuracy": 90})
+    metrics.add_session({"timestamp": "2024-03-01T18:00:00", "word_count": 100, "duration_seconds": 60, "wpm": 100, "spelling_accuracy": 100})
+    metrics.add_timings({"startup": 0.25, "git_push": 1.5})
+    metrics.save()
+
+    text = SessionMetrics(tmp_path / "metrics.json").to_openmetrics()
+    assert "bones_sessions_total 2" in text
+    assert 'bones_words_per_day{date="2024-03-01"} 400' in text
+    assert 'bones_wpm_bucket{le="30"} 1' in text
+    assert 'bones_wpm_bucket{le="+Inf"} 2' in text
+    assert "bones_spelling_accuracy_percent 95.00" in text
+    assert 'bones_phase_last_duration_seconds{phase="git_push"} 1.500000' in text
+    assert text.endswith("# EOF\n")
+
+
+def test_metrics_stay_fresh_without_reading_sessions(tmp_path, capsys):
+    """Test that metrics compare shard signatures instead of reading the table, and the command prints only metrics"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(f"directory: {tmp_path / 'bones'}\nmetrics_textfile: {tmp_path / 'bones.prom'}\n")
+    with patch("git.Repo"):
+        writer = BonesWriter(config_path=config_path)
+    writer.daemon = None
+    session = {"timestamp": "2024-03-01T10:00:00", "word_count": 300, "duration_seconds": 600, "wpm": 30,
+               "spelling_accuracy": 90}
+    shards = writer.stats_table.signature()
+    writer.stats_table.insert(session)
+    writer.record_metrics(session, shards)
+    assert (tmp_path / "bones.prom").read_text().startswith("# TYPE bones_sessions counter")
+    assert [path.name for path in tmp_path.iterdir() if path.name.endswith(".tmp")] == []
+
+    with patch.object(SessionTable, "_refresh", side_effect=AssertionError("read the sessions table")):
+        assert writer.load_metrics().data["sessions"] == 1
+
+    # A session pulled from another machine changes the signature
+    SessionTable(tmp_path / "bones", "desktop").insert(session)
+    assert writer.load_metrics().data["sessions"] == 2
+
+    capsys.readouterr()
+    with patch("git.Repo"):
+        metrics(output_format="openmetrics", output=None, config=config_path)
+    out, err = capsys.readouterr()
+    assert out.startswith("# TYPE bones_sessions counter")
+    assert "Using git repository" in err
+
+
+def test_cleanup_records_phase_timings(bones_writer):
+    """Test that cleanup times each phase and folds them into the metrics"""
+    bones_writer.stats_table = MagicMock()
+    with patch("builtins.open", mock_open(read_data="one two")), \
+         patch.object(bones_writer, "elapsed_seconds", return_value=60), \
+         patch.object(bones_writer, "check_spelling", return_value=95), \
+         patch.object(bones_writer, "rename_file"), \
+         patch.object(bones_writer, "add_title"), \
+         patch.object(bones_writer, "git_commit_and_push"), \
+         patch.object(bones_writer, "record_metrics") as mock_record, \
+         patch("builtins.input", side_effect=["test_category", "test_title"]), \
+         patch("builtins.print"):
+        bones_writer.cleanup()
+
+    mock_record.assert_called_once()
+    assert {"startup", "cleanup_spelling", "cleanup_database", "git_push"} <= set(bones_writer.timings)
+
+
+def test_keystroke_log_round_trip():
+    """Test that the packed keystroke log decodes to the recorded events"""
+    log = KeystrokeLog(start_ns=0)
+    log.record(ord("h"), now_ns=120_000_000)
+    log.record(ord("é"), now_ns=300_000_000)
+    log.record(0, backspace=True, now_ns=5_300_000_000)
+
+    loaded = KeystrokeLog.from_bytes(log.to_bytes())
+    assert list(loaded.deltas) == [120, 180, 5000]
+    assert list(loaded.keys) == [ord("h"), ord("é"), 0]
+    assert list(loaded.backspaces) == [0, 0, 1]
+
+
+def test_keystroke_log_is_compact():
+    """Test that an hour of typing at 200 characters per minute stays within a few tens of KB"""
+    log = KeystrokeLog(start_ns=0)
+    now = 0
+    for i in range(12_000):
+        now += (250 if i % 40 else 4000) * 1_000_000
+        log.record(ord("abcdefgh "[i % 9]), now_ns=now)
+    assert len(log.to_bytes()) < 40_000
+
+
+def test_keystroke_log_analyze():
+    """Test pause histogram and burst lengths"""
+    log = KeystrokeLog(start_ns=0)
+    now = 0
+    for delta in [50, 50, 3000, 50, 50, 50]:
+        now += delta * 1_000_000
+        log.record(ord("a"), now_ns=now)
+    log.record(0, backspace=True, now_ns=now)
+
+    stats = log.analyze()
+    assert stats["keystrokes"] == 7
+    assert stats["backspaces"] == 1
+    assert stats["pause_histogram_ms"]["0-100"] == 6
+    assert stats["pause_histogram_ms"]["2000-5000"] == 1
+    assert stats["bursts"] == 2
+    assert stats["longest_burst_keystrokes"] == 5
+
+
+def test_replay_keystrokes_into_sink(bones_writer, mock_stdscr):
+    """Test that a recorded session replays through a headless sink"""
+    bones_writer.outfile = MagicMock()
+    with patch("curses.color_pair", return_value=0):
+        for char in "hix":
+            bones_writer.write_char(mock_stdscr, char)
+        bones_writer.delete_char(mock_stdscr)
+
+    output = []
+    replay_keystrokes(bones_writer.engine.keylog, output.append, lambda: output.pop(), speed=0)
+    assert "".join(output) == "hi"
+
+
+def test_session_engine_without_curses():
+    """Test that the engine turns a key stream into file output and stats on its own"""
+    outfile = io.StringIO()
+    engine = SessionEngine(outfile)
+    for key in [ord(c) for c in "Hi you. Ok"] + [127, 9]:
+        char = SessionEngine.key_to_char(key)
+        if key == 127:
+            engine.backspace()
+        elif char is not None:
+            engine.type_char(char)
+
+    assert outfile.getvalue() == "Hi you. Ok"
+    assert engine.chars == list("Hi you. O")
+    assert engine.live_word_count == 3
+    assert len(engine.keylog) == 11
+    assert engine.finish() == 0
+
+
+def test_session_engine_feed_text_matches_typing():
+    """Test that bulk text split across blocks counts words and sentences like typing it"""
+    text = "One two. Three four five!\nSix seven eight nine."
+    typed = SessionEngine(io.StringIO())
+    for char in text:
+        typed.type_char(char)
+
+    fed = SessionEngine(io.StringIO())
+    for block in ("One tw", "o. Three four", " five!\nSix seven eight nine."):
+        fed.feed_text(block)
+
+    assert fed.outfile.getvalue() == text
+    assert fed.live_word_count == typed.live_word_count == 9
+    assert fed.finish() == typed.finish()
+    assert fed.grammar_checker.sentences == typed.grammar_checker.sentences == 3
+
+
+def test_session_engine_caps_unpunctuated_sentence():
+    """Test that a run-on without punctuation is checked in pieces cut at spaces instead of kept whole"""
+    text = "and then we walked on " * 200
+    typed = SessionEngine(io.StringIO())
+    fed = SessionEngine(io.StringIO())
+    with patch.object(typed.grammar_checker, "submit") as typed_submit, \
+         patch.object(fed.grammar_checker, "submit") as fed_submit:
+        for char in text:
+            typed.type_char(char)
+            assert len(typed.sentence_buffer) < SessionEngine.SENTENCE_LIMIT
+        fed.feed_text(text)
+
+    for engine, mock_submit in ((typed, typed_submit), (fed, fed_submit)):
+        pieces = [call.args[0] for call in mock_submit.call_args_list]
+        assert len(pieces) == 4
+        assert all(piece.endswith(" ") for piece in pieces)
+        assert "".join(pieces) + "".join(engine.sentence_buffer) == text
+
+
+def test_main_stdin(bones_writer):
+    """Test that --stdin pipes text through the engine and names the session without prompting"""
+    bones_writer.title = "dictation"
+    with patch("builtins.open", mock_open()) as mock_file, \
+         patch.object(bones_writer, "pause_on_dirty_repo"), \
+         patch.object(bones_writer, "cleanup") as mock_cleanup:
+        bones_writer.main_stdin(io.StringIO("spoken words here"))
+
+    mock_file().write.assert_called_once_with("spoken words here")
+    assert bones_writer.live_word_count == 3
+    assert bones_writer.category is None
+    mock_cleanup.assert_called_once()
+
+
+def insert_sessions(directory, worker, count):
+    """Insert sessions from a separate process for the concurrency stress test"""
+    table = SessionTable(directory, "host")
+    for i in range(count):
+        table.insert({"timestamp": f"2024-03-01T10:00:{i:02d}", "worker": worker, "word_count": i})
+
+
+def test_concurrent_session_inserts(tmp_path):
+    """Stress test: sessions inserted by concurrent processes are never lost"""
+    workers, count = 8, 25
+    processes = [multiprocessing.Process(target=insert_sessions, args=(tmp_path, w, count)) for w in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+
+    sessions = SessionTable(tmp_path, "host").all()
+    assert len(sessions) == workers * count
+    assert len({session.doc_id for session in sessions}) == workers * count
+
+
+def test_session_table_sees_other_writers(tmp_path):
+    """Test that a long-lived table picks up rows written by another handle"""
+    reader = SessionTable(tmp_path, "laptop")
+    writer = SessionTable(tmp_path, "desktop")
+    reader.insert({"word_count": 1})
+    assert len(reader.search(Query().word_count >= 0)) == 1
+    writer.insert({"word_count": 2})
+    assert len(reader.search(Query().word_count >= 0)) == 2
+    row_id = reader.insert({"word_count": 3})
+    assert [session["word_count"] for session in reader if session.doc_id == row_id] == [3]
+
+
+def test_session_table_merges_shards(tmp_path):
+    """Test that per-machine shards, updates and the legacy database merge into one timestamp ordered table"""
+    (tmp_path / ".bones_database.json").write_text(
+        json.dumps({"sessions": {"1": {"timestamp": "2024-01-01T09:00:00", "word_count": 10}}})
+    )
+    laptop = SessionTable(tmp_path, "laptop")
+    desktop = SessionTable(tmp_path, "desktop")
+    laptop_id = laptop.insert({"timestamp": "2024-01-03T09:00:00", "word_count": 30})
+    desktop_id = desktop.insert({"timestamp": "2024-01-02T09:00:00", "word_count": 20})
+    with open(tmp_path / ".bones_sessions" / "desktop.jsonl", "a") as file:
+        file.write('{"timestamp": "2024-01-04')  # a line still being written by the other machine
+
+    assert [session["word_count"] for session in laptop] == [10, 20, 30]
+    assert [session.doc_id for session in laptop] == ["legacy:1", desktop_id, laptop_id]
+    desktop.update_each({"legacy:1": {"word_count": 11}})
+    assert laptop.all()[0] == {"timestamp": "2024-01-01T09:00:00", "word_count": 11}
+    assert len(laptop.search(Query().word_count > 15)) == 2
+    assert not (tmp_path / ".bones_database.json").read_text().count("11")
+
+    laptop.replace_all([{"timestamp": "2024-02-01T09:00:00", "word_count": 5}])
+    assert (tmp_path / ".bones_database.json").exists()
+    assert [session["word_count"] for session in desktop] == [11, 20, 5]
+    assert desktop.all()[2].doc_id not in ("legacy:1", desktop_id, laptop_id)
+
+    # Two machines that recorded the same session file show it once
+    desktop.insert({"timestamp": "2024-03-01T09:00:00", "filepath": "a.Rmd", "word_count": 1, "recovered": True})
+    laptop.insert({"timestamp": "2024-03-01T09:00:00", "filepath": "a.Rmd", "word_count": 2})
+    desktop.insert({"timestamp": "2024-03-01T09:00:00", "filepath": "a.Rmd", "word_count": 3})
+    assert [session["word_count"] for session in laptop.search(Query().filepath == "a.Rmd")] == [3]
+
+
+def test_session_ids_survive_replace_all(tmp_path):
+    """Test that updates recorded on another machine follow their session when its shard is rebuilt"""
+    laptop = SessionTable(tmp_path, "laptop")
+    desktop = SessionTable(tmp_path, "desktop")
+    (tmp_path / ".bones_sessions").mkdir()
+    # Rows from before IDs were stored are known by their position in the shard
+    (tmp_path / ".bones_sessions" / "laptop.jsonl").write_text(
+        json.dumps({"timestamp": "2024-01-01T09:00:00", "filepath": "a.Rmd"}) + "\n"
+    )
+    b_id = laptop.insert({"timestamp": "2024-01-02T09:00:00", "filepath": "b.Rmd"})
+    desktop.update_each({"laptop:1": {"title": "A"}, b_id: {"title": "B"}})
+
+    # rebuild-db recovers the sessions in a different order
+    laptop.replace_all([
+        {"timestamp": "2024-01-02T09:00:00", "filepath": "b.Rmd", "recovered": True},
+        {"timestamp": "2023-12-31T09:00:00", "filepath": "new.Rmd", "recovered": True},
+        {"timestamp": "2024-01-01T09:00:00", "filepath": "a.Rmd", "recovered": True},
+    ])
+    assert {session["filepath"]: session.get("title") for session in desktop} == {
+        "new.Rmd": None, "a.Rmd": "A", "b.Rmd": "B"
+    }
+    assert [session.doc_id for session in desktop][1:] == ["laptop:1", b_id]
+
+
+def test_checkpoint_worker_snapshots_to_wip_ref(tmp_path, git_repo):
+    """Test that checkpoints land on their own ref without touching HEAD or the index"""
+    head = git_repo.head.commit.hexsha
+
+    session_file = tmp_path / "repo" / "journal" / "draft.Rmd"
+    session_file.parent.mkdir()
+    session_file.write_text("first words")
+    timings = {}
+    worker = CheckpointWorker(git_repo, session_file, FileLock(tmp_path / "repo" / ".bones_git.lock"), timings)
+    worker.request()
+    worker.stop()
+    session_file.write_text("first words and more")
+    worker.snapshot()
+
+    assert worker.count == 2
+    assert git_repo.git.show(f"{worker.ref}:journal/draft.Rmd") == "first words and more"
+    assert git_repo.git.show(f"{worker.ref}~1:journal/draft.Rmd") == "first words"
+    assert git_repo.head.commit.hexsha == head
+    assert git_repo.git.diff("--cached", "--name-only") == ""
+    assert timings["checkpoint"] > 0
+
+    worker.discard()
+    with pytest.raises(git.GitCommandError):
+        git_repo.git.rev_parse("--verify", worker.ref)
+
+
+def test_maybe_checkpoint_after_word_threshold(bones_writer):
+    """Test that the loop only requests a checkpoint once enough words were written"""
+    bones_writer.config["checkpoint_words"] = 3
+    bones_writer.engine.outfile = MagicMock()
+    bones_writer.checkpoints = MagicMock()
+    bones_writer.engine.live_word_count = 2
+    bones_writer.maybe_checkpoint()
+    bones_writer.checkpoints.request.assert_not_called()
+    bones_writer.engine.live_word_count = 3
+    bones_writer.maybe_checkpoint()
+    bones_writer.checkpoints.request.assert_called_once()
+    bones_writer.maybe_checkpoint()
+    bones_writer.checkpoints.request.assert_called_once()
+
+
+def test_word_frequencies_normalises_tokens():
+    """Test that frequencies ignore case, punctuation and bare numbers"""
+    word_count, frequencies = word_frequencies(["The cat, the \"Cat\".\n", "It's 42 -- done!\n"])
+    assert word_count == 8
+    assert frequencies == {"the": 2, "cat": 2, "it's": 1, "done": 1}
+
+
+def test_vocabulary_index_queries(tmp_path):
+    """Test top words, type/token ratio and new words per week from the counters"""
+    vocabulary = VocabularyIndex(tmp_path / "vocab.json")
+    vocabulary.add_session("journal/a.Rmd", "2024-01-01T09:00:00", {"the": 3, "river": 2})
+    vocabulary.add_session("journal/a.Rmd", "2024-01-01T09:00:00", {"the": 3, "river": 2})
+    vocabulary.add_session("fiction/b.Rmd", "2024-01-10T09:00:00", {"river": 1, "boat": 1})
+    vocabulary.save()
+
+    vocabulary = VocabularyIndex(tmp_path / "vocab.json")
+    assert vocabulary.top(1) == [("river", 3)]
+    assert vocabulary.top(1, stop_words=True) == [("the", 3)]
+    assert vocabulary.top(5, category="fiction") == [("river", 1), ("boat", 1)]
+    assert vocabulary.diversity() == [("2024-01", 3, 7)]
+    assert vocabulary.diversity(category="journal") == [("2024-01", 2, 5)]
+    assert vocabulary.new_words_per_week() == [("2024-W01", 2), ("2024-W02", 1)]
+    assert vocabulary.days() == {"2024-01-01": {"the": 3, "river": 2}, "2024-01-10": {"river": 1, "boat": 1}}
+
+
+def test_load_vocabulary_counts_missing_sessions(tmp_path, plain_writer):
+    """Test that sessions recorded before the counters existed are counted from their files once"""
+    session_file = tmp_path / "journal" / "2024-01-01_09-00-00_Old.Rmd"
+    session_file.parent.mkdir()
+    session_file.write_text("## Old\n\nOld words, old habits.\n")
+    plain_writer.stats_table.insert({"timestamp": "2024-01-01T09:30:00", "filepath": str(session_file)})
+    plain_writer.stats_table.insert({"timestamp": "2024-01-02T09:30:00", "filepath": str(tmp_path / "gone.Rmd")})
+
+    vocabulary = plain_writer.load_vocabulary()
+    assert vocabulary.top(5) == [("old", 2), ("words", 1), ("habits", 1)]
+    assert set(vocabulary.data["sessions"]) == {str(session_file), str(tmp_path / "gone.Rmd")}
+
+    with patch.object(plain_writer, "read_session_lines") as mock_read:
+        plain_writer.load_vocabulary()
+    mock_read.assert_not_called()
+
+
+def test_trim_history_drops_old_lines(bones_writer):
+    """Test that old off-screen lines are dropped from memory and indices are shifted to match"""
+    text = "one\ntwo\nthree\nfour\n"
+    bones_writer.config["history_limit"] = 8
+    bones_writer.text_content = [(char, 0, 0, 2) for char in text]
+    bones_writer.columns = [0, 1, 2, 3, 0, 1, 2, 3, 0, 1, 2, 3, 4, 5, 0, 1, 2, 3, 4]
+    bones_writer.engine.chars = list(text)
+    bones_writer.line_starts = [0, 4, 8, 14, 19]
+    bones_writer.visible_start = 14
+    bones_writer.word_start = 15
+    bones_writer.misspelled = {2, 15}
+
+    bones_writer.trim_history()
+
+    # Keeping the last 8 characters starts inside "three", so only "one" and "two" go
+    assert "".join(c for c, _, _, _ in bones_writer.text_content) == "three\nfour\n"
+    assert "".join(bones_writer.engine.chars) == "three\nfour\n"
+    assert list(bones_writer.columns) == [0, 1, 2, 3, 4, 5, 0, 1, 2, 3, 4]
+    assert bones_writer.line_starts == [0, 6, 11]
+    assert bones_writer.visible_start == 6
+    assert bones_writer.word_start == 7
+    assert bones_writer.misspelled == {7}
+    assert bones_writer.history_trimmed == 8
+
+
+def test_trim_history_without_newlines(bones_writer):
+    """Test that a session typed without Enter is capped by dropping wrapped rows that scrolled off screen"""
+    bones_writer.outfile = MagicMock()
+    bones_writer.win_height, bones_writer.win_width = 2, 10
+    win = MockCursesWindow()
+    with patch("curses.color_pair", return_value=0):
+        for char in "abcdefghij" * 5:
+            bones_writer.write_char(win, char)
+        bones_writer.config["history_limit"] = 20
+        bones_writer.visible_start = 30  # the last two rows are on screen
+
+        bones_writer.write_char(win, "x")
+
+    # Keeping the last 20 characters starts on a row boundary, so the first three rows go
+    assert "".join(c for c, _, _, _ in bones_writer.text_content) == "abcdefghij" * 2 + "x"
+    assert "".join(bones_writer.engine.chars) == "abcdefghij" * 2 + "x"
+    assert list(bones_writer.columns) == list(range(21))
+    assert bones_writer.line_starts == [0]
+    assert bones_writer.visible_start == 0
+    assert bones_writer.history_trimmed == 30
+    # The remaining rows wrap exactly as before
+    assert bones_writer.layout_tail() == (1, 1)
+    assert bones_writer.visible_start == 10
+
+
+def test_memory_profile_report():
+    """Test that the memory report lists growth and allocation sites"""
+    profile = MemoryProfile()
+    kept = [str(i) * 10 for i in range(1000)]
+    report = profile.report(len(kept))
+    profile.stop()
+
+    assert profile.per_keystroke(0) == 0
+    assert "bytes per keystroke" in report
+    assert "test_bones_writer.py" in report
+
+
+def test_session_goal():
+    """Test that every goal that is set must be reached, word and time goals stay met and the WPM floor does not"""
+    goal = SessionGoal(words=100, wpm=20)
+    assert not goal.met(99, 60)
+    assert goal.progress_text(99, 60) == "Goal: 99/100 words 99/20 WPM"
+    assert not goal.met(100, 600)  # 10 WPM is below the floor
+    assert goal.met(100, 300)
+    assert not goal.met(100, 6000)  # slowed down to 1 WPM since
+    assert goal.progress_text(100, 6000) == "Goal: 100/100 words 1/20 WPM"
+    assert goal.met(2000, 6000)
+
+    goal = SessionGoal(wpm=40)
+    assert not goal.met(1, 1)  # a quick first word does not clear the floor
+    assert not goal.met(30, 59)
+    assert goal.met(40, 60)
+
+    goal = SessionGoal(minutes=30)
+    assert goal.progress_text(0, 90) == "Goal: 1/30 min"
+    assert goal.met(0, 1800)
+    assert goal.met(0, 1800)
+
+
+def test_hostage_mode_ignores_ctrl_c_until_goal(bones_writer, mock_stdscr):
+    """Test that Ctrl-C only ends the session once the word goal is met"""
+    bones_writer.goal = SessionGoal(words=2)
+    mock_stdscr.get_wch = MagicMock(return_value="\x03")  # Ctrl-C in raw mode
+    bones_writer.engine.live_word_count = 1
+    bones_writer.inner_loop(mock_stdscr)
+    assert bones_writer.running
+    assert bones_writer.goal_text() == "Goal: 1/2 words"
+
+    bones_writer.engine.live_word_count = 2
+    bones_writer.inner_loop(mock_stdscr)
+    assert not bones_writer.running
+
+
+def test_hostage_mode_reads_ctrl_c_as_a_key(bones_writer):
+    """Test that hostage mode puts the terminal in raw mode, so Ctrl-C never interrupts an update"""
+    bones_writer.goal = SessionGoal(words=2)
+    with patch.object(bones_writer, "make_win", return_value=MagicMock()), \
+         patch.object(bones_writer, "inner_loop", side_effect=lambda win: setattr(bones_writer, "running", False)), \
+         patch.object(bones_writer, "update_status_bar"), \
+         patch("curses.start_color"), patch("curses.init_color"), patch("curses.init_pair"), \
+         patch("curses.raw") as mock_raw:
+        bones_writer.curses_loop(MagicMock())
+    mock_raw.assert_called_once()
+
+
+def test_cleanup_flags_goal_met(bones_writer):
+    """Test that sessions with a goal record whether it was met"""
+    bones_writer.stats_table = MagicMock()
+    bones_writer.goal = SessionGoal(words=2)
+    bones_writer.engine.live_word_count = 2
+    with patch("builtins.open", mock_open(read_data="one two")), \
+         patch.object(bones_writer, "elapsed_seconds", return_value=60), \
+         patch.object(bones_writer, "check_spelling", return_value=95), \
+         patch.object(bones_writer, "rename_file"), \
+         patch.object(bones_writer, "add_title"), \
+         patch.object(bones_writer, "git_commit_and_push"), \
+         patch.object(bones_writer, "record_metrics"), \
+         patch("builtins.input", side_effect=["test_category", "test_title"]), \
+         patch("builtins.print"):
+        bones_writer.cleanup()
+
+    assert bones_writer.stats_table.insert.call_args[0][0]["goal_met"] is True
+
+
+def test_goal_streak(bones_writer, memory_table):
+    """Test that the goal streak only counts days where a goal was met"""
+    today = datetime.now()
+    memory_table.insert({"timestamp": (today - timedelta(days=1)).isoformat(), "goal_met": True})
+    memory_table.insert({"timestamp": (today - timedelta(days=2)).isoformat(), "goal_met": False})
+    memory_table.insert({"timestamp": (today - timedelta(days=2)).isoformat()})
+    bones_writer.stats_table = memory_table
+    assert bones_writer.current_streak() == 2
+    assert bones_writer.current_streak(goals_only=True) == 1
+    bones_writer.goal = SessionGoal(words=10)
+    assert bones_writer.streak_text() == "Goal streak: 1"
+
+
+def test_query_sessions_filters_sorts_and_pages(bones_writer, memory_table):
+    """Test the stats query filters, sort order and pagination"""
+    rows = [
+        ("2024-03-01T10:00:00", "journal", 500, 600, True),
+        ("2024-03-02T10:00:00", "journal", 50, 120, None),
+        ("2024-03-03T10:00:00", "fiction", 900, 1800, False),
+        ("2024-03-04T10:00:00", "journal", 700, 900, True),
+        ("2024-04-01T10:00:00", "journal", 300, 300, True),
+    ]
+    for timestamp, category, words, seconds, goal_met in rows:
+        session = {"timestamp": timestamp, "filepath": f"bones/{category}/{timestamp}.Rmd", "word_count": words,
+                   "duration_seconds": seconds}
+        if goal_met is not None:
+            session["goal_met"] = goal_met
+        memory_table.insert(session)
+    bones_writer.stats_table = memory_table
+
+    def words(**kwargs):
+        return [session["word_count"] for session in bones_writer.query_sessions(**kwargs)]
+
+    assert words() == [500, 50, 900, 700, 300]
+    assert words(category="journal", since=datetime(2024, 3, 2), until=datetime(2024, 4, 1)) == [50, 700]
+    assert words(min_words=100, min_duration=600) == [500, 900, 700]
+    assert words(goal_met=True) == [500, 700, 300]
+    assert words(goal_met=False) == [900]
+    assert words(sort="word_count", descending=True) == [900, 700, 500, 300, 50]
+    assert words(sort="word_count", descending=True, offset=1, limit=2) == [700, 500]
+    assert words(sort="word_count", offset=3) == [700, 900]
+    with pytest.raises(ValueError):
+        words(sort="filepath")
+
+
+def test_char_width():
+    """Test display widths of narrow, wide and combining characters"""
+    assert char_width("a") == 1
+    assert char_width("—") == 1
+    assert char_width("é") == 1
+    assert char_width("中") == 2
+    assert char_width("́") == 0  # combining acute accent
+
+
+def test_key_to_char_accepts_unicode():
+    """Test that get_wch() characters in any script are written and control characters are not"""
+    assert SessionEngine.key_to_char("é") == "é"
+    assert SessionEngine.key_to_char("中") == "中"
+    assert SessionEngine.key_to_char("\r") == "\n"
+    assert SessionEngine.key_to_char("\x1b") is None
+    assert SessionEngine.key_to_char(ord("a")) == "a"
+    assert SessionEngine.key_to_char(curses.KEY_LEFT) is None
+
+
+def test_wide_characters_wrap_by_display_width(bones_writer, mock_stdscr):
+    """Test that wide characters take two columns in the cursor and wrap bookkeeping"""
+    bones_writer.outfile = MagicMock()
+    with patch("curses.color_pair", return_value=0):
+        for char in "中文字符":
+            bones_writer.write_char(mock_stdscr, char)
+    assert bones_writer.current_col == 8
+    assert list(bones_writer.columns) == [0, 2, 4, 6]
+
+    bones_writer.win_height, bones_writer.win_width = 5, 4
+    cursor = bones_writer.layout_tail()
+    assert [(y, x) for _, y, x, _ in bones_writer.text_content] == [(0, 0), (0, 2), (1, 0), (1, 2)]
+    assert cursor == (2, 0)
+
+    with patch("curses.color_pair", return_value=0):
+        bones_writer.delete_char(mock_stdscr)
+    assert bones_writer.current_col == 6
+    assert list(bones_writer.columns) == [0, 2, 4]
+
+
+def test_rebuild_database_from_history_and_files(tmp_path, git_repo):
+    """Test that rebuild-db recovers sessions from git history and the file tree in one write"""
+    bones = tmp_path / "repo" / "bones"
+    writer = BonesWriter(directory=bones, config_path=tmp_path / "config.yaml")
+
+    committed = bones / "journal" / "2024-01-01_09-00-00_My_Day.Rmd"
+    committed.parent.mkdir(parents=True)
+    committed.write_text("## My_Day\n\nThe quick brown fox jumps. i went home\n")
+    git_repo.git.add("--", str(committed))
+    git_repo.git.commit("-q", "-m", "journal: My Day!", env={"GIT_COMMITTER_DATE": "2024-01-01T09:10:00"})
+    uncommitted = bones / "ideas" / "2024-02-01_08-00-00_Plan.Rmd"
+    uncommitted.parent.mkdir()
+    uncommitted.write_text("## Plan\n\nWrite more.\n")
+    os.utime(uncommitted, (datetime(2024, 2, 1, 8, 5).timestamp(),) * 2)
+    (bones / "notes.Rmd").write_text("not a session\n")
+    writer.db_path.write_text("{corrupted")
+
+    assert writer.rebuild_database(workers=1) == 2
+    sessions = writer.stats_table.all()
+    assert [session["title"] for session in sessions] == ["My Day!", "Plan"]
+    assert sessions[0]["filepath"] == "bones/journal/2024-01-01_09-00-00_My_Day.Rmd"
+    assert sessions[0]["timestamp"] == "2024-01-01T09:10:00"
+    assert sessions[0]["duration_seconds"] == 600
+    assert sessions[0]["word_count"] == 8
+    assert sessions[0]["wpm"] == 0
+    assert sessions[0]["grammar_error_rate"] == 100
+    assert sessions[1]["duration_seconds"] == 300
+    assert sessions[1]["word_count"] == 2
+    assert all(session["recovered"] for session in sessions)
+    assert writer.db_path.with_suffix(".json.bak").read_text() == "{corrupted"
+
+    writer.rebuild_database(workers=2)
+    assert writer.stats_table.all() == sessions
+
+    # Another machine's shard is left alone, its original rows win over recovered ones for the same file
+    desktop = SessionTable(bones, "desktop")
+    desktop.insert({"timestamp": "2024-02-01T08:30:00", "filepath": sessions[1]["filepath"], "word_count": 3})
+    desktop.insert({"timestamp": "2024-03-01T08:30:00", "filepath": "bones/ideas/elsewhere.Rmd", "word_count": 4})
+    shard = desktop.path.read_text()
+    writer.rebuild_database(workers=1)
+    assert desktop.path.read_text() == shard
+    assert [session.get("recovered", False) for session in writer.stats_table] == [True, False, False]
+    assert [session["word_count"] for session in writer.stats_table] == [8, 3, 4]
+
+
+def test_spelling_language_per_category(tmp_path, plain_writer):
+    """Test that categories and sessions pick their own spelling dictionary"""
+    plain_writer.config["languages"] = {"Diario": "es"}
+    assert plain_writer.language_for("diario") == "es"
+    assert plain_writer.language_for("journal") == "en"
+    assert plain_writer.language_for(None) == "en"
+
+    session_file = tmp_path / "hoy.Rmd"
+    session_file.write_text("Hoy es un buen día en la casa de mi familia.\n")
+    assert plain_writer.check_spelling(session_file, language="es") == 100
+    assert plain_writer.check_spelling(session_file, language="en") < 80
+
+    plain_writer.category = "diario"
+    assert plain_writer.check_spelling(session_file) == 100
+    plain_writer.language = "en"
+    assert plain_writer.language_for("diario") == "en"
+    assert "casa" in load_dictionary("es")
+
+
+def test_unknown_spelling_languages_rejected_at_startup(tmp_path):
+    """Test that unknown languages fall back to the default from the config and are refused on the command line"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("language: klingon\nlanguages:\n  diario: es\n  notes: xx\n")
+    with patch("builtins.print") as mock_print:
+        writer = writer_without_repo(tmp_path, config_path)
+    mock_print.assert_any_call("Unknown spelling language 'klingon', using 'en'", file=sys.stderr)
+    assert writer.language_for("notes") == "en"
+    assert writer.language_for("diario") == "es"
+
+    assert validate_language("es") == "es"
+    with pytest.raises(typer.BadParameter):
+        validate_language("xx")
+
+    highlighter = SpellHighlighter(language="xx")
+    highlighter.submit(0, "wrold")
+    highlighter.stop()
+    assert highlighter.results() == [(0, "wrold")]
+
+
+def test_text_statistics_single_pass():
+    """Test sentence, paragraph and readability metrics gathered alongside the word counts"""
+    syllables = {"cat": 1, "make": 1, "table": 2, "reading": 2, "the": 1, "beautiful": 3}
+    assert {word: count_syllables(word) for word in syllables} == syllables
+    stats = TextStatistics.from_lines(
+        ["The cat sat. It was happy!\n", "Then it left\n", "\n", 'She asked "why?" No answer\n']
+    )
+    metrics = stats.metrics()
+    assert stats.word_count == 14
+    assert metrics["sentence_count"] == 5
+    assert metrics["paragraph_count"] == 2
+    assert metrics["mean_sentence_length"] == 2.8
+    assert metrics["flesch_reading_ease"] > 90
+    assert metrics["flesch_kincaid_grade"] < 2
+    assert TextStatistics().metrics()["flesch_reading_ease"] is None
+
+
+def test_backfill_readability(tmp_path, plain_writer):
+    """Test that sessions without readability metrics are filled in from their files"""
+    session_file = tmp_path / "journal" / "2024-01-01_09-00-00_Old.Rmd"
+    session_file.parent.mkdir()
+    session_file.write_text("## Old\n\nOne sentence here. And another one.\n\nA second paragraph.\n")
+    plain_writer.stats_table.insert({"timestamp": "2024-01-01T09:30:00", "filepath": str(session_file)})
+    plain_writer.stats_table.insert({"timestamp": "2024-01-02T09:30:00", "filepath": str(tmp_path / "gone.Rmd")})
+
+    assert plain_writer.backfill_readability() == 1
+    old, gone = plain_writer.stats_table.all()
+    assert old["sentence_count"] == 3
+    assert old["paragraph_count"] == 2
+    assert "sentence_count" not in gone
+    assert plain_writer.backfill_readability() == 0
+
+
+def test_render_dashboard():
+    """Test the terminal dashboard's heatmap, sparklines and streaks"""
+    assert sparkline([0, 5, 10, None]) == "▁▅█ "
+    sessions = [
+        {"timestamp": "2024-03-08T09:00:00", "word_count": 100, "wpm": 20, "spelling_accuracy": 90},
+        {"timestamp": "2024-03-09T09:00:00", "word_count": 300, "wpm": 40, "spelling_accuracy": 100, "goal_met": True},
+        {"timestamp": "2024-03-10T09:00:00", "word_count": 200, "wpm": 30, "spelling_accuracy": 95},
+    ]
+    lines = render_dashboard(sessions, date(2024, 3, 10), days=4, width=30, color=False).splitlines()
+    assert lines[0] == "          Jan       Feb     Mar"
+    assert lines[1:8] == ["Mo", "", "We", "", f"Fr{' ' * 26}▒▒", f"{' ' * 28}██", f"Su{' ' * 26}▓▓"]
+    assert "Last 4 days: 3 sessions, 600 words" in lines
+    assert "Words    ▁▃█▆  300 max" in lines
+    assert "WPM       ▁█▅  30 avg" in lines
+    assert "Streak: 3 days (longest 3 days)" in lines
+    assert "Goal streak: 1 day" in lines
+    assert "\x1b[38;5;" in render_dashboard(sessions, date(2024, 3, 10))
+
+
+def test_read_sessions_is_read_only(tmp_path):
+    """Test that the dashboard reads sessions without writing config or opening git"""
+    read_sessions(tmp_path / "missing.yaml")
+    assert not (tmp_path / "missing.yaml").exists()
+
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.dump({"directory": str(tmp_path / "bones")}))
+    assert read_sessions(config_path) == []
+    assert not (tmp_path / "bones").exists()
+
+    with patch("git.Repo"):
+        writer = BonesWriter(directory=tmp_path / "bones", config_path=config_path)
+    row_id = writer.stats_table.insert({"timestamp": "2024-01-01T09:00:00", "word_count": 5})
+    with patch("git.Repo", side_effect=AssertionError("git must not be opened")):
+        assert read_sessions(config_path) == [{"timestamp": "2024-01-01T09:00:00", "word_count": 5, "id": row_id}]
+
+
+def test_stats_json_prints_only_sessions(tmp_path, capsys):
+    """Test that stats --json reads sessions without git and writes nothing but JSON lines to stdout"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.dump({"directory": str(tmp_path / "bones"), "language": "xx"}))
+    os.makedirs(tmp_path / "bones")
+    table = SessionTable(tmp_path / "bones", "laptop")
+    table.insert({"timestamp": "2024-03-01T10:00:00", "filepath": "bones/journal/a.Rmd", "word_count": 500})
+    table.insert({"timestamp": "2024-03-02T10:00:00", "filepath": "bones/fiction/b.Rmd", "word_count": 900})
+    table.insert({"timestamp": "2024-03-03T10:00:00", "filepath": "bones/journal/c.Rmd", "word_count": 50})
+
+    with patch("git.Repo", side_effect=AssertionError("git must not be opened")):
+        stats(days=7, output_json=True, category="journal", since=None, until=None, min_words=None,
+              min_minutes=None, goal_met=None, sort="word_count", descending=True, offset=0, limit=None,
+              readability=False, tui=False, config=config_path)
+    out, err = capsys.readouterr()
+    assert [json.loads(line)["word_count"] for line in out.splitlines()] == [500, 50]
+    assert err == ""
+
+
+def test_writer_skips_repo_discovery_when_daemon_answers(tmp_path):
+    """Test that a running daemon spares the writer from opening the git repository at startup"""
+    responses = {"repo": {"result": str(tmp_path)}, "status": {"result": None}, "commit": {"result": True}}
+    with patch.object(DaemonClient, "request", side_effect=lambda op, **kwargs: responses[op]) as mock_request, \
+         patch("git.Repo") as mock_git_repo:
+        writer = BonesWriter(directory=tmp_path / "bones", config_path=tmp_path / "config.yaml")
+        mock_request.assert_called_once_with("repo")
+        mock_git_repo.assert_not_called()
+        assert writer.relative_filepath(tmp_path / "bones" / "a.Rmd") == Path("bones/a.Rmd")
+        assert writer.session_path({"filepath": "bones/a.Rmd"}) == tmp_path / "bones" / "a.Rmd"
+
+        # The preflight check of main() and the commit at the end of the session go through the daemon
+        writer.pause_on_dirty_repo()
+        writer.start_checkpoints()  # disabled, so the repository is not needed
+        writer.git_commit_and_push([tmp_path / "bones" / "a.Rmd"], "journal: A")
+        mock_git_repo.assert_not_called()
+        assert writer.git_state == "synced"
+        assert [call.args[0] for call in mock_request.call_args_list] == ["repo", "status", "commit"]
+
+        # Anything that needs the repository itself still opens it
+        assert writer.repo is mock_git_repo.return_value
+        mock_git_repo.assert_called_once()